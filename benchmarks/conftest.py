@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio-Query-Parser.
+# Copyright (C) 2016 CERN.
+#
+# Invenio-Query-Parser is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio-Query-Parser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Pytest configuration for the benchmarks."""
+
+from __future__ import division
+
+import pytest
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+
+@pytest.fixture()
+def run_stage(benchmark):
+    """Return function benchmarking a stage over a list of inputs.
+
+    Besides the timings of pytest-benchmark, the number of inputs, the
+    throughput and the peak of memory allocated by one pass are stored in
+    the ``extra_info`` of the benchmark.
+    """
+    def run(function, inputs):
+        result = benchmark(lambda: [function(value) for value in inputs])
+        info = benchmark.extra_info
+        info['inputs'] = len(inputs)
+
+        stats = getattr(benchmark, 'stats', None)
+        if stats is not None and stats.stats.mean:
+            info['inputs_per_second'] = len(inputs) / stats.stats.mean
+
+        if tracemalloc is not None and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            try:
+                [function(value) for value in inputs]
+                info['peak_allocated_kib'] = \
+                    tracemalloc.get_traced_memory()[1] / 1024
+            finally:
+                tracemalloc.stop()
+        return result
+    return run
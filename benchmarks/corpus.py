@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio-Query-Parser.
+# Copyright (C) 2016 CERN.
+#
+# Invenio-Query-Parser is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio-Query-Parser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Generate a corpus of realistic query shapes for the benchmarks.
+
+The corpus is built from a seeded random generator so every run measures
+the same queries.
+"""
+
+import random
+
+WORDS = (
+    'higgs', 'boson', 'quark', 'gluon', 'lepton', 'neutrino', 'muon',
+    'hadron', 'collider', 'symmetry', 'supersymmetry', 'dark', 'matter',
+    'energy', 'cross', 'section', 'decay', 'search', 'measurement', 'jet',
+)
+"""Words of titles and abstracts."""
+
+AUTHORS = ('Ellis, J', 'Higgs, P', 'Englert, F', 'Witten, E', 'Weinberg, S')
+"""Author names."""
+
+KEYWORDS = ('title', 'abstract', 'keywords', 'collaboration', 'journal')
+"""Invenio keywords."""
+
+SPIRES_KEYWORDS = ('a', 't', 'k', 'j', 'cn', 'eprint')
+"""SPIRES keywords."""
+
+
+def keyword_query(rng):
+    """Return short query searching a keyword."""
+    keyword = rng.choice(KEYWORDS)
+    return rng.choice((
+        '{0}:{1}',
+        '{0}:"{1} {2}"',
+        "{0}:'{1}'",
+        '{0}:/^{1}.*/',
+        'author:"{3}"',
+    )).format(keyword, rng.choice(WORDS), rng.choice(WORDS),
+              rng.choice(AUTHORS))
+
+
+def implicit_and_query(rng, size=30):
+    """Return long phrase of words joined by implicit ``AND``."""
+    return ' '.join(rng.choice(WORDS) for _ in range(size))
+
+
+def nested_query(rng, depth=8):
+    """Return query of nested parenthesized boolean operations."""
+    query = keyword_query(rng)
+    for _ in range(depth):
+        query = '({0} {1} {2})'.format(
+            keyword_query(rng), rng.choice(('AND', 'OR', 'AND NOT')), query)
+    return query
+
+
+def or_list_query(rng, size=200):
+    """Return ``OR`` of many record identifiers."""
+    start = rng.randint(1, 100000)
+    return ' OR '.join('recid:%d' % (start + i) for i in range(size))
+
+
+def range_query(rng):
+    """Return query combining range searches."""
+    year = rng.randint(1960, 2010)
+    return rng.choice((
+        'year:{0}->{1}',
+        'year:{0}->{1} AND title:{2}',
+        'date:"{0}-01-01"->"{1}-12-31" OR year:{1}',
+    )).format(year, year + rng.randint(0, 10), rng.choice(WORDS))
+
+
+def spires_query(rng, size=3):
+    """Return SPIRES ``find`` query with implicit keywords."""
+    terms = []
+    for _ in range(size):
+        keyword = rng.choice(SPIRES_KEYWORDS)
+        if keyword == 'a':
+            value = rng.choice(AUTHORS).split(',')[0].lower()
+        else:
+            value = rng.choice(WORDS)
+        terms.append('{0} {1}'.format(keyword, value))
+        if rng.random() < 0.5:
+            terms.append(rng.choice(WORDS))
+    return 'find ' + ' and '.join(terms)
+
+
+SHAPES = (
+    ('keyword', keyword_query, 20),
+    ('implicit_and', implicit_and_query, 5),
+    ('nested', nested_query, 5),
+    ('or_list', or_list_query, 2),
+    ('range', range_query, 20),
+)
+"""Invenio query shapes with the number of generated queries."""
+
+SPIRES_SHAPES = (
+    ('spires', spires_query, 10),
+)
+"""SPIRES query shapes with the number of generated queries."""
+
+
+def generate(shapes=SHAPES, seed=42):
+    """Return dictionary of query lists indexed by their shape."""
+    rng = random.Random(seed)
+    return dict((name, [factory(rng) for _ in range(count)])
+                for name, factory, count in shapes)
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio-Query-Parser.
+# Copyright (C) 2016 CERN.
+#
+# Invenio-Query-Parser is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio-Query-Parser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Benchmark bulk parsing of a query log with a pool of processes."""
+
+from __future__ import division
+
+import pytest
+from corpus import generate
+
+from invenio_query_parser.bulk import parse_many
+
+QUERIES = [query for _, queries in sorted(generate().items())
+           for query in queries] * 10
+
+
+@pytest.mark.parametrize('workers', (0, 1, 2, 4))
+def test_parse_many(benchmark, workers):
+    """Parse the corpus with the given number of worker processes."""
+    results = benchmark(lambda: list(parse_many(QUERIES, workers=workers)))
+    assert len(results) == len(QUERIES)
+
+    info = benchmark.extra_info
+    info['inputs'] = len(QUERIES)
+    info['workers'] = workers
+    stats = getattr(benchmark, 'stats', None)
+    if stats is not None and stats.stats.mean:
+        info['inputs_per_second'] = len(QUERIES) / stats.stats.mean
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio-Query-Parser.
+# Copyright (C) 2016 CERN.
+#
+# Invenio-Query-Parser is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio-Query-Parser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+
+"""Benchmark converting long chains of operators.
+
+Unlike the other benchmarks, :func:`test_linear_time` fails when a walker
+is not linear in the length of the chain.
+"""
+
+import timeit
+
+import pytest
+
+from invenio_query_parser.contrib.elasticsearch.walkers.dsl import \
+    ElasticSearchDSL
+from invenio_query_parser.fast_parser import FastParser
+from invenio_query_parser.visitor import accept
+from invenio_query_parser.walkers.repr_printer import TreeRepr
+
+
+def chain(size, operator, flatten=False):
+    """Return tree of the chain of terms joined by the operator."""
+    query = operator.join('t%d' % index for index in range(size))
+    return FastParser(flatten=flatten).parse(query)
+
+
+def extending(raw):
+    """Return walker extending queries of chains in place."""
+    walker = ElasticSearchDSL(raw=raw)
+    walker.extend_in_place = True
+    return walker
+
+
+@pytest.mark.parametrize('size', (2000, 16000))
+@pytest.mark.parametrize('raw', (True, False))
+def test_elasticsearch_dsl_chain(benchmark, raw, size):
+    """Convert a chain of ORs to Elastic Search DSL."""
+    benchmark(accept, chain(size, ' OR '), extending(raw))
+
+
+def test_linear_time():
+    """Check 8 times more terms take less than 16 times longer."""
+    def duration(walker, size, operator, flatten=False):
+        tree = chain(size, operator, flatten=flatten)
+        return min(timeit.repeat(lambda: accept(tree, walker),
+                                 number=1, repeat=5))
+
+    # a quadratic walker would be 64 times slower
+    for operator in (' OR ', ' -'):
+        walker = extending(raw=True)
+        assert duration(walker, 16000, operator) < \
+            16 * duration(walker, 2000, operator), operator
+    assert duration(TreeRepr(), 16000, ' OR ', flatten=True) < \
+        16 * duration(TreeRepr(), 2000, ' OR ', flatten=True)
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio-Query-Parser.
+# Copyright (C) 2016 CERN.
+#
+# Invenio-Query-Parser is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio-Query-Parser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Benchmark the import time of the modules in a fresh interpreter.
+
+Every round imports the module in a new interpreter, which measures the
+import with :func:`time.time` and, on Python 3.7 or newer, with ``python -X
+importtime``.  The minimum import time in milliseconds and the cumulative
+time reported by ``-X importtime`` in microseconds are stored in the
+``extra_info`` of the benchmark, and the import time must stay below the
+target of the module.
+
+Show the time spent in each imported module with e.g.
+``python -X importtime -c 'import invenio_query_parser.parser'``.
+"""
+
+import subprocess
+import sys
+
+import pytest
+
+SCRIPT = """
+import time
+start = time.time()
+import {0}
+print((time.time() - start) * 1000)
+"""
+
+TARGETS = {
+    'invenio_query_parser.fast_parser': 60,
+    'invenio_query_parser.query_parser': 60,
+    'invenio_query_parser.contrib.elasticsearch': 80,
+    'invenio_query_parser.parser': 120,
+}
+"""Target import time in milliseconds of the modules."""
+
+
+def import_time(module):
+    """Return import time of the module and the ``-X importtime`` output."""
+    options = ['-X', 'importtime'] if sys.version_info >= (3, 7) else []
+    process = subprocess.Popen(
+        [sys.executable] + options + ['-c', SCRIPT.format(module)],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stdout, stderr = process.communicate()
+    assert process.returncode == 0, stderr
+    return float(stdout), stderr.decode('utf-8')
+
+
+def cumulative_import_time(module, importtime):
+    """Return cumulative microseconds of the module in the output."""
+    for line in importtime.splitlines():
+        fields = [field.strip() for field in line.split('|')]
+        if len(fields) == 3 and fields[2] == module:
+            return int(fields[1])
+
+
+@pytest.mark.parametrize('module', sorted(TARGETS))
+def test_import(benchmark, module):
+    """Import module in a fresh interpreter."""
+    results = []
+    benchmark.pedantic(lambda: results.append(import_time(module)),
+                       rounds=5, warmup_rounds=1)
+    milliseconds, importtime = min(results)
+    benchmark.extra_info['import_ms'] = milliseconds
+    cumulative = cumulative_import_time(module, importtime)
+    if cumulative is not None:
+        benchmark.extra_info['importtime_us'] = cumulative
+    assert milliseconds < TARGETS[module]
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio-Query-Parser.
+# Copyright (C) 2016 CERN.
+#
+# Invenio-Query-Parser is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio-Query-Parser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Benchmark sharing identical subtrees of generated queries."""
+
+from __future__ import division
+
+import pytest
+
+from invenio_query_parser.contrib.elasticsearch.walkers.dsl import \
+    ElasticSearchDSL
+from invenio_query_parser.fast_parser import FastParser
+from invenio_query_parser.visitor import accept
+from invenio_query_parser.walkers.interner import Interner
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+QUERY = ' OR '.join(
+    '(collaboration:atlas AND title:"higgs boson" AND year:{0})'.format(
+        2000 + index % 10) for index in range(500))
+"""Generated query repeating the same subtrees."""
+
+
+@pytest.fixture(scope='module')
+def tree():
+    """Return the parsed query."""
+    return FastParser(flatten=True).parse(QUERY)
+
+
+def retained(function):
+    """Return the result of the function and the memory it retains."""
+    if tracemalloc is None:
+        return function(), None
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = function()
+        return result, tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+
+def test_parse(benchmark):
+    """Parse the query without sharing subtrees."""
+    parser = FastParser(flatten=True)
+    benchmark(parser.parse, QUERY)
+    benchmark.extra_info['retained_kib'] = \
+        (retained(lambda: parser.parse(QUERY))[1] or 0) / 1024
+
+
+def test_parse_interned(benchmark):
+    """Parse the query and share identical subtrees."""
+    parser = FastParser(flatten=True)
+    benchmark(lambda: Interner()(parser.parse(QUERY)))
+    benchmark.extra_info['retained_kib'] = (retained(
+        lambda: Interner()(parser.parse(QUERY)))[1] or 0) / 1024
+
+
+def test_elasticsearch_dsl(benchmark, tree):
+    """Convert every subtree to Elastic Search DSL."""
+    benchmark(lambda: accept(tree, ElasticSearchDSL()).to_dict())
+
+
+def test_elasticsearch_dsl_memoized(benchmark, tree):
+    """Convert every unique subtree to Elastic Search DSL once."""
+    interned = Interner()(tree)
+    result = benchmark(
+        lambda: accept(interned, ElasticSearchDSL(), memoize=True).to_dict())
+    assert result == accept(tree, ElasticSearchDSL()).to_dict()
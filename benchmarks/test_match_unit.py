@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio-Query-Parser.
+# Copyright (C) 2016 CERN.
+#
+# Invenio-Query-Parser is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio-Query-Parser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Benchmark matching of records with MatchUnit and compiled predicates."""
+
+import pytest
+
+from invenio_query_parser.fast_parser import FastParser
+from invenio_query_parser.walkers.match_unit import MatchCostOptimizer, \
+    MatchUnit, MatchUnitCompiler
+
+QUERY = ('title:"Higgs boson" AND author.name:/^Ell.*/ AND '
+         'year:2000->2012 OR NOT keywords:quark')
+
+RECORDS = [
+    {
+        'title': 'Higgs boson' if i % 3 else 'Top quark',
+        'author': [{'name': 'Author %d' % j} for j in range(i % 50)] + [
+            {'name': 'Ellis'}],
+        'year': str(1990 + i % 30),
+        'keywords': ['hep', 'quark' if i % 2 else 'lepton'],
+    }
+    for i in range(1000)
+]
+
+
+@pytest.fixture(scope='module')
+def tree():
+    """Return parsed query."""
+    return FastParser().parse(QUERY)
+
+
+def test_match_unit_visitor(benchmark, tree):
+    """Walk the tree with a new MatchUnit for every record."""
+    result = benchmark(
+        lambda: [tree.accept(MatchUnit(record)) for record in RECORDS])
+    assert True in result and False in result
+
+
+def test_match_unit_top_down(benchmark, tree):
+    """Evaluate the cost ordered tree top-down for every record."""
+    def run():
+        cost, optimized = tree.accept(MatchCostOptimizer())
+        return [MatchUnit(record).match(optimized) for record in RECORDS]
+    result = benchmark(run)
+    assert result == [tree.accept(MatchUnit(record)) for record in RECORDS]
+
+
+def test_match_unit_compiled(benchmark, tree):
+    """Compile the tree once and call the predicate for every record."""
+    def run():
+        predicate = tree.accept(MatchUnitCompiler())
+        return [predicate(record) for record in RECORDS]
+    result = benchmark(run)
+    assert result == [tree.accept(MatchUnit(record)) for record in RECORDS]
+
+
+def test_match_unit_batch(benchmark, tree):
+    """Match all records at once stored in columns."""
+    numpy = pytest.importorskip('numpy')
+    from invenio_query_parser.contrib.batch import match_batch
+
+    batch = dict((field, [record[field] for record in RECORDS])
+                 for field in RECORDS[0])
+    batch['title'] = numpy.array(batch['title'])
+    batch['year'] = numpy.array(batch['year'])
+    result = benchmark(lambda: match_batch(tree, batch).tolist())
+    assert result == [tree.accept(MatchUnit(record)) for record in RECORDS]
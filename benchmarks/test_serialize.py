@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio-Query-Parser.
+# Copyright (C) 2016 CERN.
+#
+# Invenio-Query-Parser is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio-Query-Parser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Benchmark memory, pickling and serialisation of a 10k node tree."""
+
+from __future__ import division
+
+import pickle
+
+import pytest
+
+from invenio_query_parser.fast_parser import FastParser
+from invenio_query_parser.serialize import dump_bytes, dump_json, load_bytes, \
+    load_json
+from invenio_query_parser.visitor import accept
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+QUERY = ' OR '.join('(title:higgs%d AND NOT author:ellis%d)' % (index, index)
+                    for index in range(1250))
+"""Query of 10001 nodes once the boolean chains are flattened."""
+
+
+class NodeCounter(object):
+    """Count nodes of a tree."""
+
+    def visit(self, node, *children):
+        """Return the number of nodes of the subtree."""
+        if children and isinstance(children[0], list):
+            children = children[0]
+        return 1 + sum(children)
+
+
+@pytest.fixture(scope='module')
+def tree():
+    """Return the parsed query."""
+    return FastParser(flatten=True).parse(QUERY)
+
+
+def test_tree_memory(benchmark, tree):
+    """Parse the query and report the memory retained per node."""
+    if tracemalloc is None:
+        pytest.skip('tracemalloc is not available')
+    benchmark(FastParser(flatten=True).parse, QUERY)
+
+    nodes = accept(tree, NodeCounter())
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        parsed = FastParser(flatten=True).parse(QUERY)
+        retained = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    assert parsed == tree
+    benchmark.extra_info['nodes'] = nodes
+    benchmark.extra_info['bytes_per_node'] = retained / nodes
+
+
+def test_pickle_dumps(benchmark, tree):
+    """Pickle the tree."""
+    data = benchmark(pickle.dumps, tree, pickle.HIGHEST_PROTOCOL)
+    benchmark.extra_info['bytes'] = len(data)
+
+
+def test_pickle_loads(benchmark, tree):
+    """Unpickle the tree."""
+    data = pickle.dumps(tree, pickle.HIGHEST_PROTOCOL)
+    assert benchmark(pickle.loads, data) == tree
+
+
+def test_dump_json(benchmark, tree):
+    """Serialise the tree to JSON."""
+    data = benchmark(dump_json, tree)
+    benchmark.extra_info['bytes'] = len(data)
+
+
+def test_load_json(benchmark, tree):
+    """Load the tree from JSON."""
+    assert benchmark(load_json, dump_json(tree)) == tree
+
+
+def test_dump_bytes(benchmark, tree):
+    """Serialise the tree to the binary format."""
+    data = benchmark(dump_bytes, tree)
+    benchmark.extra_info['bytes'] = len(data)
+
+
+def test_load_bytes(benchmark, tree):
+    """Load the tree from the binary format."""
+    assert benchmark(load_bytes, dump_bytes(tree)) == tree
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio-Query-Parser.
+# Copyright (C) 2016 CERN.
+#
+# Invenio-Query-Parser is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio-Query-Parser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Benchmark creating parsers of many keywords with and without snapshot."""
+
+import re
+
+import pytest
+
+from invenio_query_parser.cache import PATTERNS
+from invenio_query_parser.query_parser import QueryParser
+from invenio_query_parser.snapshot import dump_snapshot, load_snapshot
+from invenio_query_parser.utils import build_valid_keywords_grammar
+
+KEYWORDS = ['field%d.%s' % (index, 'sub' * (index % 4))
+            for index in range(2000)]
+"""Allowed keywords of a large site."""
+
+
+@pytest.fixture(scope='module', autouse=True)
+def grammar():
+    """Restore the default keyword grammar."""
+    yield
+    build_valid_keywords_grammar()
+
+
+def clear():
+    """Forget compiled patterns."""
+    PATTERNS.clear()
+    re.purge()
+
+
+def configure():
+    """Create parser and grammar of the keywords."""
+    QueryParser(KEYWORDS)
+    build_valid_keywords_grammar(KEYWORDS)
+
+
+def test_configure(benchmark):
+    """Compile patterns of the keywords from scratch."""
+    benchmark.pedantic(configure, setup=clear, rounds=5)
+
+
+def test_configure_from_snapshot(benchmark):
+    """Load patterns of the keywords from a snapshot."""
+    data = dump_snapshot(KEYWORDS)
+
+    def load_and_configure():
+        load_snapshot(data, KEYWORDS)
+        configure()
+    benchmark.pedantic(load_and_configure, setup=clear, rounds=5)
+    benchmark.extra_info['bytes'] = len(data)
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio-Query-Parser.
+# Copyright (C) 2016 CERN.
+#
+# Invenio-Query-Parser is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio-Query-Parser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Benchmark SPIRES queries with a growing number of values or terms.
+
+The time per value or term reported as ``seconds_per_value`` and
+``seconds_per_term`` should stay constant when their number grows.
+"""
+
+from __future__ import division
+
+import pypeg2
+import pytest
+
+from invenio_query_parser.contrib.spires.parser import Main
+from invenio_query_parser.contrib.spires.walkers.pypeg_to_ast import \
+    PypegConverter
+from invenio_query_parser.utils import build_valid_keywords_grammar
+
+
+@pytest.mark.parametrize('size', [25, 50, 100, 200, 400])
+def test_spires_find_title_values(benchmark, size):
+    """Parse ``find t`` followed by many values."""
+    build_valid_keywords_grammar()
+    query = 'find t ' + ' '.join('word%d' % value for value in range(size))
+    tree = benchmark(pypeg2.parse, query, Main, whitespace="")
+    assert tree.accept(PypegConverter()).right.value == query[len('find t '):]
+
+    stats = getattr(benchmark, 'stats', None)
+    if stats is not None:
+        benchmark.extra_info['seconds_per_value'] = stats.stats.mean / size
+
+
+@pytest.mark.parametrize('size', [100, 200, 400, 800])
+def test_spires_find_author_terms(benchmark, size):
+    """Convert ``find a`` followed by many terms with implicit keywords."""
+    build_valid_keywords_grammar()
+    query = 'find a ' + ' and '.join('x%d' % term for term in range(size))
+    tree = pypeg2.parse(query, Main, whitespace="")
+    converter = PypegConverter(flatten=True)
+    result = benchmark(tree.accept, converter)
+    assert all(child.keyword.value == 'a' for child in result.children)
+
+    stats = getattr(benchmark, 'stats', None)
+    if stats is not None:
+        benchmark.extra_info['seconds_per_term'] = stats.stats.mean / size
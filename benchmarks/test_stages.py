@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio-Query-Parser.
+# Copyright (C) 2016 CERN.
+#
+# Invenio-Query-Parser is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio-Query-Parser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Benchmark parse, convert and walk stages over a corpus of query shapes.
+
+Run a stage for a single shape with e.g. ``py.test benchmarks -k nested``
+and compare runs with ``--benchmark-save`` and ``--benchmark-compare``.
+"""
+
+import pypeg2
+import pytest
+from corpus import SPIRES_SHAPES, generate
+
+from invenio_query_parser.contrib.elasticsearch import dump_json
+from invenio_query_parser.contrib.elasticsearch.walkers.dsl import \
+    ElasticSearchDSL
+from invenio_query_parser.contrib.elasticsearch.walkers.pypeg_to_dsl import \
+    PypegToElasticSearchDSL
+from invenio_query_parser.contrib.spires import parser as spires_parser
+from invenio_query_parser.contrib.spires.walkers import \
+    pypeg_to_ast as spires_pypeg_to_ast
+from invenio_query_parser.contrib.spires.walkers import spires_to_invenio
+from invenio_query_parser.fast_parser import FastParser
+from invenio_query_parser.parser import Main
+from invenio_query_parser.utils import build_valid_keywords_grammar
+from invenio_query_parser.visitor import compile_walker
+from invenio_query_parser.walkers.pypeg_to_ast import PypegConverter
+from invenio_query_parser.walkers.repr_printer import TreeRepr
+
+CORPUS = generate()
+SPIRES_CORPUS = generate(SPIRES_SHAPES)
+
+shapes = pytest.mark.parametrize('shape', sorted(CORPUS))
+
+
+def parse(query):
+    """Parse query with the Invenio grammar."""
+    return pypeg2.parse(query, Main, whitespace="")
+
+
+def parse_spires(query):
+    """Parse query with the SPIRES grammar."""
+    return pypeg2.parse(query, spires_parser.Main, whitespace="")
+
+
+@pytest.fixture(scope='module', autouse=True)
+def grammar():
+    """Install the default keyword grammar."""
+    build_valid_keywords_grammar()
+
+
+@pytest.fixture(scope='module')
+def parse_trees():
+    """Return parse trees of the corpus."""
+    return dict((shape, [parse(query) for query in queries])
+                for shape, queries in CORPUS.items())
+
+
+@pytest.fixture(scope='module')
+def trees(parse_trees):
+    """Return AST of the corpus."""
+    return dict((shape, [tree.accept(PypegConverter()) for tree in values])
+                for shape, values in parse_trees.items())
+
+
+@shapes
+def test_parse(run_stage, shape):
+    """Parse queries with pypeg2 and the Invenio grammar."""
+    run_stage(parse, CORPUS[shape])
+
+
+@shapes
+def test_parse_fast(run_stage, shape):
+    """Parse queries directly to AST with the fast parser."""
+    run_stage(FastParser().parse, CORPUS[shape])
+
+
+@shapes
+def test_convert(run_stage, shape, parse_trees):
+    """Convert parse trees to AST."""
+    run_stage(lambda tree: tree.accept(PypegConverter()), parse_trees[shape])
+
+
+@shapes
+def test_walk_tree_repr(run_stage, shape, trees):
+    """Print AST with TreeRepr."""
+    run_stage(lambda tree: tree.accept(TreeRepr()), trees[shape])
+
+
+@shapes
+def test_walk_tree_repr_compiled(run_stage, shape, trees):
+    """Print AST with the compiled walker of TreeRepr."""
+    walk = compile_walker(TreeRepr)
+    run_stage(lambda tree: walk(tree, TreeRepr()), trees[shape])
+
+
+@shapes
+def test_walk_elasticsearch_dsl(run_stage, shape, trees):
+    """Convert AST to Elastic Search DSL dictionaries."""
+    run_stage(lambda tree: tree.accept(ElasticSearchDSL()).to_dict(),
+              trees[shape])
+
+
+@shapes
+def test_walk_elasticsearch_dsl_raw(run_stage, shape, trees):
+    """Convert AST to raw Elastic Search DSL dictionaries."""
+    run_stage(lambda tree: tree.accept(ElasticSearchDSL(raw=True)),
+              trees[shape])
+
+
+@shapes
+def test_walk_elasticsearch_dsl_json(run_stage, shape, trees):
+    """Convert AST to Elastic Search DSL JSON bytes."""
+    run_stage(lambda tree: dump_json(tree.accept(ElasticSearchDSL(raw=True))),
+              trees[shape])
+
+
+@shapes
+def test_convert_elasticsearch_dsl(run_stage, shape, parse_trees):
+    """Convert parse trees to AST and then to Elastic Search DSL."""
+    run_stage(lambda tree: tree.accept(PypegConverter()).accept(
+        ElasticSearchDSL()).to_dict(), parse_trees[shape])
+
+
+@shapes
+def test_convert_elasticsearch_dsl_fused(run_stage, shape, parse_trees):
+    """Convert parse trees to Elastic Search DSL in a single walk."""
+    run_stage(lambda tree: tree.accept(PypegToElasticSearchDSL()).to_dict(),
+              parse_trees[shape])
+
+
+def test_spires_parse(run_stage):
+    """Parse queries with pypeg2 and the SPIRES grammar."""
+    run_stage(parse_spires, SPIRES_CORPUS['spires'])
+
+
+def test_spires_convert(run_stage):
+    """Convert SPIRES parse trees to AST."""
+    run_stage(lambda tree: tree.accept(spires_pypeg_to_ast.PypegConverter()),
+              [parse_spires(query) for query in SPIRES_CORPUS['spires']])
+
+
+def test_spires_to_invenio(run_stage):
+    """Rewrite SPIRES keywords to Invenio keywords."""
+    converter = spires_pypeg_to_ast.PypegConverter()
+    run_stage(lambda tree: tree.accept(spires_to_invenio.SpiresToInvenio()), [
+        parse_spires(query).accept(converter)
+        for query in SPIRES_CORPUS['spires']
+    ])
+
+
+def test_spires_rewrite_keywords(run_stage):
+    """Rewrite SPIRES keywords copying only the boolean operations."""
+    converter = spires_pypeg_to_ast.PypegConverter()
+    run_stage(spires_to_invenio.rewrite_keywords, [
+        parse_spires(query).accept(converter)
+        for query in SPIRES_CORPUS['spires']
+    ])
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio-Query-Parser.
+# Copyright (C) 2016 CERN.
+#
+# Invenio-Query-Parser is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio-Query-Parser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Benchmark the throughput of parsing queries from many threads.
+
+The corpus is split between the threads which share the parser and the
+walkers, as in a threaded WSGI server.  On CPython the pure Python stages
+hold the global interpreter lock, so the throughput is not expected to
+scale with the number of threads; the benchmark shows the overhead of the
+contention instead.
+"""
+
+from __future__ import division
+
+import threading
+
+import pytest
+from corpus import generate
+
+from invenio_query_parser.contrib.elasticsearch import invenio_query_factory
+from invenio_query_parser.utils import build_valid_keywords_grammar
+
+QUERIES = [query for _, queries in sorted(generate().items())
+           for query in queries]
+
+threads = pytest.mark.parametrize('threads', (1, 2, 4, 8))
+
+
+def run_threads(function, threads):
+    """Run the function over the corpus split between threads."""
+    def work(queries):
+        for query in queries:
+            function(query)
+
+    workers = [threading.Thread(target=work, args=(QUERIES[index::threads], ))
+               for index in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def throughput(benchmark, function, threads):
+    """Benchmark the function and store the number of queries per second."""
+    build_valid_keywords_grammar()
+    benchmark(run_threads, function, threads)
+    info = benchmark.extra_info
+    info['inputs'] = len(QUERIES)
+    info['threads'] = threads
+    stats = getattr(benchmark, 'stats', None)
+    if stats is not None and stats.stats.mean:
+        info['inputs_per_second'] = len(QUERIES) / stats.stats.mean
+
+
+@threads
+def test_threads_pypeg2(benchmark, threads):
+    """Parse and convert queries to Elastic Search DSL with pypeg2."""
+    throughput(benchmark, invenio_query_factory(), threads)
+
+
+@threads
+def test_threads_fast(benchmark, threads):
+    """Parse and convert queries to Elastic Search DSL with the fast parser."""
+    throughput(benchmark, invenio_query_factory(engine='fast'), threads)
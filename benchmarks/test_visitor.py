@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio-Query-Parser.
+# Copyright (C) 2016 CERN.
+#
+# Invenio-Query-Parser is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio-Query-Parser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Benchmark the overhead of visitor dispatch on a 10k node tree."""
+
+from invenio_query_parser.ast import AndList, Keyword, KeywordOp, NotOp, \
+    OrList, Value
+from invenio_query_parser.fast_parser import FastParser
+from invenio_query_parser.visitor import accept, compile_walker, make_visitor
+
+QUERY = ' OR '.join('(title:higgs%d AND NOT author:ellis%d)' % (index, index)
+                    for index in range(1250))
+"""Query of 10001 nodes once the boolean chains are flattened."""
+
+TREE = FastParser(flatten=True).parse(QUERY)
+
+
+class Plain(object):
+    """Visitor without dispatch, as baseline."""
+
+    def visit(self, node, *children):
+        """Do nothing."""
+
+
+class Dispatch(object):
+    """Visitor dispatching on the node types."""
+
+    visitor = make_visitor()
+
+    # pylint: disable=W0613,E0102
+
+    @visitor(AndList)
+    def visit(self, node, children):
+        pass
+
+    @visitor(OrList)
+    def visit(self, node, children):
+        pass
+
+    @visitor(NotOp)
+    def visit(self, node, op):
+        pass
+
+    @visitor(KeywordOp)
+    def visit(self, node, left, right):
+        pass
+
+    @visitor(Keyword)
+    def visit(self, node):
+        pass
+
+    @visitor(Value)
+    def visit(self, node):
+        pass
+
+    # pylint: enable=W0612,E0102
+
+
+def test_visit_plain(benchmark):
+    """Walk the tree calling the same method for every node."""
+    benchmark(accept, TREE, Plain())
+
+
+def test_visit_dispatch(benchmark):
+    """Walk the tree dispatching on the type of every node."""
+    benchmark(accept, TREE, Dispatch())
+
+
+def test_visit_dispatch_recursive(benchmark):
+    """Walk the tree with the accept methods of the nodes."""
+    benchmark(TREE.accept, Dispatch())
+
+
+def test_visit_compiled(benchmark):
+    """Walk the tree with the compiled walker of the visitor."""
+    benchmark(compile_walker(Dispatch), TREE, Dispatch())
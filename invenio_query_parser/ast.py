@@ -21,10 +21,239 @@
 # granted to it by virtue of its status as an Intergovernmental Organization
 # or submit itself to any jurisdiction.
 
-"""Define abstract classes."""
+"""Define abstract classes.
+
+Nodes store their attributes in slots and have no instance dictionary.
+Equal trees have the same hash, so trees can be used as dictionary keys,
+and they are pickled as a flat list of their nodes.
+"""
+
+
+def _new_node(cls, *values):
+    node = cls.__new__(cls)
+    for name, value in zip(cls._fields, values):
+        setattr(node, name, value)
+    return node
+
+
+_VALUE, _LEAF, _UNARY, _BINARY, _LIST = range(5)
+"""Kinds of operands of the nodes; values are not nodes."""
+
+_EMIT = object()
+"""Marker of the nodes whose children are dumped."""
+
+_SHARED, _ATTRIBUTES = range(2)
+"""Markers of the records of shared nodes and of attributes of nodes."""
+
+
+def _operands(node):
+    kind = node._kind
+    if kind == _BINARY:
+        return node.left, node.right
+    if kind == _UNARY:
+        return node.op,
+    if kind == _LIST:
+        return node.children
+    return ()
+
+
+def _dump_nodes(root):
+    # postfix list of pairs: the class of a node followed by the value of a
+    # leaf or the number of children of a list, or a marker followed by a
+    # value which is not a node, the position of a shared node or
+    # attributes of the previous node
+    records = []
+    append = records.append
+    positions = {}
+    stack = [root]
+    pop = stack.pop
+    push = stack.append
+    while stack:
+        node = pop()
+        if node is _EMIT:
+            node = pop()
+            append(type(node))
+            append(len(node.children) if node._kind == _LIST else None)
+        elif not isinstance(node, Node):
+            append(None)
+            append(node)
+            continue
+        elif id(node) in positions:
+            append(_SHARED)
+            append(positions[id(node)])
+            continue
+        elif node._kind == _LEAF:
+            append(type(node))
+            append(node.value)
+        else:
+            push(node)
+            push(_EMIT)
+            kind = node._kind
+            if kind == _BINARY:
+                push(node.right)
+                push(node.left)
+            elif kind == _UNARY:
+                push(node.op)
+            else:
+                stack.extend(reversed(node.children))
+            continue
+        positions[id(node)] = len(records) // 2 - 1
+        if type(node).__dictoffset__ and node.__dict__:
+            append(_ATTRIBUTES)
+            append(node.__dict__)
+    return records
+
+
+def _load_nodes(records):
+    built = []
+    stack = []
+    for index in range(0, len(records), 2):
+        cls, payload = records[index], records[index + 1]
+        if cls is None:
+            node = payload
+        elif type(cls) is int:
+            if cls == _ATTRIBUTES:
+                stack[-1].__dict__.update(payload)
+                built.append(None)
+                continue
+            node = built[payload]
+        else:
+            node = cls.__new__(cls)
+            kind = cls._kind
+            if kind == _LEAF:
+                node.value = payload
+            elif kind == _BINARY:
+                node.right = stack.pop()
+                node.left = stack.pop()
+            elif kind == _UNARY:
+                node.op = stack.pop()
+            else:
+                start = len(stack) - payload
+                node.children = stack[start:]
+                del stack[start:]
+        built.append(node)
+        stack.append(node)
+    return stack[0]
+
+
+class Node(object):
+    """Base class of the AST nodes.
+
+    Comparing, hashing, printing and pickling nodes walk their subtree
+    without recursion, so they work on trees of any depth.
+    """
+
+    __slots__ = ()
+
+    _fields = ()
+    """Names of the attributes given to :func:`_new_node`."""
+
+    _kind = _VALUE
+    """Kind of the operands of the node."""
+
+    def _attributes(self):
+        # attributes of subclasses without slots
+        if type(self).__dictoffset__:
+            return self.__dict__ or None
 
+    def __eq__(self, other):
+        stack = [(self, other)]
+        while stack:
+            first, second = stack.pop()
+            if first is second:
+                continue
+            if not isinstance(first, Node):
+                if first != second:
+                    return False
+                continue
+            if type(first) is not type(second):
+                return False
+            kind = first._kind
+            if kind == _LEAF:
+                if first.value != second.value:
+                    return False
+            elif kind == _BINARY:
+                stack.append((first.right, second.right))
+                stack.append((first.left, second.left))
+            elif kind == _UNARY:
+                stack.append((first.op, second.op))
+            elif len(first.children) != len(second.children):
+                return False
+            else:
+                stack.extend(zip(first.children, second.children))
+        return True
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        # hash of the types, leaf values and list sizes in prefix order
+        items = []
+        append = items.append
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if not isinstance(node, Node):
+                append(node)
+                continue
+            append(type(node))
+            kind = node._kind
+            if kind == _LEAF:
+                append(node.value)
+            elif kind == _BINARY:
+                stack.append(node.right)
+                stack.append(node.left)
+            elif kind == _UNARY:
+                stack.append(node.op)
+            else:
+                append(len(node.children))
+                stack.extend(node.children)
+        return hash(tuple(items))
 
-class BinaryOp(object):
+    def __repr__(self):
+        # the stack holds nodes, values and text pieces marked by a tuple
+        parts = []
+        append = parts.append
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if type(node) is tuple:
+                append(node[0])
+            elif not isinstance(node, Node):
+                append(repr(node))
+            elif node._kind == _LEAF:
+                append('%s(%r)' % (type(node).__name__, node.value))
+            elif node._kind == _LIST and not isinstance(node.children, list):
+                append('%s(%r)' % (type(node).__name__, node.children))
+            else:
+                is_list = node._kind == _LIST
+                append(type(node).__name__ + ('([' if is_list else '('))
+                stack.append(('])', ) if is_list else (')', ))
+                operands = _operands(node)
+                for index in range(len(operands) - 1, 0, -1):
+                    stack.append(operands[index])
+                    stack.append((', ', ))
+                if operands:
+                    stack.append(operands[0])
+        return ''.join(parts)
+
+    def __copy__(self):
+        node = _new_node(type(self), *[getattr(self, name)
+                                       for name in self._fields])
+        attributes = self._attributes()
+        if attributes:
+            node.__dict__.update(attributes)
+        return node
+
+    def __reduce__(self):
+        return _load_nodes, (_dump_nodes(self), )
+
+
+class BinaryOp(Node):
+
+    __slots__ = ('left', 'right')
+    _fields = __slots__
+    _kind = _BINARY
 
     def __init__(self, left, right):
         self.left = left
@@ -35,21 +264,12 @@ class BinaryOp(object):
                              self.left.accept(visitor),
                              self.right.accept(visitor))
 
-    def __eq__(self, other):
-        return (
-            type(self) == type(other)
-        ) and (
-            self.left == other.left
-        ) and (
-            self.right == other.right
-        )
 
-    def __repr__(self):
-        return "%s(%s, %s)" % (self.__class__.__name__,
-                               repr(self.left), repr(self.right))
+class UnaryOp(Node):
 
-
-class UnaryOp(object):
+    __slots__ = ('op', )
+    _fields = __slots__
+    _kind = _UNARY
 
     def __init__(self, op):
         self.op = op
@@ -57,14 +277,12 @@ class UnaryOp(object):
     def accept(self, visitor):
         return visitor.visit(self, self.op.accept(visitor))
 
-    def __eq__(self, other):
-        return type(self) == type(other) and self.op == other.op
 
-    def __repr__(self):
-        return "%s(%s)" % (self.__class__.__name__, repr(self.op))
+class ListOp(Node):
 
-
-class ListOp(object):
+    __slots__ = ('children', )
+    _fields = __slots__
+    _kind = _LIST
 
     def __init__(self, children):
         try:
@@ -77,14 +295,12 @@ class ListOp(object):
     def accept(self, visitor):
         return visitor.visit(self, [c.accept(visitor) for c in self.children])
 
-    def __eq__(self, other):
-        return type(self) == type(other) and self.op == other.op
-
-    def __repr__(self):
-        return "%s(%s)" % (self.__class__.__name__, repr(self.children))
 
+class Leaf(Node):
 
-class Leaf(object):
+    __slots__ = ('value', )
+    _fields = __slots__
+    _kind = _LEAF
 
     def __init__(self, value):
         self.value = value
@@ -92,16 +308,13 @@ class Leaf(object):
     def accept(self, visitor):
         return visitor.visit(self)
 
-    def __eq__(self, other):
-        return type(self) == type(other) and self.value == other.value
-
-    def __repr__(self):
-        return '%s(%s)' % (self.__class__.__name__, repr(self.value))
-
 
 # Concrete classes
 
 class BinaryKeywordBase(BinaryOp):
+
+    __slots__ = ()
+
     @property
     def keyword(self):
         # FIXME evaluate if it's possible to move it out to spires module
@@ -115,70 +328,127 @@ class BinaryKeywordBase(BinaryOp):
 
 
 class AndOp(BinaryKeywordBase):
-    pass
+    __slots__ = ()
 
 
 class OrOp(BinaryKeywordBase):
-    pass
+    __slots__ = ()
+
+
+class BooleanListOp(ListOp):
+
+    __slots__ = ()
+
+    @property
+    def keyword(self):
+        # same as the keyword of the equivalent left-deep binary tree
+        from .contrib.spires.ast import SpiresOp
+        if len(self.children) == 2 and isinstance(self.children[0], SpiresOp):
+            return self.children[0].keyword
+        return None
+
+
+class AndList(BooleanListOp):
+    __slots__ = ()
+
+
+class OrList(BooleanListOp):
+    __slots__ = ()
+
+
+BOOLEAN_LISTS = {AndOp: AndList, OrOp: OrList}
+"""List node replacing chains of a binary boolean operator."""
+
+
+def flatten(op, left, right):
+    """Return ``op(left, right)`` as a list node with nested lists merged.
+
+    The ``left`` operand is extended in place if it is already a list of
+    the same operator.
+    """
+    list_op = BOOLEAN_LISTS[op]
+    tree = left if type(left) is list_op else list_op([left])
+    if type(right) is list_op:
+        tree.children.extend(right.children)
+    else:
+        tree.children.append(right)
+    return tree
 
 
 class NotOp(UnaryOp):
+
+    __slots__ = ()
+
     @property
     def keyword(self):
         return getattr(self.op, 'keyword')
 
 
 class RangeOp(BinaryOp):
-    pass
+    __slots__ = ()
 
 
 class LowerOp(UnaryOp):
-    pass
+    __slots__ = ()
 
 
 class LowerEqualOp(UnaryOp):
-    pass
+    __slots__ = ()
 
 
 class GreaterOp(UnaryOp):
-    pass
+    __slots__ = ()
 
 
 class GreaterEqualOp(UnaryOp):
-    pass
+    __slots__ = ()
 
 
 class KeywordOp(BinaryOp):
-    pass
+    __slots__ = ()
 
 
 class NestedKeywordsRule(BinaryOp):
-    pass
+    __slots__ = ()
 
 
 class ValueQuery(UnaryOp):
-    pass
+    __slots__ = ()
 
 
 class Keyword(Leaf):
-    pass
+    __slots__ = ()
+
+
+class PatternLeaf(Leaf):
+
+    __slots__ = ('_pattern', )
+
+    @property
+    def pattern(self):
+        """Return the value compiled as regular expression."""
+        pattern = getattr(self, '_pattern', None)
+        if pattern is None or pattern.pattern != self.value:
+            from .cache import compile_pattern
+            pattern = self._pattern = compile_pattern(self.value)
+        return pattern
 
 
-class Value(Leaf):
-    pass
+class Value(PatternLeaf):
+    __slots__ = ()
 
 
-class SingleQuotedValue(Leaf):
-    pass
+class SingleQuotedValue(PatternLeaf):
+    __slots__ = ()
 
 
 class DoubleQuotedValue(Leaf):
-    pass
+    __slots__ = ()
 
 
-class RegexValue(Leaf):
-    pass
+class RegexValue(PatternLeaf):
+    __slots__ = ()
 
 
 class EmptyQuery(Leaf):
-    pass
+    __slots__ = ()
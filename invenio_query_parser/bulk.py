@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio-Query-Parser.
+# Copyright (C) 2016 CERN.
+#
+# Invenio-Query-Parser is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio-Query-Parser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Parse large numbers of queries with a pool of processes.
+
+>>> from invenio_query_parser.bulk import parse_many
+>>> for result in parse_many(['title:higgs', 'title:(higgs'], workers=0):
+...     print(result.index, result.tree, type(result.error).__name__)
+0 ('Keyword', 'title', 'Value', 'higgs', 'KeywordOp') NoneType
+1 None SyntaxError
+"""
+
+from __future__ import absolute_import, print_function
+
+import multiprocessing
+import pickle
+import threading
+from collections import namedtuple
+from itertools import islice
+
+from .query_parser import QueryParser
+from .serialize import dump_tree, load_tree
+
+ParseResult = namedtuple('ParseResult', ('index', 'query', 'tree', 'error'))
+"""Result of parsing the query at the index of the input.
+
+Either the ``tree`` or the ``error`` raised by the parser is ``None``.
+"""
+
+_parser = None
+"""Parser of the current worker process."""
+
+
+def _init_worker(parser):
+    global _parser
+    _parser = parser
+
+
+def _parse_chunk(chunk, parser=None):
+    parse = parser or _parser
+    results = []
+    for index, query in chunk:
+        try:
+            results.append(ParseResult(index, query, dump_tree(parse(query)),
+                                       None))
+        except Exception as error:  # pylint: disable=W0703
+            results.append(ParseResult(index, query, None, error))
+    return results
+
+
+def _encode(result):
+    try:
+        return pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+    except Exception as error:  # pylint: disable=W0703
+        # the error may be the one which can not be pickled
+        error = pickle.PicklingError(
+            'Result can not be pickled: %s' % (type(error).__name__, ))
+        return pickle.dumps(result._replace(tree=None, error=error),
+                            pickle.HIGHEST_PROTOCOL)
+
+
+def _encode_chunk(chunk):
+    # a result which can not be pickled would kill the worker and the
+    # pool would wait for it forever
+    return [_encode(result) for result in _parse_chunk(chunk)]
+
+
+def _chunks(queries, chunksize):
+    iterator = enumerate(queries)
+    while True:
+        chunk = list(islice(iterator, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+def parse_many(queries, workers=None, chunksize=512, ordered=True,
+               compact=True, parser=None):
+    """Parse queries in worker processes and yield a result for each one.
+
+    Queries are read lazily and sent to the workers in chunks; at most a
+    few chunks per worker are in flight, so very long inputs such as
+    query logs do not fill the memory.  A new chunk is sent as soon as the
+    results of a chunk are yielded, without waiting for slower chunks.
+    Errors raised by the parser, or when sending a result back from a
+    worker, are reported in the result of the query and the batch goes on.
+
+    :param queries: iterable of query strings.
+    :param workers: number of processes, by default the number of CPUs;
+        with ``0`` the queries are parsed in the current process.
+    :param chunksize: number of queries sent to a worker at once.
+    :param ordered: yield results in the order of the queries, otherwise
+        as soon as a chunk is parsed; use the ``index`` of the results to
+        match them with the queries.
+    :param compact: yield trees as flat tuples of
+        :func:`~invenio_query_parser.serialize.dump_tree` instead of AST.
+    :param parser: picklable function returning the AST of a query, by
+        default :class:`~invenio_query_parser.query_parser.QueryParser`.
+    :return: iterator of :data:`ParseResult`.
+    """
+    parser = parser or QueryParser()
+    chunks = _chunks(queries, chunksize)
+
+    if workers == 0:
+        batches = (_parse_chunk(chunk, parser) for chunk in chunks)
+        return _results(batches, compact)
+
+    lookahead = threading.Semaphore(
+        4 * (workers or multiprocessing.cpu_count()))
+    stopped = threading.Event()
+
+    def pending():
+        # run by the task thread of the pool, which blocks once enough
+        # chunks are in flight
+        for chunk in chunks:
+            lookahead.acquire()
+            if stopped.is_set():
+                return
+            yield chunk
+
+    def batches():
+        pool = multiprocessing.Pool(workers, _init_worker, (parser, ))
+        imap = pool.imap if ordered else pool.imap_unordered
+        try:
+            for batch in imap(_encode_chunk, pending()):
+                lookahead.release()
+                yield [pickle.loads(result) for result in batch]
+            pool.close()
+        finally:
+            stopped.set()
+            lookahead.release()
+            pool.terminate()
+            pool.join()
+
+    return _results(batches(), compact)
+
+
+def _results(batches, compact):
+    for batch in batches:
+        for result in batch:
+            if not compact and result.tree is not None:
+                result = result._replace(tree=load_tree(result.tree))
+            yield result
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio-Query-Parser.
+# Copyright (C) 2016 CERN.
+#
+# Invenio-Query-Parser is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio-Query-Parser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Bounded caches of parsed queries and compiled search patterns.
+
+>>> from invenio_query_parser.cache import ParseCache
+>>> from invenio_query_parser.fast_parser import FastParser
+>>> cache = ParseCache(maxsize=2)
+>>> cache.get('foo:bar', FastParser().parse)
+KeywordOp(Keyword('foo'), Value('bar'))
+>>> cache.get('  foo:bar ', FastParser().parse)
+KeywordOp(Keyword('foo'), Value('bar'))
+>>> cache.info()
+CacheInfo(hits=1, misses=1, evictions=0, maxsize=2, currsize=1)
+"""
+
+from __future__ import absolute_import
+
+import copy
+import re
+import threading
+from collections import OrderedDict, namedtuple
+
+from . import ast
+from .visitor import accept
+
+CacheInfo = namedtuple(
+    'CacheInfo', ('hits', 'misses', 'evictions', 'maxsize', 'currsize'))
+
+
+def normalize_query(query):
+    """Strip surrounding whitespace from non empty queries.
+
+    Whitespace inside the query is kept as it is significant in quoted
+    values, and so is the whitespace of an empty query.
+    """
+    return query.strip() or query
+
+
+class _TreeCopier(object):
+
+    def visit(self, node, *children):
+        new = copy.copy(node)
+        if isinstance(node, ast.BinaryOp):
+            new.left, new.right = children
+        elif isinstance(node, ast.UnaryOp):
+            new.op, = children
+        elif isinstance(node, ast.ListOp):
+            new.children, = children
+        return new
+
+
+def copy_tree(node):
+    """Return a copy of the AST which shares no nodes with the original."""
+    if node is None:
+        return None
+    return accept(node, _TreeCopier())
+
+
+class ParseCache(object):
+    """Cache trees returned by a parse function.
+
+    Entries are indexed by the normalized query and by a grammar key which
+    identifies the active keyword grammar.  Every tree leaving the cache is
+    a copy so walkers mutating it do not alter cached entries.
+
+    :param maxsize: maximum number of cached trees.
+    :param policy: ``'lru'`` evicts the least recently used tree, ``'fifo'``
+        evicts the oldest inserted tree.
+    :param normalize: function returning the cache key of a query; it is
+        also the string given to the parse function.
+    :param copy: function copying a tree on its way out of the cache.
+    """
+
+    policies = ('lru', 'fifo')
+
+    def __init__(self, maxsize=1024, policy='lru', normalize=normalize_query,
+                 copy=copy_tree):
+        """Initialize empty cache."""
+        if policy not in self.policies:
+            raise ValueError('Unknown eviction policy %r.' % (policy, ))
+        if maxsize < 1:
+            raise ValueError('Cache size must be positive.')
+        self.maxsize = maxsize
+        self.policy = policy
+        self.normalize = normalize
+        self.copy = copy
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Remove all entries and reset counters."""
+        with self._lock:
+            self._trees = OrderedDict()
+            self.hits = self.misses = self.evictions = 0
+
+    def info(self):
+        """Return hit, miss and eviction counters."""
+        return CacheInfo(self.hits, self.misses, self.evictions,
+                         self.maxsize, len(self._trees))
+
+    def get(self, query, parse, grammar=None):
+        """Return tree for the query parsing it only on a cache miss."""
+        query = self.normalize(query)
+        key = (grammar, query)
+
+        with self._lock:
+            tree = self._trees.get(key)
+            if tree is not None:
+                self.hits += 1
+                if self.policy == 'lru':
+                    del self._trees[key]
+                    self._trees[key] = tree
+                return self.copy(tree)
+            self.misses += 1
+
+        tree = parse(query)
+        self._store(key, tree)
+        return self.copy(tree)
+
+    def put(self, query, tree, grammar=None):
+        """Store tree of the query without counting a miss."""
+        self._store((grammar, self.normalize(query)), tree)
+
+    def _store(self, key, tree):
+        with self._lock:
+            self._trees[key] = tree
+            while len(self._trees) > self.maxsize:
+                self._trees.popitem(last=False)
+                self.evictions += 1
+
+
+def _identity(value):
+    return value
+
+
+PATTERNS = ParseCache(maxsize=1024, normalize=_identity, copy=_identity)
+"""Compiled search patterns independent of the :mod:`re` module cache.
+
+Change ``PATTERNS.maxsize`` to resize it.
+"""
+
+
+def compile_pattern(pattern):
+    """Return compiled regular expression from the bounded pattern cache."""
+    return PATTERNS.get(pattern, re.compile)
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio-Query-Parser.
+# Copyright (C) 2016 CERN.
+#
+# Invenio-Query-Parser is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio-Query-Parser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Evaluate queries over batches of records stored column-wise.
+
+A batch maps every top level field to a column with one value per record,
+e.g. a :mod:`numpy` array or a list.  Matching returns a boolean array with
+one item per record:
+
+>>> from invenio_query_parser.contrib.batch import match_batch
+>>> from invenio_query_parser.fast_parser import FastParser
+>>> batch = {'title': ['Higgs', 'Quarks', 'Higgs boson'],
+...          'year': ['2012', '1995', '2013']}
+>>> match_batch(FastParser().parse('title:Higgs AND year:2010->2020'), batch)
+array([ True, False,  True])
+"""
+
+from __future__ import absolute_import
+
+from .walkers.match_unit import BatchMatchUnit
+
+
+def match_batch(tree, batch, **kwargs):
+    """Return boolean mask of records in the batch matching the tree."""
+    return tree.accept(BatchMatchUnit(batch, **kwargs))
+
+
+__all__ = ('BatchMatchUnit', 'match_batch')
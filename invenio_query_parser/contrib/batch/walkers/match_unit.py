@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio-Query-Parser.
+# Copyright (C) 2016 CERN.
+#
+# Invenio-Query-Parser is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio-Query-Parser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Match queries against columns of records with :mod:`numpy`."""
+
+from __future__ import absolute_import
+
+import numpy
+import six
+
+from invenio_query_parser.ast import EmptyQuery, KeywordOp, NotOp, ValueQuery
+from invenio_query_parser.visitor import make_visitor
+from invenio_query_parser.walkers.match_unit import MatchUnit, build_matcher, \
+    getitem_path, search_value
+
+
+def column_getitem(batch, dottable_key, default=None):
+    """Return column addressed by a key with dots.
+
+    The first key selects a column of the batch and the remaining keys are
+    looked up in every value of the column as in ``dottable_getitem``.
+    """
+    keys = dottable_key.split('.')
+    column = batch.get(keys[0], default)
+    if column is None or len(keys) == 1:
+        return column
+    return [getitem_path(value, keys[1:], default) for value in column]
+
+
+def column_mask(column, p, m='a'):
+    """Return boolean array matching every value of the column.
+
+    Unicode arrays are compared in a single vectorized operation for exact
+    and range searches.  Other searches are evaluated once per distinct
+    value of the column.
+    """
+    if isinstance(column, numpy.ndarray) and column.dtype.kind != 'O':
+        if column.dtype.kind == 'U':
+            if isinstance(p, tuple):
+                left, right = p
+                return (left <= column) & (column <= right)
+            if m == 'e':
+                return column == search_value(p, m)
+
+        matcher = build_matcher(p, m)
+        values, inverse = numpy.unique(column, return_inverse=True)
+        return numpy.fromiter(
+            (matcher(value) for value in values), bool, len(values)
+        )[inverse]
+
+    matcher = build_matcher(p, m)
+    mask = numpy.empty(len(column), dtype=bool)
+    results = {}
+    for index, value in enumerate(column):
+        # values like ``1`` and ``True`` are equal but not the same text
+        key = (type(value), value)
+        try:
+            mask[index] = results[key]
+        except KeyError:
+            mask[index] = results[key] = matcher(value)
+        except TypeError:
+            mask[index] = matcher(value)
+    return mask
+
+
+class BatchMatchUnit(MatchUnit):
+    """Match all records of a batch at once.
+
+    Operators combine boolean arrays instead of booleans, so the whole tree
+    is always evaluated and :meth:`match` is the same as ``accept``.
+
+    :param batch: mapping of top level fields to columns of equal length.
+    :param getitem: function returning a column for a keyword.
+    :param size: number of records, by default the length of a column.
+    """
+
+    visitor = make_visitor(MatchUnit.visitor)
+
+    def __init__(self, batch, getitem=column_getitem, size=None):
+        """Initialize matching unit with columns of the batch."""
+        super(BatchMatchUnit, self).__init__(batch, getitem=getitem)
+        if size is None:
+            size = len(next(six.itervalues(batch))) if batch else 0
+        self.size = size
+
+    def match(self, node):
+        """Return boolean mask of records matching the tree."""
+        return node.accept(self)
+
+    # pylint: disable=W0613,E0102
+
+    @visitor(NotOp)
+    def visit(self, node, op):
+        return ~op
+
+    @visitor(KeywordOp)
+    def visit(self, node, left, right):
+        column = self.getitem(self.data, left)
+        if column is None:
+            return numpy.zeros(self.size, dtype=bool)
+        return column_mask(column, **right)
+
+    @visitor(ValueQuery)
+    def visit(self, node, op):
+        mask = numpy.zeros(self.size, dtype=bool)
+        for column in six.itervalues(self.data):
+            mask |= column_mask(column, **op)
+        return mask
+
+    @visitor(EmptyQuery)
+    def visit(self, node):
+        return numpy.ones(self.size, dtype=bool)
+
+    # pylint: enable=W0612,E0102
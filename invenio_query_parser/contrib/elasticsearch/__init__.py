@@ -21,30 +21,174 @@
 # granted to it by virtue of its status as an Intergovernmental Organization
 # or submit itself to any jurisdiction.
 
-"""Implement query convertor to Elastic Search DSL."""
+"""Implement query convertor to Elastic Search DSL.
 
-import pypeg2
+The *pypeg2* grammar and ``elasticsearch_dsl`` are imported when the first
+parser using them is created, so importing this module is cheap.
+"""
 
-from invenio_query_parser.walkers.pypeg_to_ast import PypegConverter
-from invenio_query_parser.parser import Main
+import copy
+import json
+
+from invenio_query_parser.fast_parser import FastParser
+from invenio_query_parser.utils import get_keywords_grammar_key
+from invenio_query_parser.visitor import accept
 
 from .walkers.dsl import ElasticSearchDSL
 
+OUTPUTS = ('query', 'dict', 'json')
+"""Outputs of the parsers created by :func:`invenio_query_factory`."""
+
+
+def dump_json(query):
+    """Return UTF-8 encoded JSON of raw Elastic Search DSL."""
+    return json.dumps(query, separators=(',', ':')).encode('utf-8')
+
+
+def _encode_json(invenio_query):
+    def encoded(pattern):
+        return dump_json(invenio_query(pattern))
+    encoded.__dict__.update(invenio_query.__dict__)
+    return encoded
+
+
+def _parse_pypeg2(parser):
+    import pypeg2
+
+    def parse(pattern):
+        return pypeg2.parse(pattern, parser, whitespace="")
+    return parse
+
+
+def invenio_query_factory(parser=None, walkers=None, engine='pypeg2',
+                          cache=None, flatten=False, dsl=None,
+                          interner=None, fused=False, output='query'):
+    """Create a parser returning Elastic Search DSL query instance.
+
+    The ``'pypeg2'`` engine parses queries with the *pypeg2* grammar
+    ``parser`` and converts the parse tree to AST with ``walkers``.  The
+    ``'fast'`` engine uses ``parser`` (by default
+    :class:`~invenio_query_parser.fast_parser.FastParser`) which returns the
+    AST directly, hence ``walkers`` only contains AST walkers.  The
+    *pypeg2* grammar of keywords is shared by the process and changed by
+    :func:`~invenio_query_parser.utils.build_valid_keywords_grammar`, which
+    is not thread-safe; use the ``'fast'`` engine with a
+    :class:`~invenio_query_parser.query_parser.QueryParser` to parse with
+    different keywords from several threads.
+
+    An optional :class:`~invenio_query_parser.cache.ParseCache` stores the
+    trees returned by the last of ``walkers`` so repeated queries are only
+    transformed to Elastic Search DSL.
+
+    With ``flatten`` the default parser or converter joins chains of the
+    same boolean operator, which produces flat ``bool`` queries.  The
+    ``dsl`` walker, by default :class:`.walkers.dsl.ElasticSearchDSL`,
+    converts the tree to Elastic Search DSL.  Its ``terms_threshold`` only
+    collapses terms of flattened trees.
+
+    An :class:`~invenio_query_parser.walkers.interner.Interner` shares the
+    identical subtrees of the trees given to ``dsl``, which then builds the
+    query of each unique subtree once.  The default ``dsl`` walker extends
+    the queries of chains of operators in place, see
+    :attr:`.walkers.dsl.ElasticSearchDSL.extend_in_place`, unless an
+    interner is given; a ``dsl`` walker doing so is then used through a
+    copy with the option disabled.
+
+    With ``fused`` the ``'pypeg2'`` parse tree is converted to Elastic
+    Search DSL in a single walk without building the AST.  The ``dsl``
+    walker, by default
+    :class:`.walkers.pypeg_to_dsl.PypegToElasticSearchDSL`, then visits
+    the *pypeg2* parse tree, and neither ``walkers``, ``cache`` nor
+    ``interner`` can be used.
 
-def invenio_query_factory(parser=None, walkers=None):
-    """Create a parser returning Elastic Search DSL query instance."""
-    parser = parser or Main
-    walkers = walkers or [PypegConverter()]
-    walkers.append(ElasticSearchDSL())
+    The ``output`` of the parser is an ``elasticsearch_dsl`` query for
+    ``'query'``.  For ``'dict'`` and ``'json'`` the default ``dsl`` walker
+    creates raw dictionaries directly, which the parser returns or
+    serializes to JSON bytes with :func:`dump_json`.
+    """
+    if output not in OUTPUTS:
+        raise ValueError('Unknown output %r.' % (output, ))
+    raw = output != 'query'
 
-    def invenio_query(pattern):
-        query = pypeg2.parse(pattern, parser, whitespace="")
+    if fused:
+        if engine != 'pypeg2' or walkers or cache is not None or \
+                interner is not None:
+            raise ValueError('Fused walker only converts pypeg2 trees.')
+        from invenio_query_parser.parser import Main
+
+        from .walkers.pypeg_to_dsl import PypegToElasticSearchDSL
+
+        parse = _parse_pypeg2(parser or Main)
+        if dsl is None:
+            dsl = PypegToElasticSearchDSL(raw=raw, flatten=flatten)
+            dsl.extend_in_place = True
+
+        def invenio_query(pattern):
+            return accept(parse(pattern), dsl)
+        return _encode_json(invenio_query) if output == 'json' else \
+            invenio_query
+
+    if engine == 'pypeg2':
+        from invenio_query_parser.parser import Main
+        from invenio_query_parser.walkers.pypeg_to_ast import PypegConverter
+
+        parser = parser or Main
+        walkers = walkers or [PypegConverter(flatten=flatten)]
+        parse = _parse_pypeg2(parser)
+
+        def grammar():
+            return parser, get_keywords_grammar_key()
+    elif engine == 'fast':
+        parser = parser or FastParser(flatten=flatten)
+        parse = parser.parse
+        walkers = walkers or []
+
+        def grammar():
+            return parser
+    else:
+        raise ValueError('Unknown parsing engine %r.' % (engine, ))
+    if dsl is None:
+        dsl = ElasticSearchDSL(raw=raw)
+        dsl.extend_in_place = interner is None
+    elif interner is not None and getattr(dsl, 'extend_in_place', False):
+        dsl = copy.copy(dsl)
+        dsl.extend_in_place = False
+
+    def walk(pattern):
+        query = parse(pattern)
         for walker in walkers:
-            query = query.accept(walker)
+            query = accept(query, walker)
         return query
-    return invenio_query
+
+    def to_dsl(tree):
+        if interner is None:
+            return accept(tree, dsl)
+        return accept(interner(tree), dsl, memoize=True)
+
+    if cache is None:
+        def invenio_query(pattern):
+            return to_dsl(walk(pattern))
+    else:
+        def invenio_query(pattern):
+            return to_dsl(cache.get(pattern, walk, grammar()))
+        invenio_query.cache = cache
+    return _encode_json(invenio_query) if output == 'json' else invenio_query
+
+
+class _LazyQuery(object):
+    """Parser created by :func:`invenio_query_factory` on first use."""
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.query = None
+
+    def __call__(self, pattern):
+        if self.query is None:
+            self.query = invenio_query_factory(**self.kwargs)
+        return self.query(pattern)
 
 
-IQ = invenio_query_factory()
+IQ = _LazyQuery()
+"""Parser with the default options of :func:`invenio_query_factory`."""
 
-__all__ = ('IQ', 'invenio_query_factory')
+__all__ = ('IQ', 'dump_json', 'invenio_query_factory')
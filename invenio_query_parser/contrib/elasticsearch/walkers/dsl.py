@@ -23,25 +23,64 @@
 
 """Implement AST convertor to Elastic Search DSL."""
 
+from collections import OrderedDict
 from functools import reduce
-from operator import and_, or_
 
-from elasticsearch_dsl import Q
-
-from invenio_query_parser.ast import AndOp, DoubleQuotedValue, EmptyQuery, \
-    GreaterEqualOp, GreaterOp, Keyword, KeywordOp, LowerEqualOp, LowerOp, \
-    NotOp, OrOp, RangeOp, RegexValue, SingleQuotedValue, Value, ValueQuery
+from invenio_query_parser.ast import AndList, AndOp, DoubleQuotedValue, \
+    EmptyQuery, GreaterEqualOp, GreaterOp, Keyword, KeywordOp, LowerEqualOp, \
+    LowerOp, NotOp, OrList, OrOp, RangeOp, RegexValue, SingleQuotedValue, \
+    Value, ValueQuery
 from invenio_query_parser.visitor import make_visitor
 
+RAW_AND_CLAUSES = frozenset(('must', 'must_not'))
+"""Clauses of raw ``bool`` queries merged by :meth:`~.and_query`."""
+
+RAW_OR_CLAUSES = frozenset(('should', ))
+"""Clauses of raw ``bool`` queries merged by :meth:`~.or_query`."""
+
 
 class ElasticSearchDSL(object):
     """Implement visitor to create Elastic Search DSL."""
 
     visitor = make_visitor()
 
-    def __init__(self, keyword_to_fields=None):
-        """Provide a dictinary mapping from keywords to Elastic field(s)."""
+    terms_modes = {Value: 'a', DoubleQuotedValue: 'p'}
+    """Field mode of values which can be collapsed to a ``terms`` query."""
+
+    extend_in_place = False
+    """Extend the query of the left operand of chains of operators in place.
+
+    A chain of operations then takes linear time instead of quadratic.  Only
+    enable it when the result of every node is used once, i.e. not for trees
+    sharing subtrees walked by :func:`~invenio_query_parser.visitor.accept`
+    with ``memoize``.
+    """
+
+    def __init__(self, keyword_to_fields=None, terms_threshold=None,
+                 raw=False):
+        """Provide a dictinary mapping from keywords to Elastic field(s).
+
+        With ``terms_threshold`` the values of at least that many operands
+        of :class:`~invenio_query_parser.ast.OrList` searching the same
+        fields are collapsed to a single ``terms`` query, or ``ids`` query
+        for the ``_id`` field.  Only use it when the fields are not
+        analyzed, e.g. keyword or numeric fields.  As only lists are
+        collapsed, the trees must be flattened, e.g. by
+        :func:`~.invenio_query_factory` with ``flatten``; chains of
+        :class:`~invenio_query_parser.ast.OrOp` are left unchanged.
+
+        With ``raw`` the queries are plain dictionaries instead of
+        ``elasticsearch_dsl`` queries, see :meth:`query`, and
+        ``elasticsearch_dsl`` is not imported.
+        """
         self.keyword_to_fields = keyword_to_fields or {None: ['_all']}
+        self.terms_threshold = terms_threshold
+        self.raw = raw
+        if not raw:
+            from elasticsearch_dsl import Q
+            from elasticsearch_dsl.query import Bool
+            self._Q = Q
+            self._Bool = Bool
 
     def get_fields_for_keyword(self, keyword, mode='a'):
         """Convert keyword to fields."""
@@ -52,29 +91,237 @@ class ElasticSearchDSL(object):
             return field
         return [field]
 
+    def get_terms_fields(self, node):
+        """Return fields of keyword operation searching a term or None."""
+        if type(node) is KeywordOp and type(node.left) is Keyword:
+            mode = self.terms_modes.get(type(node.right))
+            if mode is not None:
+                fields = self.get_fields_for_keyword(
+                    node.left.value, mode=mode)
+                if fields:
+                    return tuple(fields)
+
+    def collapse_terms(self, nodes, queries):
+        """Replace queries searching terms of the same fields."""
+        terms = []
+        for node in nodes:
+            fields = self.get_terms_fields(node)
+            terms.append((fields, node.right.value) if fields else None)
+        return self.collapse_terms_values(terms, queries)
+
+    def collapse_terms_values(self, terms, queries):
+        """Replace queries searching terms of the same fields.
+
+        The ``terms`` list contains the fields and the value searched by
+        each query, or None for queries which can not be collapsed.
+        """
+        groups = OrderedDict()
+        for index, term in enumerate(terms):
+            if term:
+                groups.setdefault(term[0], []).append(index)
+
+        collapsed, removed = {}, set()
+        for fields, indexes in groups.items():
+            if len(indexes) >= self.terms_threshold:
+                values = list(OrderedDict.fromkeys(
+                    terms[index][1] for index in indexes))
+                collapsed[indexes[0]] = [
+                    self.query('ids', values=values) if field == '_id' else
+                    self.query('terms', **{field: values}) for field in fields
+                ]
+                removed.update(indexes[1:])
+
+        result = []
+        for index, query in enumerate(queries):
+            if index in collapsed:
+                result.extend(collapsed[index])
+            elif index not in removed:
+                result.append(query)
+        return result
+
+    def query(self, name, **params):
+        """Return query of the type with its parameters.
+
+        Raw queries are the dictionaries returned by ``to_dict()`` of the
+        ``elasticsearch_dsl`` queries, so no query object is created.
+        """
+        if self.raw:
+            return {name: params}
+        return self._Q(name, **params)
+
+    def and_query(self, left, right, extend=False):
+        """Return query matching both queries.
+
+        Raw queries without ``should`` clauses are merged, otherwise they
+        are nested in a new ``bool`` query.  With ``extend`` the left query
+        was created by this walker during the current walk and is not used
+        anywhere else, so its clauses are extended in place when possible.
+        """
+        extend = extend and left is not right
+        if not self.raw:
+            if extend and type(left) is self._Bool and \
+                    not isinstance(right, self._Bool):
+                # same as ``left & right`` without copying the left query
+                if not (left.must or left.filter) and left.should and \
+                        getattr(left, 'minimum_should_match', None) is None:
+                    left.minimum_should_match = 1
+                left.must.append(right)
+                return left
+            return left & right
+        if extend and self._raw_bool(left, RAW_AND_CLAUSES):
+            result, operands = left, (right, )
+        else:
+            result, operands = {'bool': {}}, (left, right)
+        clauses = result['bool']
+        for query in operands:
+            bool_query = query.get('bool')
+            if bool_query is not None and len(query) == 1 and \
+                    set(bool_query) <= RAW_AND_CLAUSES:
+                for clause, queries in bool_query.items():
+                    clauses.setdefault(clause, []).extend(queries)
+            else:
+                clauses.setdefault('must', []).append(query)
+        return result
+
+    def or_query(self, left, right, extend=False):
+        """Return query matching any of the queries.
+
+        The left query is extended in place with ``extend`` as in
+        :meth:`and_query`.
+        """
+        extend = extend and left is not right
+        if not self.raw:
+            if extend and self._should_only(left):
+                # same as ``left | right`` without copying the left query
+                if self._should_only(right):
+                    left.should.extend(right.should)
+                else:
+                    left.should.append(right)
+                return left
+            return left | right
+        if extend and self._raw_bool(left, RAW_OR_CLAUSES):
+            result, operands = left, (right, )
+        else:
+            result, operands = {'bool': {'should': []}}, (left, right)
+        should = result['bool']['should']
+        for query in operands:
+            bool_query = query.get('bool')
+            if bool_query is not None and len(query) == 1 and \
+                    list(bool_query) == ['should']:
+                should.extend(bool_query['should'])
+            else:
+                should.append(query)
+        return result
+
+    @staticmethod
+    def _raw_bool(query, clauses):
+        """Return whether raw query is ``bool`` query of the clauses."""
+        bool_query = query.get('bool')
+        return bool_query is not None and len(query) == 1 and \
+            bool(bool_query) and set(bool_query) <= clauses
+
+    def _should_only(self, query):
+        """Return whether ``bool`` query only has ``should`` clauses."""
+        return isinstance(query, self._Bool) and not (
+            query.must or query.must_not or query.filter or
+            getattr(query, 'minimum_should_match', None))
+
+    def not_query(self, query):
+        """Return query matching documents not matching the query."""
+        if not self.raw:
+            return ~query
+        bool_query = query.get('bool')
+        if bool_query is not None and len(query) == 1 and \
+                list(bool_query) == ['must_not'] and \
+                len(bool_query['must_not']) == 1:
+            return bool_query['must_not'][0]
+        return {'bool': {'must_not': [query]}}
+
+    def value_query(self, keyword, value):
+        """Return query searching the value in the fields of the keyword."""
+        fields = self.get_fields_for_keyword(keyword, mode='a')
+        return self.query('multi_match', query=value, fields=fields)
+
+    def phrase_query(self, keyword, value):
+        """Return query searching the phrase in the fields of the keyword."""
+        fields = self.get_fields_for_keyword(keyword, mode='p')
+        return self.query('multi_match', query=value, fields=fields,
+                          type='phrase')
+
+    def regex_query(self, keyword, value):
+        """Return query matching regular expression in keyword fields."""
+        fields = self.get_fields_for_keyword(keyword, mode='r')
+        if keyword is None or fields is None:
+            raise RuntimeError('Not supported regex search for all fields')
+        return reduce(self.or_query, [
+            self.query('regexp', **{k: value}) for k in fields
+        ])
+
+    def range_query(self, keyword, condition):
+        """Return query of the range condition in keyword fields."""
+        fields = self.get_fields_for_keyword(keyword, mode='r')
+        return reduce(self.or_query, [
+            self.query('range', **{k: condition}) for k in fields
+        ])
+
     # pylint: disable=W0613,E0102
 
     @visitor(AndOp)
     def visit(self, node, left, right):
-        return left & right
+        # the query of a left operand of the same type was created by
+        # and_query for this node only
+        extend = self.extend_in_place and type(node.left) is AndOp
+        return self.and_query(left, right, extend=extend)
 
     @visitor(OrOp)
     def visit(self, node, left, right):
-        return left | right
+        extend = self.extend_in_place and type(node.left) is OrOp
+        return self.or_query(left, right, extend=extend)
+
+    @visitor(AndList)
+    def visit(self, node, children):
+        return self.query('bool', must=children)
+
+    @visitor(OrList)
+    def visit(self, node, children):
+        if self.terms_threshold is not None:
+            children = self.collapse_terms(node.children, children)
+            if len(children) == 1:
+                return children[0]
+        return self.query('bool', should=children)
 
     @visitor(NotOp)
     def visit(self, node, op):
-        return ~op
+        return self.not_query(op)
+
+    def range_value(self, value):
+        """Return value searched by the result of a value visitor.
+
+        Values are visited to a query method and the value, or to a function
+        returning the query for a keyword.
+        """
+        if callable(value):
+            query = value(None)
+            if hasattr(query, 'to_dict'):
+                query = query.to_dict()
+            return query['multi_match']['query']
+        return value[1]
 
     @visitor(KeywordOp)
     def visit(self, node, left, right):
+        if type(right) is tuple:
+            query, value = right
+            return query(left, value)
         if callable(right):
             return right(left)
         raise RuntimeError('Not supported second level operation.')
 
     @visitor(ValueQuery)
     def visit(self, node, op):
-        return op(None)
+        if callable(op):
+            return op(None)
+        query, value = op
+        return query(None, value)
 
     @visitor(Keyword)
     def visit(self, node):
@@ -82,76 +329,44 @@ class ElasticSearchDSL(object):
 
     @visitor(Value)
     def visit(self, node):
-        def query(keyword):
-            fields = self.get_fields_for_keyword(keyword, mode='a')
-            return Q('multi_match', query=node.value, fields=fields)
-        return query
+        return self.value_query, node.value
 
     @visitor(SingleQuotedValue)
     def visit(self, node):
-        def query(keyword):
-            fields = self.get_fields_for_keyword(keyword, mode='p')
-            return Q('multi_match', query=node.value, fields=fields,
-                     type='phrase')
-        return query
+        return self.phrase_query, node.value
 
     @visitor(DoubleQuotedValue)
     def visit(self, node):
-        def query(keyword):
-            fields = self.get_fields_for_keyword(keyword, mode='p')
-            return Q('multi_match', query=node.value, fields=fields,
-                     type='phrase')
-        return query
+        return self.phrase_query, node.value
 
     @visitor(RegexValue)
     def visit(self, node):
-        def query(keyword):
-            fields = self.get_fields_for_keyword(keyword, mode='r')
-            if keyword is None or fields is None:
-                raise RuntimeError('Not supported regex search for all fields')
-            return reduce(or_, [
-                Q('regexp', **{k: node.value}) for k in fields
-            ])
-        return query
+        return self.regex_query, node.value
 
     @visitor(EmptyQuery)
     def visit(self, node):
-        return Q('match_all')
-
-    def _range_operators(self, node, condition):
-        def query(keyword):
-            fields = self.get_fields_for_keyword(keyword, mode='r')
-            return reduce(or_, [Q('range', **{k: condition}) for k in fields])
-        return query
+        return self.query('match_all')
 
     @visitor(RangeOp)
     def visit(self, node, left, right):
-        condition = {}
-        if left:
-            condition['gte'] = left(None).to_dict()['multi_match']['query']
-        if right:
-            condition['lte'] = right(None).to_dict()['multi_match']['query']
-
-        return self._range_operators(node, condition)
+        condition = {'gte': self.range_value(left),
+                     'lte': self.range_value(right)}
+        return self.range_query, condition
 
     @visitor(GreaterOp)
-    def visit(self, node, value_fn):
-        condition = {'gt': value_fn(None).to_dict()['multi_match']['query']}
-        return self._range_operators(node, condition)
+    def visit(self, node, value):
+        return self.range_query, {'gt': self.range_value(value)}
 
     @visitor(LowerOp)
-    def visit(self, node, value_fn):
-        condition = {'lt': value_fn(None).to_dict()['multi_match']['query']}
-        return self._range_operators(node, condition)
+    def visit(self, node, value):
+        return self.range_query, {'lt': self.range_value(value)}
 
     @visitor(GreaterEqualOp)
-    def visit(self, node, value_fn):
-        condition = {'gte': value_fn(None).to_dict()['multi_match']['query']}
-        return self._range_operators(node, condition)
+    def visit(self, node, value):
+        return self.range_query, {'gte': self.range_value(value)}
 
     @visitor(LowerEqualOp)
-    def visit(self, node, value_fn):
-        condition = {'lte': value_fn(None).to_dict()['multi_match']['query']}
-        return self._range_operators(node, condition)
+    def visit(self, node, value):
+        return self.range_query, {'lte': self.range_value(value)}
 
     # pylint: enable=W0612,E0102
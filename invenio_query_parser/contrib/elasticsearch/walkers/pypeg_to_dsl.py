@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio-Query-Parser.
+# Copyright (C) 2016 CERN.
+#
+# Invenio-Query-Parser is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio-Query-Parser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Implement pypeg2 parse tree convertor to Elastic Search DSL.
+
+The walker fuses the :class:`~.pypeg_to_ast.PypegConverter` and
+:class:`~.dsl.ElasticSearchDSL` walkers: the Elastic Search DSL is built
+during a single traversal of the *pypeg2* parse tree, without the
+intermediate AST.
+
+>>> import pypeg2
+>>> from invenio_query_parser.parser import Main
+>>> from invenio_query_parser.visitor import accept
+>>> from invenio_query_parser.walkers.pypeg_to_ast import PypegConverter
+>>> from invenio_query_parser.contrib.elasticsearch.walkers.dsl import \\
+...     ElasticSearchDSL
+>>> tree = pypeg2.parse('title:higgs -year:2012', Main, whitespace='')
+>>> query = accept(tree, PypegToElasticSearchDSL())
+>>> query == accept(accept(tree, PypegConverter()), ElasticSearchDSL())
+True
+"""
+
+from invenio_query_parser import ast, parser
+from invenio_query_parser.visitor import make_visitor
+
+from .dsl import ElasticSearchDSL
+
+TERMS_VALUES = {
+    parser.SimpleValue: ast.Value,
+    parser.DoubleQuotedString: ast.DoubleQuotedValue,
+}
+"""AST value built from the parse tree of values of keyword queries."""
+
+WRAPPERS = (
+    parser.SimpleQuery, parser.ParenthesizedQuery, parser.AndQuery,
+    parser.OrQuery, parser.ImplicitAndQuery,
+)
+"""Rules returning the query of their operand."""
+
+
+class BooleanList(list):
+    """Operands of a chain of the same boolean operator.
+
+    The list is turned into a ``bool`` query once it can not be extended
+    anymore, like :func:`~invenio_query_parser.ast.flatten` extends a
+    :class:`~invenio_query_parser.ast.BooleanListOp` until it is used.
+    """
+
+    __slots__ = ('op', 'terms')
+
+    def __init__(self, op, queries=(), terms=()):
+        """Initialize list of operands with the operator type."""
+        super(BooleanList, self).__init__(queries)
+        self.op = op
+        self.terms = list(terms)
+
+
+class PypegToElasticSearchDSL(ElasticSearchDSL):
+    """Implement visitor creating Elastic Search DSL from pypeg2 trees.
+
+    The DSL is identical to running
+    :class:`~invenio_query_parser.walkers.pypeg_to_ast.PypegConverter` with
+    the same ``flatten`` option followed by
+    :class:`~.dsl.ElasticSearchDSL`.
+    """
+
+    visitor = make_visitor()
+
+    def __init__(self, keyword_to_fields=None, terms_threshold=None,
+                 raw=False, flatten=False):
+        """Initialize walker.
+
+        :param flatten: join chains of the same boolean operator in a
+            single ``bool`` query.
+        """
+        super(PypegToElasticSearchDSL, self).__init__(
+            keyword_to_fields=keyword_to_fields,
+            terms_threshold=terms_threshold, raw=raw)
+        self.flatten = flatten
+
+    def get_terms(self, node):
+        """Return fields and value of a query searching a term or None."""
+        while True:
+            if type(node) is parser.Query:
+                if len(node.children) != 1:
+                    return None
+                node = node.children[0]
+            elif type(node) in WRAPPERS:
+                node = node.op
+            else:
+                break
+        if type(node) is not parser.KeywordQuery:
+            return None
+
+        value = node.right
+        if type(value) is parser.NestedKeywordsRule:
+            value_type = ast.Value
+        elif type(value) is parser.Value:
+            value = value.op
+            value_type = TERMS_VALUES.get(type(value))
+        else:
+            return None
+        mode = self.terms_modes.get(value_type)
+        if mode is not None:
+            fields = self.get_fields_for_keyword(node.left.value, mode=mode)
+            if fields:
+                return tuple(fields), value.value
+
+    def extend(self, op, tree, tree_node, query, query_node):
+        """Return boolean list of the tree extended with the query.
+
+        The nodes of the parse tree are used to find the terms of the
+        operands of ``OR`` lists; ``tree_node`` is None once the tree is
+        the result of a boolean operation.
+        """
+        terms = op is ast.OrOp and self.terms_threshold is not None
+        if type(tree) is not BooleanList or tree.op is not op:
+            if terms:
+                terms = [self.get_terms(tree_node)]
+            tree = BooleanList(op, [self.build(tree)], terms or ())
+        if type(query) is BooleanList and query.op is op:
+            tree.extend(query)
+            tree.terms.extend(query.terms)
+        else:
+            tree.append(self.build(query))
+            if terms:
+                tree.terms.append(self.get_terms(query_node))
+        return tree
+
+    def build(self, query):
+        """Return query built from boolean lists."""
+        if type(query) is not BooleanList:
+            return query
+        if query.op is ast.AndOp:
+            return self.query('bool', must=list(query))
+        children = list(query)
+        if self.terms_threshold is not None:
+            children = self.collapse_terms_values(query.terms, children)
+            if len(children) == 1:
+                return children[0]
+        return self.query('bool', should=children)
+
+    # pylint: disable=W0613,E0102
+
+    @visitor(parser.Whitespace)
+    def visit(self, node):
+        return self.value_query, node.value
+
+    @visitor(parser.KeywordRule)
+    def visit(self, node):
+        return node.value
+
+    @visitor(parser.SingleQuotedString)
+    def visit(self, node):
+        return self.phrase_query, node.value
+
+    @visitor(parser.DoubleQuotedString)
+    def visit(self, node):
+        return self.phrase_query, node.value
+
+    @visitor(parser.SlashQuotedString)
+    def visit(self, node):
+        return self.regex_query, node.value
+
+    @visitor(parser.SimpleValue)
+    def visit(self, node):
+        return self.value_query, node.value
+
+    @visitor(parser.SimpleRangeValue)
+    def visit(self, node):
+        return self.value_query, node.value
+
+    @visitor(parser.RangeValue)
+    def visit(self, node, child):
+        return child
+
+    @visitor(parser.RangeOp)
+    def visit(self, node, left, right):
+        condition = {'gte': self.range_value(left),
+                     'lte': self.range_value(right)}
+        return self.range_query, condition
+
+    @visitor(parser.Number)
+    def visit(self, node):
+        return self.value_query, node.value
+
+    @visitor(parser.Value)
+    def visit(self, node, child):
+        return child
+
+    @visitor(parser.ValueQuery)
+    def visit(self, node, child):
+        if callable(child):
+            return child(None)
+        query, value = child
+        return query(None, value)
+
+    @visitor(parser.KeywordQuery)
+    def visit(self, node, keyword, value):
+        if type(value) is tuple:
+            query, value = value
+            return query(keyword, value)
+        if callable(value):
+            return value(keyword)
+        raise RuntimeError('Not supported second level operation.')
+
+    @visitor(parser.NotKeywordValue)
+    def visit(self, node):
+        return self.value_query(None, node.value)
+
+    @visitor(parser.NestedKeywordsRule)
+    def visit(self, node):
+        return self.value_query, node.value
+
+    @visitor(parser.SimpleQuery)
+    def visit(self, node, child):
+        return child
+
+    @visitor(parser.ParenthesizedQuery)
+    def visit(self, node, child):
+        return child
+
+    @visitor(parser.NotQuery)
+    def visit(self, node, child):
+        return self.not_query(self.build(child))
+
+    @visitor(parser.AndQuery)
+    def visit(self, node, child):
+        return child
+
+    @visitor(parser.ImplicitAndQuery)
+    def visit(self, node, child):
+        return child
+
+    @visitor(parser.OrQuery)
+    def visit(self, node, child):
+        return child
+
+    @visitor(parser.Query)
+    def visit(self, node, children):
+        # Build the boolean expression, left to right
+        # x and y or z and ... --> ((x and y) or z) and ...
+        tree, tree_node = children[0], node.children[0]
+        for boolean, query in zip(node.children[1:], children[1:]):
+            op = ast.OrOp if type(boolean) is parser.OrQuery else ast.AndOp
+            # only the queries combined here can be extended in place
+            extend = self.extend_in_place and tree_node is None
+            if self.flatten:
+                tree = self.extend(op, tree, tree_node, query, boolean)
+            elif op is ast.OrOp:
+                tree = self.or_query(tree, query, extend=extend)
+            else:
+                tree = self.and_query(tree, query, extend=extend)
+            tree_node = None
+        return tree
+
+    @visitor(parser.EmptyQueryRule)
+    def visit(self, node):
+        return self.query('match_all')
+
+    @visitor(parser.Main)
+    def visit(self, node, child):
+        return self.build(child)
+
+    # pylint: enable=W0612,E0102
@@ -27,6 +27,9 @@ from invenio_query_parser.ast import BinaryOp
 
 
 class SpiresOp(BinaryOp):
+
+    __slots__ = ()
+
     @property
     def keyword(self):
         return self.left
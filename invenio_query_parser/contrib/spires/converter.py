@@ -25,6 +25,7 @@
 
 import pypeg2
 
+from invenio_query_parser.visitor import compile_walker
 from invenio_query_parser.walkers import repr_printer
 
 from .parser import Main
@@ -32,8 +33,8 @@ from .walkers import pypeg_to_ast
 
 
 class SpiresToInvenioSyntaxConverter(object):
-    def __init__(self):
-        self.converter = pypeg_to_ast.PypegConverter()
+    def __init__(self, flatten=False):
+        self.converter = pypeg_to_ast.PypegConverter(flatten=flatten)
         self.printer = repr_printer.TreeRepr()
 
     def parse_query(self, query):
@@ -42,4 +43,5 @@ class SpiresToInvenioSyntaxConverter(object):
         return tree.accept(self.converter)
 
     def convert_query(self, query):
-        return self.parse_query(query).accept(self.printer)
+        walk = compile_walker(type(self.printer))
+        return walk(self.parse_query(query), self.printer)
@@ -25,25 +25,34 @@
 
 from invenio_query_parser.parser import *
 from invenio_query_parser.parser import _
+from invenio_query_parser.utils import KeywordMatcher
 
 from .config import SPIRES_KEYWORDS
 
 
 class SpiresKeywordRule(LeafRule):
-    grammar = attr('value', re.compile(r"(%s)\b" % "|".join(
-        SPIRES_KEYWORDS.keys()), re.I))
+    __slots__ = ()
+
+    grammar = attr('value', KeywordMatcher(SPIRES_KEYWORDS, ignore_case=True))
 
 
 class SpiresSimpleValue(LeafRule):
 
+    __slots__ = ()
+
     def __init__(self, values):
         super(SpiresSimpleValue, self).__init__()
         self.value = "".join(v.value for v in values)
 
 
+SIMPLE_VALUE_UNIT = re.compile(r"[^\s\)\(]+")
+
+
 class SpiresSimpleValueUnit(LeafRule):
+    __slots__ = ()
+
     grammar = [
-        re.compile(r"[^\s\)\(]+"),
+        SIMPLE_VALUE_UNIT,
         (re.compile(r'\('), SpiresSimpleValue, re.compile(r'\)')),
     ]
 
@@ -58,31 +67,56 @@ class SpiresSimpleValueUnit(LeafRule):
 SpiresSimpleValue.grammar = some(SpiresSimpleValueUnit)
 
 
+def scan_simple_value(text, pos=0):
+    """Return end of the ``SpiresSimpleValue`` at the position or None.
+
+    The text is scanned like the grammar of ``SpiresSimpleValue`` would
+    parse it, without building the parse tree.
+    """
+    end = _scan_simple_value_unit(text, pos)
+    if end is None:
+        return None
+    while True:
+        next_end = _scan_simple_value_unit(text, end)
+        if next_end is None:
+            return end
+        end = next_end
+
+
+def _scan_simple_value_unit(text, pos):
+    match = SIMPLE_VALUE_UNIT.match(text, pos)
+    if match is not None:
+        return match.end()
+    if text.startswith('(', pos):
+        end = scan_simple_value(text, pos + 1)
+        if end is not None and text.startswith(')', end):
+            return end + 1
+
+
 class SpiresSmartValue(UnaryRule):
 
+    __slots__ = ()
+
     @classmethod
     def parse(cls, parser, text, pos):  # pylint: disable=W0613
         """Match simple values excluding some Keywords like 'and' and 'or'"""
-        if not text.strip():
+        if not text or text.isspace():
             return text, SyntaxError("Invalid value")
 
-        class Rule(object):
-            grammar = attr('value', SpiresSimpleValue), omit(re.compile(".*"))
-
-        try:
-            tree = pypeg2.parse(text, Rule, whitespace="")
-        except SyntaxError:
+        end = scan_simple_value(text)
+        if end is None:
             return text, SyntaxError("Expected %r" % cls)
-        else:
-            r = tree.value
 
-        if r.value.lower() in ('and', 'or', 'not'):
-            return text, SyntaxError("Invalid value %s" % r.value)
+        value = text[:end]
+        if value.lower() in ('and', 'or', 'not'):
+            return text, SyntaxError("Invalid value %s" % value)
 
-        return text[len(r.value):], r
+        return text[end:], SpiresSimpleValue([SpiresSimpleValueUnit(value)])
 
 
 class SpiresValue(ast.ListOp):
+    __slots__ = ()
+
     grammar = [
         (SpiresSmartValue, maybe_some(Whitespace, SpiresSmartValue)),
         Value,
@@ -90,6 +124,8 @@ class SpiresValue(ast.ListOp):
 
 
 class GreaterQuery(UnaryRule):
+    __slots__ = ()
+
     grammar = (
         omit([
             Literal('>'),
@@ -100,6 +136,8 @@ class GreaterQuery(UnaryRule):
 
 
 class GreaterEqualQuery(UnaryRule):
+    __slots__ = ()
+
     grammar = [
         (omit(Literal('>='), _), attr('op', SpiresValue)),
         (attr('op', Number), omit(re.compile(r'\+(?=\s|\)|$)'))),
@@ -107,6 +145,8 @@ class GreaterEqualQuery(UnaryRule):
 
 
 class LowerQuery(UnaryRule):
+    __slots__ = ()
+
     grammar = (
         omit([
             Literal('<'),
@@ -117,6 +157,8 @@ class LowerQuery(UnaryRule):
 
 
 class LowerEqualQuery(UnaryRule):
+    __slots__ = ()
+
     grammar = [
         (omit(Literal('<='), _), attr('op', SpiresValue)),
         (attr('op', Number), omit(re.compile(r'\-(?=\s|\)|$)'))),
@@ -128,22 +170,28 @@ class Find(Keyword):
 
 
 class SpiresKeywordQuery(BinaryRule):
-    pass
+    __slots__ = ()
 
 
 class SpiresValueQuery(UnaryRule):
+    __slots__ = ()
+
     grammar = attr('op', SpiresValue)
 
 
 class SpiresSimpleQuery(UnaryRule):
+    __slots__ = ()
+
     grammar = attr('op', [SpiresKeywordQuery, SpiresValueQuery])
 
 
 class SpiresQuery(ListRule):
-    pass
+    __slots__ = ()
 
 
 class SpiresParenthesizedQuery(UnaryRule):
+    __slots__ = ()
+
     grammar = (
         omit(Literal('('), _),
         attr('op', SpiresQuery),
@@ -152,6 +200,8 @@ class SpiresParenthesizedQuery(UnaryRule):
 
 
 class SpiresNotQuery(UnaryRule):
+    __slots__ = ()
+
     grammar = (
         [
             omit(re.compile(r"and\s+not", re.I)),
@@ -166,6 +216,8 @@ class SpiresNotQuery(UnaryRule):
 
 
 class SpiresAndQuery(UnaryRule):
+    __slots__ = ()
+
     grammar = (
         omit(re.compile(r"and", re.I)),
         [
@@ -177,6 +229,8 @@ class SpiresAndQuery(UnaryRule):
 
 
 class SpiresOrQuery(UnaryRule):
+    __slots__ = ()
+
     grammar = (
         omit(re.compile(r"or", re.I)),
         [
@@ -242,10 +296,14 @@ SpiresKeywordQuery.grammar = [
 
 
 class FindQuery(UnaryRule):
+    __slots__ = ()
+
     grammar = omit(Find, Whitespace), attr('op', SpiresQuery)
 
 
 class Main(UnaryRule):
+    __slots__ = ()
+
     grammar = [
         (omit(_), attr('op', [FindQuery, Query]), omit(_)),
         attr('op', EmptyQueryRule),
@@ -23,6 +23,8 @@
 
 """SPIRES extended Pypeg to AST converter."""
 
+from itertools import islice
+
 from invenio_query_parser import ast
 from invenio_query_parser.visitor import make_visitor
 from invenio_query_parser.walkers import pypeg_to_ast
@@ -96,36 +98,21 @@ class PypegConverter(pypeg_to_ast.PypegConverter):
     def visit(self, node, children):
         # Assign implicit keyword
         # find author x and y --> find author x and author y
-
-        def assign_implicit_keyword(implicit_keyword, node):
-            """
-            Note: this function has side effects on node content
-            """
-            if type(node) in [ast.AndOp, ast.OrOp] and \
-               type(node.right) == ast.ValueQuery:
-                node.right = SpiresOp(implicit_keyword, node.right.op)
-            if type(node) in [ast.AndOp, ast.OrOp] and \
-               type(node.right) == ast.NotOp:
-                assign_implicit_keyword(implicit_keyword, node.right)
-            if type(node) in [ast.NotOp] and \
-               type(node.op) == ast.ValueQuery:
-                node.op = SpiresOp(implicit_keyword, node.op.op)
-
-        implicit_keyword = None
-        for child in children:
-            new_keyword = getattr(child, 'keyword', None)
-            if new_keyword is not None:
-                implicit_keyword = new_keyword
-            if implicit_keyword is not None:
-                assign_implicit_keyword(implicit_keyword, child)
-
-        # Build the boolean expression, left to right
-        # x and y or z and ... --> ((x and y) or z) and ...
-        tree = children[0]
-        for booleanNode in children[1:]:
-            booleanNode.left = tree
-            tree = booleanNode
-        return tree
+        implicit_keyword = getattr(children[0], 'keyword', None)
+        # the other children are boolean operations missing the left operand
+        for child in islice(children, 1, None):
+            right = child.right
+            right_type = type(right)
+            if right_type is SpiresOp:
+                implicit_keyword = right.left
+            elif implicit_keyword is None:
+                continue
+            elif right_type is ast.ValueQuery:
+                child.right = SpiresOp(implicit_keyword, right.op)
+            elif right_type is ast.NotOp and type(right.op) is ast.ValueQuery:
+                right.op = SpiresOp(implicit_keyword, right.op.op)
+
+        return self.build_boolean_query(children)
 
     @visitor(parser.FindQuery)
     def visit(self, node, child):
@@ -21,7 +21,17 @@
 # granted to it by virtue of its status as an Intergovernmental Organization
 # or submit itself to any jurisdiction.
 
-"""Implement query printer."""
+"""Implement SPIRES to Invenio keyword rewriting.
+
+:class:`SpiresToInvenio` returns a full copy of the tree, while
+:func:`rewrite_keywords` only replaces the SPIRES keyword nodes.
+
+>>> from invenio_query_parser.contrib.spires.converter import \\
+...     SpiresToInvenioSyntaxConverter
+>>> tree = SpiresToInvenioSyntaxConverter().parse_query('find A ellis')
+>>> rewrite_keywords(tree)
+KeywordOp(Keyword('author'), Value('ellis'))
+"""
 
 from invenio_query_parser import ast
 from invenio_query_parser.contrib.spires.config import SPIRES_KEYWORDS
@@ -29,8 +39,93 @@ from invenio_query_parser.visitor import make_visitor
 
 from ..ast import SpiresOp
 
+KEYWORDS = dict((keyword.lower(), invenio_keyword)
+                for keyword, invenio_keyword in SPIRES_KEYWORDS.items())
+"""Invenio keywords indexed by the lowercase SPIRES keywords."""
+
+BOOLEAN_OPS = {
+    ast.AndOp: 'binary', ast.OrOp: 'binary', ast.NotOp: 'unary',
+    ast.AndList: 'list', ast.OrList: 'list',
+}
+"""Kind of operands of the nodes which can contain SPIRES keyword queries."""
+
+
+def translate_keyword(keyword):
+    """Return Invenio keyword of a SPIRES keyword in any case."""
+    return KEYWORDS[keyword.lower()]
+
+
+def _keyword_op(node):
+    return ast.KeywordOp(ast.Keyword(translate_keyword(node.left.value)),
+                         node.right)
+
+
+def _operands(node, kind):
+    if kind == 'binary':
+        return node.left, node.right
+    if kind == 'unary':
+        return node.op,
+    return node.children
+
+
+def _replace_operands(node, kind, operands, in_place):
+    if not in_place:
+        return type(node)(operands) if kind == 'list' else \
+            type(node)(*operands)
+    if kind == 'binary':
+        node.left, node.right = operands
+    elif kind == 'unary':
+        node.op, = operands
+    else:
+        node.children[:] = operands
+    return node
+
+
+def rewrite_keywords(tree, in_place=False):
+    """Return tree with SPIRES keyword queries replaced by Invenio ones.
+
+    Only the boolean operations are traversed, so values are never
+    visited.  By default the rewriting is copy-on-write: the boolean
+    operations above a SPIRES keyword query are copied and every other
+    node is shared with the original tree.  With ``in_place`` the original
+    boolean operations are modified instead.
+    """
+    # boolean operations in pre-order, without recursion
+    nodes = []
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        kind = BOOLEAN_OPS.get(type(node))
+        if kind is not None:
+            nodes.append((node, kind))
+            stack.extend(_operands(node, kind))
+
+    # operands are rewritten before the operations containing them
+    copies = {}
+    for node, kind in reversed(nodes):
+        operands = []
+        changed = False
+        for operand in _operands(node, kind):
+            if type(operand) is SpiresOp:
+                operand = _keyword_op(operand)
+                changed = True
+            elif id(operand) in copies:
+                operand = copies[id(operand)]
+                changed = True
+            operands.append(operand)
+        if changed:
+            new_node = _replace_operands(node, kind, operands, in_place)
+            if new_node is not node:
+                copies[id(node)] = new_node
+
+    if type(tree) is SpiresOp:
+        return _keyword_op(tree)
+    return copies.get(id(tree), tree)
+
 
 class SpiresToInvenio(object):
+    """Return copy of the tree with Invenio keyword queries."""
+
     visitor = make_visitor()
 
     # pylint: disable=W0613,E0102
@@ -43,6 +138,14 @@ class SpiresToInvenio(object):
     def visit(self, node, left, right):
         return type(node)(left, right)
 
+    @visitor(ast.AndList)
+    def visit(self, node, children):
+        return type(node)(children)
+
+    @visitor(ast.OrList)
+    def visit(self, node, children):
+        return type(node)(children)
+
     @visitor(ast.KeywordOp)
     def visit(self, node, left, right):
         return type(node)(left, right)
@@ -101,7 +204,7 @@ class SpiresToInvenio(object):
 
     @visitor(SpiresOp)
     def visit(self, node, left, right):
-        left.value = SPIRES_KEYWORDS[left.value]
-        return ast.KeywordOp(left, right)
+        return ast.KeywordOp(type(left)(translate_keyword(left.value)),
+                             right)
 
     # pylint: enable=W0612,E0102
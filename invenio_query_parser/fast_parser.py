@@ -0,0 +1,362 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio-Query-Parser.
+# Copyright (C) 2016 CERN.
+#
+# Invenio-Query-Parser is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio-Query-Parser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Hand-written parser for the Invenio query syntax.
+
+The parser recognises the same language as :class:`~.parser.Main` and
+returns the same :mod:`~invenio_query_parser.ast` nodes as running
+:class:`~.walkers.pypeg_to_ast.PypegConverter` over the *pypeg2* parse tree.
+
+Tokens in the Invenio syntax are context dependent (``foo:bar`` is a keyword
+query, ``bar:baz`` after a keyword is a value), so instead of producing a
+token list up-front the parser scans tokens on demand with precompiled
+anchored regular expressions.  Alternatives are predicted from the next
+character whenever possible, which avoids the backtracking done by *pypeg2*.
+
+>>> from invenio_query_parser.fast_parser import FastParser
+>>> FastParser().parse('author:"Ellis, J" AND year:2000->2012')
+... # doctest: +NORMALIZE_WHITESPACE
+AndOp(KeywordOp(Keyword('author'), DoubleQuotedValue('Ellis, J')),
+      KeywordOp(Keyword('year'), RangeOp(Value('2000'), Value('2012'))))
+"""
+
+from __future__ import absolute_import
+
+import re
+
+from . import ast
+from .cache import compile_pattern
+from .utils import MARC_TAG, KeywordMatcher
+
+WHITESPACE = re.compile(r"\s+")
+"""Whitespace separating tokens."""
+
+EMPTY_QUERY = re.compile(r"\s*")
+"""Empty query consisting only of whitespace."""
+
+NOT = re.compile(r"AND\s+NOT|NOT|-")
+"""Negation operator."""
+
+AND = re.compile(r"AND|\+")
+"""Conjunction operator."""
+
+OR = re.compile(r"OR|\|")
+"""Disjunction operator."""
+
+KEYWORD = re.compile(r"[\w\d]+(\.[\w\d]+)*")
+"""Keyword accepted when no list of allowed keywords is given."""
+
+NESTED_KEYWORDS = re.compile(
+    r"(([\w\d]+(\.[\w\d]+)*):\s*)+([\w\d]+(\.[\w\d]+)*)")
+"""Value made of colon separated keywords, e.g. ``oai:arXiv.org:1234``."""
+
+QUOTED_CONTENT = {
+    "'": re.compile(r"([^']|\\.)*"),
+    '"': re.compile(r'([^"]|\\.)*'),
+    '/': re.compile(r"([^/]|\\.)*"),
+}
+"""Content of quoted strings indexed by their delimiter."""
+
+QUOTED_VALUE = {
+    "'": ast.SingleQuotedValue,
+    '"': ast.DoubleQuotedValue,
+    '/': ast.RegexValue,
+}
+"""AST node created for each kind of quoted string."""
+
+SIMPLE_RANGE_VALUE = re.compile(r"([^\s\)\(-]|-+[^\s\)\(>])+")
+"""Unquoted boundary of a range."""
+
+SIMPLE_VALUE_UNIT = re.compile(r"[^\s\)\(:]+")
+"""Unquoted value without parentheses."""
+
+
+def keyword_patterns(keywords):
+    """Return regular expressions of allowed keywords and non-keyword values.
+
+    The patterns mirror the grammar installed by
+    :func:`~invenio_query_parser.utils.build_valid_keywords_grammar`.
+    """
+    # the longest keyword is tried first as in the keyword matcher
+    keyword = KeywordMatcher(keywords, prefix=MARC_TAG).pattern
+    # ``(?=\w)`` behaves like the leading ``\b`` of the pypeg2 rule, which is
+    # always matched against the remaining text and never sees the character
+    # before the current position.
+    not_keyword_value = r'(?=\w)(?!\d\d\d\w{{0,3}}|{0}:)\S+\b:'.format(
+        ":|".join(keywords))
+    return keyword, not_keyword_value
+
+
+def build_keyword_patterns(keywords=None):
+    """Return compiled keyword and non-keyword value patterns.
+
+    The patterns of allowed keywords are compiled with
+    :func:`~invenio_query_parser.cache.compile_pattern`, so parsers of the
+    same keywords share them.
+    """
+    if not keywords:
+        return KEYWORD, None
+    keyword, not_keyword_value = keyword_patterns(keywords)
+    return compile_pattern(keyword), compile_pattern(not_keyword_value)
+
+
+class FastParser(object):
+    """Parse Invenio queries directly into AST nodes.
+
+    :param keywords: list of allowed keywords; see
+        :func:`~invenio_query_parser.utils.build_valid_keywords_grammar`.
+    :param flatten: build :class:`~invenio_query_parser.ast.AndList` and
+        :class:`~invenio_query_parser.ast.OrList` nodes from chains of the
+        same boolean operator.
+    """
+
+    def __init__(self, keywords=None, flatten=False):
+        """Compile patterns for the allowed keywords."""
+        self.keyword, self.not_keyword_value = build_keyword_patterns(
+            keywords)
+        self.flatten = flatten
+
+    def parse(self, text):
+        """Return AST for the query or raise :exc:`SyntaxError`."""
+        return _RecursiveDescent(self, text).main()
+
+    __call__ = parse
+
+
+class _RecursiveDescent(object):
+    """State of a single parse.
+
+    Every rule method takes a position in the text and returns a tuple
+    ``(node, end)`` on success or ``None`` when the rule does not match.
+    """
+
+    def __init__(self, parser, text):
+        self.text = text
+        self.length = len(text)
+        self.keyword = parser.keyword
+        self.not_keyword_value = parser.not_keyword_value
+        self.has_range = '->' in text
+        self.flatten = parser.flatten
+        self.queries = {}
+
+    def error(self, pos):
+        return SyntaxError("Invalid query %r at position %d" % (
+            self.text, pos))
+
+    def skip(self, pos):
+        match = WHITESPACE.match(self.text, pos)
+        return match.end() if match else pos
+
+    def main(self):
+        result = self.query(self.skip(0))
+        if result is not None:
+            node, pos = result
+            pos = self.skip(pos)
+            if pos == self.length:
+                return node
+            raise self.error(pos)
+
+        pos = EMPTY_QUERY.match(self.text).end()
+        if pos == self.length:
+            return ast.EmptyQuery(self.text)
+        raise self.error(pos)
+
+    def query(self, pos):
+        try:
+            return self.queries[pos]
+        except KeyError:
+            pass
+
+        # Build the boolean expression, left to right
+        # x and y or z and ... --> ((x and y) or z) and ...
+        result = self.not_query(pos) or self.parenthesized_query(pos) or \
+            self.simple_query(pos)
+        if result is not None:
+            tree, end = result
+            if self.flatten and isinstance(tree, ast.BooleanListOp):
+                # the memoized subquery must not be extended
+                tree = type(tree)(list(tree.children))
+            while True:
+                operation = self.boolean_query(self.skip(end))
+                if operation is None:
+                    break
+                op, child, end = operation
+                if self.flatten:
+                    tree = ast.flatten(op, tree, child)
+                else:
+                    tree = op(tree, child)
+            result = tree, end
+
+        self.queries[pos] = result
+        return result
+
+    def boolean_query(self, pos):
+        text = self.text
+        for op, pattern, short in ((ast.AndOp, AND, '+'),
+                                   (ast.OrOp, OR, '|')):
+            match = pattern.match(text, pos)
+            if match is not None:
+                end = match.end()
+                space = WHITESPACE.match(text, end)
+                if space is not None:
+                    result = self.not_query(space.end()) or \
+                        self.simple_query(space.end())
+                    if result is not None:
+                        return (op, ) + result
+                result = self.parenthesized_query(self.skip(end))
+                if result is not None:
+                    return (op, ) + result
+            if text.startswith(short, pos):
+                result = self.simple_query(pos + 1)
+                if result is not None:
+                    return (op, ) + result
+
+        result = self.not_query(pos) or self.parenthesized_query(pos) or \
+            self.simple_query(pos)
+        if result is not None:
+            return (ast.AndOp, ) + result
+
+    def not_query(self, pos):
+        text = self.text
+        match = NOT.match(text, pos)
+        if match is None:
+            return None
+
+        end = match.end()
+        space = WHITESPACE.match(text, end)
+        result = None
+        if space is not None:
+            result = self.simple_query(space.end())
+        if result is None:
+            result = self.parenthesized_query(self.skip(end))
+        if result is None and text.startswith('-', pos):
+            result = self.simple_query(pos + 1)
+        if result is not None:
+            node, end = result
+            return ast.NotOp(node), end
+
+    def parenthesized_query(self, pos):
+        if not self.text.startswith('(', pos):
+            return None
+        result = self.query(self.skip(pos + 1))
+        if result is not None:
+            node, end = result
+            end = self.skip(end)
+            if self.text.startswith(')', end):
+                return node, end + 1
+
+    def simple_query(self, pos):
+        if self.not_keyword_value is not None:
+            match = self.not_keyword_value.match(self.text, pos)
+            if match is not None:
+                return ast.ValueQuery(ast.Value(match.group())), match.end()
+
+        result = self.keyword_query(pos)
+        if result is not None:
+            return result
+        result = self.value(pos)
+        if result is not None:
+            node, end = result
+            return ast.ValueQuery(node), end
+
+    def keyword_query(self, pos):
+        text = self.text
+        match = self.keyword.match(text, pos)
+        if match is None:
+            return None
+
+        keyword = ast.Keyword(match.group())
+        end = match.end()
+
+        colon = self.skip(end)
+        if text.startswith(':', colon):
+            nested = NESTED_KEYWORDS.match(text, self.skip(colon + 1))
+            if nested is not None:
+                return (ast.KeywordOp(keyword, ast.Value(nested.group())),
+                        nested.end())
+
+        if text.startswith(':', end):
+            start = self.skip(end + 1)
+            result = self.value(start) or self.query(start)
+            if result is not None:
+                node, end = result
+                return ast.KeywordOp(keyword, node), end
+
+    def value(self, pos):
+        if self.has_range:
+            result = self.range_op(pos)
+            if result is not None:
+                return result
+
+        char = self.text[pos:pos + 1]
+        if char in QUOTED_CONTENT:
+            result = self.quoted_value(pos, char)
+            if result is not None:
+                return result
+
+        end = self.simple_value(pos)
+        if end is not None:
+            return ast.Value(self.text[pos:end]), end
+
+    def quoted_value(self, pos, quote):
+        content = QUOTED_CONTENT[quote].match(self.text, pos + 1)
+        end = content.end()
+        if self.text.startswith(quote, end):
+            return QUOTED_VALUE[quote](content.group()), end + 1
+
+    def range_value(self, pos):
+        if self.text.startswith('"', pos):
+            result = self.quoted_value(pos, '"')
+            if result is not None:
+                return result
+
+        match = SIMPLE_RANGE_VALUE.match(self.text, pos)
+        if match is not None:
+            return ast.Value(match.group()), match.end()
+
+    def range_op(self, pos):
+        left = self.range_value(pos)
+        if left is not None and self.text.startswith('->', left[1]):
+            right = self.range_value(left[1] + 2)
+            if right is not None:
+                return ast.RangeOp(left[0], right[0]), right[1]
+
+    def simple_value(self, pos):
+        """Return end position of a value with balanced parentheses."""
+        end = self.simple_value_unit(pos)
+        if end is None:
+            return None
+        while True:
+            next_end = self.simple_value_unit(end)
+            if next_end is None:
+                return end
+            end = next_end
+
+    def simple_value_unit(self, pos):
+        match = SIMPLE_VALUE_UNIT.match(self.text, pos)
+        if match is not None:
+            return match.end()
+        if self.text.startswith('(', pos):
+            end = self.simple_value(pos + 1)
+            if end is not None and self.text.startswith(')', end):
+                return end + 1
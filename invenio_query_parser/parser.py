@@ -39,29 +39,39 @@ from ._compat import string_types
 
 class LeafRule(ast.Leaf):
 
+    __slots__ = ()
+
     def __init__(self):
         pass
 
 
 class UnaryRule(ast.UnaryOp):
 
+    __slots__ = ()
+
     def __init__(self):
         pass
 
 
 class BinaryRule(ast.BinaryOp):
 
+    __slots__ = ()
+
     def __init__(self):
         pass
 
 
 class ListRule(ast.ListOp):
 
+    __slots__ = ()
+
     def __init__(self):
         pass
 
 
 class Whitespace(LeafRule):
+    __slots__ = ()
+
     grammar = attr('value', re.compile(r"\s+"))
 
 
@@ -91,37 +101,51 @@ class Or(object):
 
 
 class KeywordRule(LeafRule):
+    __slots__ = ()
+
     grammar = attr('value', re.compile(r"[\w\d]+(\.[\w\d]+)*"))
 
 
 class NestedKeywordsRule(LeafRule):
+    __slots__ = ()
+
     grammar = attr('value', re.compile(
         r"(([\w\d]+(\.[\w\d]+)*):\s*)+([\w\d]+(\.[\w\d]+)*)"))
 
 
 class SingleQuotedString(LeafRule):
+    __slots__ = ()
+
     grammar = Literal("'"), attr('value', re.compile(r"([^']|\\.)*")), \
         Literal("'")
 
 
 class DoubleQuotedString(LeafRule):
+    __slots__ = ()
+
     grammar = Literal('"'), attr('value', re.compile(r'([^"]|\\.)*')), \
         Literal('"')
 
 
 class SlashQuotedString(LeafRule):
+    __slots__ = ()
+
     grammar = Literal('/'), attr('value', re.compile(r"([^/]|\\.)*")), \
         Literal('/')
 
 
 class SimpleValue(LeafRule):
 
+    __slots__ = ()
+
     def __init__(self, values):
         super(SimpleValue, self).__init__()
         self.value = "".join(v.value for v in values)
 
 
 class SimpleValueUnit(LeafRule):
+    __slots__ = ()
+
     grammar = [
         re.compile(r"[^\s\)\(:]+"),
         (re.compile(r'\('), SimpleValue, re.compile(r'\)')),
@@ -139,14 +163,20 @@ SimpleValue.grammar = some(SimpleValueUnit)
 
 
 class SimpleRangeValue(LeafRule):
+    __slots__ = ()
+
     grammar = attr('value', re.compile(r"([^\s\)\(-]|-+[^\s\)\(>])+"))
 
 
 class RangeValue(UnaryRule):
+    __slots__ = ()
+
     grammar = attr('op', [DoubleQuotedString, SimpleRangeValue])
 
 
 class RangeOp(BinaryRule):
+    __slots__ = ()
+
     grammar = (
         attr('left', RangeValue),
         Literal('->'),
@@ -155,6 +185,8 @@ class RangeOp(BinaryRule):
 
 
 class Value(UnaryRule):
+    __slots__ = ()
+
     grammar = attr('op', [
         RangeOp,
         SingleQuotedString,
@@ -165,6 +197,8 @@ class Value(UnaryRule):
 
 
 class NestableKeyword(LeafRule):
+    __slots__ = ()
+
     grammar = attr('value', [
         re.compile('refersto', re.I),
         re.compile('citedby', re.I),
@@ -172,26 +206,32 @@ class NestableKeyword(LeafRule):
 
 
 class Number(LeafRule):
+    __slots__ = ()
+
     grammar = attr('value', re.compile(r'\d+'))
 
 
 class ValueQuery(UnaryRule):
+    __slots__ = ()
+
     grammar = attr('op', Value)
 
 
 class Query(ListRule):
-    pass
+    __slots__ = ()
 
 
 class NotKeywordValue(LeafRule):
-    pass
+    __slots__ = ()
 
 
 class KeywordQuery(BinaryRule):
-    pass
+    __slots__ = ()
 
 
 class EmptyQueryRule(LeafRule):
+    __slots__ = ()
+
     grammar = attr('value', re.compile(r'\s*'))
 
 
@@ -215,10 +255,14 @@ KeywordQuery.grammar = [
 
 
 class SimpleQuery(UnaryRule):
+    __slots__ = ()
+
     grammar = attr('op', [KeywordQuery, ValueQuery])
 
 
 class ParenthesizedQuery(UnaryRule):
+    __slots__ = ()
+
     grammar = (
         omit(Literal('('), _),
         attr('op', Query),
@@ -227,6 +271,8 @@ class ParenthesizedQuery(UnaryRule):
 
 
 class NotQuery(UnaryRule):
+    __slots__ = ()
+
     grammar = [
         (
             omit(Not),
@@ -243,6 +289,8 @@ class NotQuery(UnaryRule):
 
 
 class AndQuery(UnaryRule):
+    __slots__ = ()
+
     grammar = [
         (
             omit(And),
@@ -260,6 +308,8 @@ class AndQuery(UnaryRule):
 
 
 class ImplicitAndQuery(UnaryRule):
+    __slots__ = ()
+
     grammar = [
         attr('op', NotQuery),
         attr('op', ParenthesizedQuery),
@@ -268,6 +318,8 @@ class ImplicitAndQuery(UnaryRule):
 
 
 class OrQuery(UnaryRule):
+    __slots__ = ()
+
     grammar = [
         (
             omit(Or),
@@ -302,14 +354,7 @@ Query.grammar = attr('children', (
 
 
 class Main(UnaryRule):
-    initialized = False
-
-    def __init__(self):
-        """Initialize list of allowed keywords on first call."""
-        if not Main.initialized:
-            from invenio_query_parser.utils import build_valid_keywords_grammar
-            build_valid_keywords_grammar()
-            Main.initialized = True
+    __slots__ = ()
 
     grammar = [
         (omit(_), attr('op', Query), omit(_)),
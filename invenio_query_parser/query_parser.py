@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio-Query-Parser.
+# Copyright (C) 2016 CERN.
+#
+# Invenio-Query-Parser is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio-Query-Parser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Parsers owning their configuration of allowed keywords.
+
+Unlike :func:`~invenio_query_parser.utils.build_valid_keywords_grammar`,
+which changes the grammar shared by the whole process, every
+:class:`QueryParser` compiles its own keyword tables, so parsers with
+different keywords can be used at the same time from many threads:
+
+>>> from invenio_query_parser.query_parser import QueryParser
+>>> QueryParser(keywords=['title']).parse('author:Ellis')
+AndOp(ValueQuery(Value('author:')), ValueQuery(Value('Ellis')))
+>>> QueryParser().parse('author:Ellis')
+KeywordOp(Keyword('author'), Value('Ellis'))
+"""
+
+from __future__ import absolute_import
+
+from .fast_parser import FastParser
+
+
+class QueryParser(object):
+    """Immutable and thread-safe parser of Invenio queries.
+
+    Queries are parsed by :class:`~.fast_parser.FastParser`, which keeps
+    the state of a parse local to the call.  Parsers with the same
+    configuration are equal, so they can share cached trees.
+
+    :param keywords: list of allowed keywords, by default any keyword.
+    :param flatten: join chains of the same boolean operator; see
+        :class:`~.fast_parser.FastParser`.
+    """
+
+    __slots__ = ('keywords', 'flatten', '_parser')
+
+    def __init__(self, keywords=None, flatten=False):
+        """Compile parser for the allowed keywords."""
+        keywords = tuple(keywords) if keywords else ()
+        set_attribute = super(QueryParser, self).__setattr__
+        set_attribute('keywords', keywords)
+        set_attribute('flatten', bool(flatten))
+        set_attribute('_parser', FastParser(keywords=keywords,
+                                            flatten=flatten))
+
+    def parse(self, query):
+        """Return AST of the query or raise :exc:`SyntaxError`."""
+        return self._parser.parse(query)
+
+    __call__ = parse
+
+    def __setattr__(self, name, value):
+        raise AttributeError('QueryParser is immutable.')
+
+    def __delattr__(self, name):
+        raise AttributeError('QueryParser is immutable.')
+
+    def __reduce__(self):
+        return type(self), (self.keywords, self.flatten)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and \
+            self.keywords == other.keywords and self.flatten == other.flatten
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((type(self), self.keywords, self.flatten))
+
+    def __repr__(self):
+        return '%s(keywords=%r, flatten=%r)' % (
+            type(self).__name__, list(self.keywords), self.flatten)
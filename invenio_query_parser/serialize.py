@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio-Query-Parser.
+# Copyright (C) 2016 CERN.
+#
+# Invenio-Query-Parser is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio-Query-Parser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Compact representation of AST as flat tuples.
+
+The nodes are stored in postfix order, children before their parent.
+Every node is stored as the name of its class, followed by the value of
+a leaf or by the number of children of a list node.  Flat tuples of
+strings are cheaper to pickle and to send between processes than the AST
+nodes, and neither storing nor loading them recurses, whatever the depth
+of the tree.  The tuples are stored as JSON arrays by :func:`dump_json`
+and as a pickle by :func:`dump_bytes`.
+
+>>> from invenio_query_parser.fast_parser import FastParser
+>>> from invenio_query_parser.serialize import dump_tree, load_tree
+>>> data = dump_tree(FastParser().parse('title:higgs'))
+>>> data
+('Keyword', 'title', 'Value', 'higgs', 'KeywordOp')
+>>> load_tree(data)
+KeywordOp(Keyword('title'), Value('higgs'))
+>>> dump_json(load_tree(data))
+'["Keyword","title","Value","higgs","KeywordOp"]'
+"""
+
+from __future__ import absolute_import
+
+import json
+import pickle
+
+from . import ast
+from .contrib.spires import ast as spires_ast
+
+NODE_BASES = (ast.Leaf, ast.UnaryOp, ast.BinaryOp, ast.ListOp)
+
+
+def _node_types(*modules):
+    types = {}
+    for module in modules:
+        for name, value in vars(module).items():
+            if isinstance(value, type) and issubclass(value, NODE_BASES) \
+                    and value not in NODE_BASES:
+                types[name] = value
+    return types
+
+
+NODE_TYPES = _node_types(spires_ast, ast)
+"""Node classes indexed by the name stored in the tuples."""
+
+
+_LEAF, _UNARY, _BINARY, _LIST = range(4)
+
+_KINDS = {}
+"""Kind of the nodes indexed by their class."""
+
+
+def _kind(cls):
+    try:
+        return _KINDS[cls]
+    except KeyError:
+        for kind, base in ((_LEAF, ast.Leaf), (_UNARY, ast.UnaryOp),
+                           (_BINARY, ast.BinaryOp), (_LIST, ast.ListOp)):
+            if issubclass(cls, base):
+                _KINDS[cls] = kind
+                return kind
+        raise TypeError('Unknown node type %r.' % (cls, ))
+
+
+def dump_tree(node):
+    """Return flat tuple representing the AST in postfix order."""
+    # the reversed postfix order is the prefix order with the children
+    # taken from right to left
+    data = []
+    append = data.append
+    stack = [node]
+    pop = stack.pop
+    while stack:
+        node = pop()
+        cls = type(node)
+        kind = _kind(cls)
+        if kind == _LEAF:
+            append(node.value)
+        elif kind == _BINARY:
+            stack.append(node.left)
+            stack.append(node.right)
+        elif kind == _UNARY:
+            stack.append(node.op)
+        else:
+            append(len(node.children))
+            stack.extend(node.children)
+        append(cls.__name__)
+    data.reverse()
+    return tuple(data)
+
+
+def load_tree(data, node_types=None):
+    """Return AST from the flat tuple returned by :func:`dump_tree`.
+
+    :param node_types: node classes indexed by name, by default
+        :data:`NODE_TYPES`.
+    :raises ValueError: if the data does not represent a tree.
+    """
+    node_types = node_types or NODE_TYPES
+    nodes = []
+    items = iter(data)
+    try:
+        for name in items:
+            try:
+                cls = node_types[name]
+            except (KeyError, TypeError):
+                raise ValueError('Unknown node type %r.' % (name, ))
+
+            kind = _kind(cls)
+            if kind == _LEAF:
+                nodes.append(cls(next(items)))
+            elif kind == _BINARY:
+                right = nodes.pop()
+                nodes[-1] = cls(nodes[-1], right)
+            elif kind == _UNARY:
+                nodes[-1] = cls(nodes[-1])
+            else:
+                size = next(items)
+                if not 0 <= size <= len(nodes):
+                    raise ValueError('Invalid number of children.')
+                start = len(nodes) - size
+                children = nodes[start:]
+                del nodes[start:]
+                nodes.append(cls(children))
+    except (IndexError, StopIteration, TypeError):
+        raise ValueError('Invalid tree data.')
+
+    if len(nodes) != 1:
+        raise ValueError('Tree data must contain a single root node.')
+    return nodes[0]
+
+
+def dump_json(node):
+    """Return JSON array of the flat tuple representing the AST."""
+    return json.dumps(dump_tree(node), separators=(',', ':'))
+
+
+def load_json(data, node_types=None):
+    """Return AST from the JSON array returned by :func:`dump_json`."""
+    return load_tree(json.loads(data), node_types=node_types)
+
+
+def dump_bytes(node):
+    """Return binary representation of the AST.
+
+    The flat tuple is pickled with protocol 2, which is readable by
+    all supported versions of Python.
+    """
+    return pickle.dumps(dump_tree(node), 2)
+
+
+def load_bytes(data, node_types=None):
+    """Return AST from the data returned by :func:`dump_bytes`.
+
+    As any pickle, the data must come from a trusted source.
+    """
+    return load_tree(pickle.loads(data), node_types=node_types)
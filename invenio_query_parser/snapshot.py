@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio-Query-Parser.
+# Copyright (C) 2016 CERN.
+#
+# Invenio-Query-Parser is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio-Query-Parser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Snapshots of the compiled regular expressions of a parser configuration.
+
+Compiling the patterns of long lists of allowed keywords dominates the time
+needed to create a :class:`~invenio_query_parser.query_parser.QueryParser`
+or to run :func:`~invenio_query_parser.utils.build_valid_keywords_grammar`.
+Compiled patterns can not be pickled, so a snapshot stores the code of the
+regular expression engine instead, from which the patterns are rebuilt
+without parsing them again.  Loading a snapshot installs the patterns in
+:data:`~invenio_query_parser.cache.PATTERNS`, where the parsers find them.
+
+A snapshot is only valid for the keywords, the version of this package
+and the version of the regular expression engine it was made with.  It
+is a single file with a JSON header, which describes the patterns and
+holds a SHA-256 digest of the body, followed by the aligned code arrays
+of the patterns.
+
+>>> import os, tempfile
+>>> from invenio_query_parser.query_parser import QueryParser
+>>> keywords = ['author', 'title']
+>>> path = os.path.join(tempfile.mkdtemp(), 'keywords.snapshot')
+>>> use_snapshot(path, keywords)  # builds and saves the snapshot
+False
+>>> use_snapshot(path, keywords)  # loads the snapshot
+True
+>>> QueryParser(keywords).parse('title:higgs')
+KeywordOp(Keyword('title'), Value('higgs'))
+"""
+
+from __future__ import absolute_import
+
+import hashlib
+import json
+import os
+import platform
+import struct
+import sys
+import tempfile
+from array import array
+
+from .cache import PATTERNS
+from .fast_parser import keyword_patterns
+from .utils import build_valid_keywords_grammar, not_keyword_value_pattern
+from .version import __version__
+
+try:
+    from re import _compiler as sre_compile, _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_compile
+    import sre_parse
+
+_sre = sre_compile._sre
+
+MAGIC = b'IQPSNAP\0'
+"""Leading bytes of snapshot files."""
+
+VERSION = 1
+"""Version of the snapshot format."""
+
+_HEADER_SIZE = struct.Struct('<I')
+
+_CODE_TYPES = [code for code in 'HIL' if array(code).itemsize ==
+               _sre.CODESIZE]
+
+
+def runtime():
+    """Return description of the engine which can load the snapshots."""
+    return [platform.python_implementation(), list(sys.version_info[:2]),
+            _sre.MAGIC, _sre.CODESIZE, sys.byteorder, __version__]
+
+
+def configuration_patterns(keywords=None):
+    """Return patterns compiled by the parsers of the allowed keywords."""
+    if not keywords:
+        return []
+    return list(keyword_patterns(keywords)) + [
+        not_keyword_value_pattern(keywords)]
+
+
+def _keywords_key(keywords):
+    return sorted(set(keywords or ()))
+
+
+def _compile(pattern):
+    parsed = sre_parse.parse(pattern, 0)
+    state = getattr(parsed, 'state', None) or parsed.pattern
+    return state.flags, state.groups - 1, dict(state.groupdict), \
+        sre_compile._code(parsed, 0)
+
+
+def _build(pattern, flags, groups, groupindex, code):
+    indexgroup = [None] * (groups + 1)
+    for name, index in groupindex.items():
+        indexgroup[index] = name
+    if sys.version_info >= (3, 7):
+        indexgroup = tuple(indexgroup)
+    return _sre.compile(pattern, flags, code, groups, groupindex, indexgroup)
+
+
+def dump_snapshot(keywords=None):
+    """Return snapshot of the compiled patterns of the allowed keywords."""
+    if not _CODE_TYPES:
+        raise ValueError('Unsupported regular expression engine.')
+    code_type = _CODE_TYPES[0]
+
+    patterns, body = [], []
+    offset = 0
+    for pattern in configuration_patterns(keywords):
+        flags, groups, groupindex, code = _compile(pattern)
+        data = array(code_type, code).tobytes()
+        patterns.append([pattern, flags, groups, groupindex, offset,
+                         len(code)])
+        body.append(data)
+        offset += len(data)
+    body = b''.join(body)
+
+    header = json.dumps({
+        'version': VERSION,
+        'runtime': runtime(),
+        'keywords': _keywords_key(keywords),
+        'code_type': code_type,
+        'patterns': patterns,
+        'sha256': hashlib.sha256(body).hexdigest(),
+    }, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    # the code arrays start at a multiple of the size of their items
+    size = array(code_type).itemsize
+    header += b' ' * (-(len(MAGIC) + _HEADER_SIZE.size + len(header)) % size)
+    return MAGIC + _HEADER_SIZE.pack(len(header)) + header + body
+
+
+def load_snapshot(data, keywords=None):
+    """Install patterns of the snapshot and return their number.
+
+    :raises ValueError: if the snapshot is corrupted or was made for other
+        keywords, another version of this package or of the engine.
+    """
+    start = len(MAGIC) + _HEADER_SIZE.size
+    if data[:len(MAGIC)] != MAGIC or len(data) < start:
+        raise ValueError('Not a snapshot.')
+    size, = _HEADER_SIZE.unpack(data[len(MAGIC):start])
+    try:
+        header = json.loads(data[start:start + size].decode('utf-8'))
+    except ValueError:
+        raise ValueError('Corrupted snapshot header.')
+    body = data[start + size:]
+
+    if header.get('version') != VERSION:
+        raise ValueError('Unsupported snapshot version.')
+    if header['runtime'] != runtime():
+        raise ValueError('Snapshot made by another runtime.')
+    if header['keywords'] != _keywords_key(keywords):
+        raise ValueError('Snapshot made for other keywords.')
+    if hashlib.sha256(body).hexdigest() != header['sha256']:
+        raise ValueError('Corrupted snapshot.')
+
+    code_type = header['code_type']
+    item_size = array(code_type).itemsize
+    compiled = []
+    for pattern, flags, groups, groupindex, offset, length in \
+            header['patterns']:
+        code = array(code_type)
+        code.frombytes(body[offset:offset + length * item_size])
+        try:
+            compiled.append((pattern, _build(
+                pattern, flags, groups, groupindex, code.tolist())))
+        except (TypeError, RuntimeError) as error:
+            raise ValueError('Invalid snapshot pattern: %s' % (error, ))
+    for pattern, regex in compiled:
+        PATTERNS.put(pattern, regex)
+    return len(compiled)
+
+
+def save_snapshot(path, keywords=None):
+    """Write snapshot of the allowed keywords atomically to the path."""
+    _write(path, dump_snapshot(keywords))
+
+
+def _write(path, data):
+    directory = os.path.dirname(os.path.abspath(path))
+    descriptor, temporary = tempfile.mkstemp(dir=directory)
+    try:
+        with os.fdopen(descriptor, 'wb') as snapshot:
+            snapshot.write(data)
+        getattr(os, 'replace', os.rename)(temporary, path)
+    except Exception:
+        os.remove(temporary)
+        raise
+
+
+def use_snapshot(path, keywords=None):
+    """Load snapshot of the allowed keywords or build it from scratch.
+
+    Return True when the patterns are loaded from the snapshot.  The
+    patterns of a missing, corrupted or stale snapshot are compiled from
+    scratch, and the snapshot is replaced unless the path is not writable.
+    Snapshots rely on private functions of the regular expression engine;
+    when they fail, the configuration is built with
+    :func:`~invenio_query_parser.utils.build_valid_keywords_grammar`
+    and no snapshot is written.
+    """
+    try:
+        with open(path, 'rb') as snapshot:
+            data = snapshot.read()
+    except (IOError, OSError):
+        data = None
+    if data is not None:
+        try:
+            load_snapshot(data, keywords)
+            return True
+        except Exception:  # pylint: disable=W0703
+            pass
+
+    try:
+        data = dump_snapshot(keywords)
+        load_snapshot(data, keywords)
+    except Exception:  # pylint: disable=W0703
+        build_valid_keywords_grammar(keywords)
+        return False
+    # the snapshot is only written once it has been loaded
+    try:
+        _write(path, data)
+    except (IOError, OSError):
+        pass
+    return False
@@ -26,26 +26,144 @@
 from __future__ import absolute_import, print_function
 
 import re
+import threading
 
-import pkg_resources
-from pypeg2 import attr
+MARC_TAG = r"\d\d\d\w{0,3}"
+"""Regular expression of MARC tags allowed besides the keywords."""
+
+
+WORD_BOUNDARY = re.compile(r"\b")
+
+
+def _is_word(char):
+    return char.isalnum() or char == '_'
+
+
+class KeywordMatcher(object):
+    """Recognise the longest keyword at the beginning of a text.
+
+    The keyword must end at a word boundary.  The text is scanned once for
+    the longest run of characters used in keywords, which is looked up in a
+    set together with its prefixes ending at a word boundary from the
+    longest to the shortest, so a short keyword never shadows a longer one.
+    An instance can be used in a *pypeg2* grammar instead of a regular
+    expression.
+
+    >>> matcher = KeywordMatcher(['t', 'title', 'tc'], ignore_case=True)
+    >>> matcher.match('Title:foo')
+    'Title'
+    >>> matcher.match('tcx') is None
+    True
+
+    :param keywords: allowed keywords.
+    :param ignore_case: match keywords case insensitively.
+    :param prefix: regular expression of other keywords tried before the
+        allowed ones.
+    """
+
+    def __init__(self, keywords, ignore_case=False, prefix=None):
+        """Build the lookup table of keywords."""
+        self.ignore_case = ignore_case
+        self.prefix = re.compile('(?:{0})\\b'.format(prefix)) \
+            if prefix else None
+        keywords = set(keywords)
+        if ignore_case:
+            keywords = set(keyword.lower() for keyword in keywords)
+        self.keywords = frozenset(keywords)
+        chars = set(''.join(keywords))
+        self.candidate = re.compile('[{0}]+'.format(''.join(
+            re.escape(char) for char in sorted(chars))) if chars else '(?!)',
+            re.I if ignore_case else 0)
+
+        alternatives = sorted(keywords, key=lambda k: (-len(k), k))
+        alternatives = [re.escape(keyword) for keyword in alternatives]
+        if prefix:
+            alternatives.insert(0, prefix)
+        self.pattern = '({0})\\b'.format('|'.join(alternatives))
+        """Equivalent regular expression identifying the matcher."""
+
+    def match(self, text, pos=0):
+        """Return the keyword at the position of the text or None."""
+        if self.prefix is not None:
+            match = self.prefix.match(text, pos)
+            if match is not None:
+                return match.group()
+
+        match = self.candidate.match(text, pos)
+        if match is None:
+            return None
+        run = match.group()
+        if self.ignore_case:
+            run = run.lower()
+        if run in self.keywords and self._boundary(text, match.end()):
+            return match.group()
+
+        # shorter keywords can only end at word boundaries inside the run
+        boundaries = [boundary.start() for boundary in
+                      WORD_BOUNDARY.finditer(run, 1)]
+        for end in reversed(boundaries):
+            if end < len(run) and run[:end] in self.keywords:
+                return text[pos:pos + end]
+        return None
+
+    @staticmethod
+    def _boundary(text, end):
+        after = end < len(text) and _is_word(text[end])
+        return end > 0 and _is_word(text[end - 1]) != after
+
+    def parse(self, parser, text, pos):  # pylint: disable=W0613
+        """Parse the keyword at the beginning of the text for *pypeg2*."""
+        keyword = self.match(text)
+        if keyword is None:
+            return text, SyntaxError('Expected keyword')
+        return text[len(keyword):], keyword
+
+
+_grammar_lock = threading.Lock()
+"""Lock serializing the builds of the grammar, not the parses using it."""
+
+
+def not_keyword_value_pattern(keywords):
+    """Return regular expression of values looking like other keywords."""
+    return r'\b(?!\d\d\d\w{{0,3}}|{0}:)\S+\b:'.format(":|".join(keywords))
 
 
 def build_valid_keywords_grammar(keywords=None):
-    """Update parser grammar to add a list of allowed keywords."""
+    """Update parser grammar to add a list of allowed keywords.
+
+    This function is not thread-safe.  The grammar is shared by the whole
+    process and parses running in other threads read its rules without
+    locking, so they can use a mix of the old and new rules while it is
+    built.  Build it before queries are parsed from other threads, or use
+    :class:`~invenio_query_parser.query_parser.QueryParser`, e.g. with
+    ``invenio_query_factory(engine='fast', parser=QueryParser(keywords))``,
+    to parse queries with different keywords at the same time.
+    """
+    from pypeg2 import attr
+
+    from invenio_query_parser.cache import compile_pattern
     from invenio_query_parser.parser import KeywordQuery, KeywordRule, \
         NotKeywordValue, SimpleQuery, ValueQuery
 
-    if keywords:
-        KeywordRule.grammar = attr('value', re.compile(
-            r"(\d\d\d\w{{0,3}}|{0})\b".format("|".join(keywords), re.I)))
+    with _grammar_lock:
+        # rules are replaced before the query referring to them
+        if keywords:
+            NotKeywordValue.grammar = attr('value', compile_pattern(
+                not_keyword_value_pattern(keywords)))
+
+            KeywordRule.grammar = attr('value', KeywordMatcher(
+                keywords, prefix=MARC_TAG))
+
+            SimpleQuery.grammar = attr(
+                'op', [NotKeywordValue, KeywordQuery, ValueQuery])
+        else:
+            SimpleQuery.grammar = attr('op', [KeywordQuery, ValueQuery])
+            KeywordRule.grammar = attr(
+                'value', re.compile(r"[\w\d]+(\.[\w\d]+)*"))
+
 
-        NotKeywordValue.grammar = attr('value', re.compile(
-            r'\b(?!\d\d\d\w{{0,3}}|{0}:)\S+\b:'.format(
-                ":|".join(keywords))))
+def get_keywords_grammar_key():
+    """Return hashable key identifying the active grammar of keywords."""
+    from invenio_query_parser.parser import KeywordRule
 
-        SimpleQuery.grammar = attr(
-            'op', [NotKeywordValue, KeywordQuery, ValueQuery])
-    else:
-        KeywordRule.grammar = attr('value', re.compile(r"[\w\d]+(\.[\w\d]+)*"))
-        SimpleQuery.grammar = attr('op', [KeywordQuery, ValueQuery])
+    return KeywordRule.grammar.thing.pattern
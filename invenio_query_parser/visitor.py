@@ -23,13 +23,33 @@
 
 """Store the actual visitor methods."""
 
+from __future__ import absolute_import
+
+import weakref
+
+from . import ast
+
 
 class make_visitor(object):
-    """Make a visitor decorator."""
+    """Make a visitor decorator.
+
+    The method visiting a node is looked up by the type of the node, then
+    by its base classes in the method resolution order, first among the
+    methods registered here and then among the inherited ``methods``.  The
+    result is cached per type, so a visit costs a single dictionary lookup.
+    Registering a method clears the caches of this visitor and of the
+    visitors inheriting its methods.
+    """
 
     def __init__(self, methods=None):
         self._methods = {}
+        self._cache = {}
+        self._walker = None
+        # visitors inheriting the methods registered here
+        self._children = weakref.WeakSet()
         self.methods = methods or {}
+        if isinstance(methods, make_visitor):
+            methods._children.add(self)
 
     def __getitem__(self, key):
         if key in self._methods:
@@ -38,16 +58,47 @@ class make_visitor(object):
 
     def __setitem__(self, key, value):
         self._methods[key] = value
+        pending = [self]
+        while pending:
+            methods = pending.pop()
+            methods._cache.clear()
+            methods._walker = None
+            pending.extend(methods._children)
+
+    def registered(self):
+        """Return dictionary of the methods registered here or inherited."""
+        methods = self.methods
+        if isinstance(methods, make_visitor):
+            methods = methods.registered()
+        methods = dict(methods)
+        methods.update(self._methods)
+        return methods
+
+    def resolve(self, arg_type):
+        """Return method visiting nodes of the type or raise KeyError."""
+        for base in getattr(arg_type, '__mro__', (arg_type, )):
+            try:
+                method = self[base]
+            except KeyError:
+                continue
+            self._cache[arg_type] = method
+            return method
+        raise KeyError(arg_type)
 
     # The actual @visitor decorator
     def __call__(self, arg_type):
         """Decorator that creates a visitor method."""
+        cache = self._cache
+        resolve = self.resolve
 
         # Delegating visitor implementation
 
         def _visitor_impl(new_self, arg, *args, **kwargs):
             """Actual visitor method implementation."""
-            method = self[type(arg)]
+            try:
+                method = cache[type(arg)]
+            except KeyError:
+                method = resolve(type(arg))
             return method(new_self, arg, *args, **kwargs)
 
         def decorator(fn):
@@ -56,3 +107,160 @@ class make_visitor(object):
             return _visitor_impl
 
         return decorator
+
+
+_LEAF, _UNARY, _BINARY, _LIST = range(4)
+
+_KINDS = {
+    ast.Leaf: _LEAF,
+    ast.UnaryOp: _UNARY,
+    ast.BinaryOp: _BINARY,
+    ast.ListOp: _LIST,
+}
+"""Traversal of nodes by the class defining their ``accept`` method."""
+
+_node_kinds = {}
+
+
+def _node_kind(cls):
+    try:
+        return _node_kinds[cls]
+    except KeyError:
+        pass
+    kind = None
+    for base in cls.__mro__:
+        if 'accept' in vars(base):
+            kind = _KINDS.get(base)
+            break
+    _node_kinds[cls] = kind
+    return kind
+
+
+def accept(tree, visitor, memoize=False):
+    """Return ``tree.accept(visitor)`` computed without recursion.
+
+    Nodes are visited in the same post-order as by their ``accept`` methods
+    using an explicit stack, so deep trees do not exceed the recursion
+    limit.  Nodes overriding ``accept`` are delegated to their own method.
+
+    With ``memoize`` a node found several times in the tree, e.g. after
+    :class:`~invenio_query_parser.walkers.interner.Interner`, is visited
+    once and its result is reused, so the visitor must not change the
+    results of the children in place.
+
+    >>> from invenio_query_parser.ast import OrOp, Value, ValueQuery
+    >>> from invenio_query_parser.walkers.match_unit import MatchUnit
+    >>> tree = ValueQuery(Value('0'))
+    >>> for value in range(1, 10000):
+    ...     tree = OrOp(tree, ValueQuery(Value(str(value))))
+    >>> accept(tree, MatchUnit({'id': '9999'}))
+    True
+    """
+    visit = visitor.visit
+    kinds = _node_kinds
+    # results indexed by the identity of the nodes of the tree
+    memo = {} if memoize else None
+    results = []
+    # pending nodes and the number of their visited children, or None
+    stack = [(tree, None)]
+    pop, push = stack.pop, stack.append
+
+    while stack:
+        node, size = pop()
+        if memo is not None and size is None and id(node) in memo:
+            results.append(memo[id(node)])
+            continue
+        try:
+            kind = kinds[type(node)]
+        except KeyError:
+            kind = _node_kind(type(node))
+
+        if kind is _LEAF:
+            results.append(visit(node))
+        elif kind is None:
+            results.append(node.accept(visitor))
+        elif size is None:
+            if kind is _BINARY:
+                push((node, 2))
+                push((node.right, None))
+                push((node.left, None))
+            elif kind is _UNARY:
+                push((node, 1))
+                push((node.op, None))
+            else:
+                children = list(node.children)
+                push((node, len(children)))
+                for child in reversed(children):
+                    push((child, None))
+        elif kind is _BINARY:
+            right = results.pop()
+            results[-1] = visit(node, results[-1], right)
+        elif kind is _UNARY:
+            results[-1] = visit(node, results[-1])
+        else:
+            start = len(results) - size
+            children = results[start:]
+            del results[start:]
+            results.append(visit(node, children))
+
+        if memo is not None and (
+                size is not None or kind is _LEAF or kind is None):
+            memo[id(node)] = results[-1]
+
+    return results[0]
+
+
+_WALK_CHILDREN = {
+    _LEAF: '',
+    _UNARY: ', walk(node.op, visitor)',
+    _BINARY: ', walk(node.left, visitor), walk(node.right, visitor)',
+    _LIST: ', [walk(child, visitor) for child in node.children]',
+}
+"""Arguments of the visitor methods for each kind of node."""
+
+
+def compile_walker(cls, name='visitor'):
+    """Return function walking trees with instances of the visitor class.
+
+    The function ``walk(tree, visitor)`` returns ``tree.accept(visitor)``.
+    It is generated from the methods registered with the
+    :class:`make_visitor` attribute of the class: a chain of
+    ``type(node) is ...`` tests calls the method of the node type with the
+    results of the walk of its children, so neither the ``accept`` methods
+    of the nodes nor the dispatch of :class:`make_visitor` are involved.
+    Other nodes, e.g. instances of subclasses, fall back to their
+    ``accept`` method.  As ``accept`` the function is recursive.
+
+    The function is cached until a method is registered again.
+
+    >>> from invenio_query_parser.fast_parser import FastParser
+    >>> from invenio_query_parser.walkers.repr_printer import TreeRepr
+    >>> walk = compile_walker(TreeRepr)
+    >>> walk(FastParser().parse('title:higgs -year:2012'), TreeRepr())
+    "(`title`:'higgs' and (not `year`:'2012'))"
+    """
+    methods = getattr(cls, name)
+    if methods._walker is not None:
+        return methods._walker
+
+    kinds = []
+    for arg_type, method in methods.registered().items():
+        kind = _node_kind(arg_type) if isinstance(arg_type, type) else None
+        if kind is not None:
+            kinds.append((kind, arg_type.__name__, arg_type, method))
+    kinds.sort(key=lambda item: item[:2])
+
+    namespace = {}
+    lines = ['def walk(node, visitor):', '    cls = type(node)']
+    for index, (kind, _, arg_type, method) in enumerate(kinds):
+        namespace['type%d' % index] = arg_type
+        namespace['visit%d' % index] = method
+        lines.append('    if cls is type%d:' % index)
+        lines.append('        return visit%d(visitor, node%s)' % (
+            index, _WALK_CHILDREN[kind]))
+    lines.append('    return node.accept(visitor)')
+
+    code = compile('\n'.join(lines), '<walker of %s>' % cls.__name__, 'exec')
+    exec(code, namespace)
+    methods._walker = namespace['walk']
+    return methods._walker
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio-Query-Parser.
+# Copyright (C) 2016 CERN.
+#
+# Invenio-Query-Parser is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio-Query-Parser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Share structurally identical subtrees of AST.
+
+>>> from invenio_query_parser.fast_parser import FastParser
+>>> from invenio_query_parser.walkers.interner import Interner
+>>> tree = Interner()(FastParser().parse('a:x AND NOT a:x'))
+>>> tree.left is tree.right.op
+True
+"""
+
+import copy
+from collections import OrderedDict
+
+from .. import ast
+from ..visitor import accept
+
+
+class Interner(object):
+    """Replace subtrees by a single instance of equal subtrees (hash-consing).
+
+    The table of unique nodes is kept between calls, so the nodes of many
+    trees can be shared.  It holds at most ``maxsize`` nodes and evicts the
+    least recently used one when it is full, so a long lived interner does
+    not retain every node it has seen.  A node is unique by its type and
+    value, or by its type and the identity of its unique children, hence
+    nodes are compared without walking their subtrees.  Nodes of the given
+    tree are reused when possible.
+
+    Interned trees must not be changed in place; use
+    :func:`~invenio_query_parser.cache.copy_tree` to get a private copy.
+    Walk them with :func:`~invenio_query_parser.visitor.accept` and
+    ``memoize=True`` to visit every unique subtree once.
+
+    :param maxsize: maximum number of unique nodes in the table, or None
+        for an unbounded table.
+    """
+
+    def __init__(self, maxsize=65536):
+        """Initialize empty table of unique nodes."""
+        if maxsize is not None and maxsize < 1:
+            raise ValueError('Interner size must be positive.')
+        self.maxsize = maxsize
+        self.nodes = OrderedDict()
+
+    def __call__(self, tree):
+        """Return the tree made of unique nodes."""
+        return accept(tree, self)
+
+    def node(self, cls, *args):
+        """Return unique node ``cls(*args)`` of unique children."""
+        return self.visit(cls(*args), *args)
+
+    def visit(self, node, *children):
+        """Return the unique node equal to the node with unique children."""
+        if isinstance(node, ast.Leaf):
+            key = (type(node), node.value)
+        elif isinstance(node, ast.ListOp):
+            children = list(children[0])
+            key = (type(node), ) + tuple(map(id, children))
+        else:
+            key = (type(node), ) + tuple(map(id, children))
+
+        nodes = self.nodes
+        unique = nodes.get(key)
+        if unique is None:
+            # the unique node keeps its children alive, so their identity
+            # in the key is not reused while the key is in the table, even
+            # after the children are evicted
+            unique = nodes.setdefault(key, self._rebuild(node, children))
+            if self.maxsize is not None and len(nodes) > self.maxsize:
+                nodes.popitem(last=False)
+        elif self.maxsize is not None:
+            # the node becomes the most recently used one
+            nodes[key] = nodes.pop(key, unique)
+        return unique
+
+    @staticmethod
+    def _rebuild(node, children):
+        if isinstance(node, ast.BinaryOp):
+            if node.left is not children[0] or node.right is not children[1]:
+                node = copy.copy(node)
+                node.left, node.right = children
+        elif isinstance(node, ast.UnaryOp):
+            if node.op is not children[0]:
+                node = copy.copy(node)
+                node.op, = children
+        elif isinstance(node, ast.ListOp):
+            if len(node.children) != len(children) or any(
+                    old is not new
+                    for old, new in zip(node.children, children)):
+                node = copy.copy(node)
+                node.children = children
+        return node
@@ -23,14 +23,16 @@
 
 """Implement AST vistor."""
 
-import re
 from collections import MutableMapping, Sequence
+from functools import reduce
+from operator import and_, itemgetter, or_
 
 import six
 
-from invenio_query_parser.ast import AndOp, DoubleQuotedValue, EmptyQuery, \
-    Keyword, KeywordOp, NotOp, OrOp, RangeOp, RegexValue, SingleQuotedValue, \
-    Value, ValueQuery
+from invenio_query_parser.ast import AndList, AndOp, DoubleQuotedValue, \
+    EmptyQuery, Keyword, KeywordOp, NotOp, OrList, OrOp, PatternLeaf, \
+    RangeOp, RegexValue, SingleQuotedValue, Value, ValueQuery
+from invenio_query_parser.cache import compile_pattern
 from invenio_query_parser.visitor import make_visitor
 
 
@@ -39,19 +41,38 @@ def dottable_getitem(data, dottable_key, default=None):
 
     It does not address indexes in iterables.
     """
-    def getitem(value, *keys):
-        if not keys:
-            return default
-        elif len(keys) == 1:
-            key = keys[0]
-            if isinstance(value, MutableMapping):
-                return value.get(key, default)
-            elif isinstance(value, Sequence) and \
-                    not isinstance(value, six.string_types):
-                return [getitem(v, key) for v in value]
-            return default
-        return getitem(getitem(value, keys[0]), *keys[1:])
-    return getitem(data, *dottable_key.split('.'))
+    return getitem_path(data, dottable_key.split('.'), default=default)
+
+
+def getitem_path(data, keys, default=None):
+    """Return item addressed by the already split dottable key."""
+    if not keys:
+        return default
+    for key in keys:
+        data = _getitem(data, key, default)
+    return data
+
+
+def _getitem(value, key, default):
+    if isinstance(value, MutableMapping):
+        return value.get(key, default)
+    elif isinstance(value, Sequence) and \
+            not isinstance(value, six.string_types):
+        return [_getitem(v, key, default) for v in value]
+    return default
+
+
+def search_value(p, m='a'):
+    """Return search value compiled for non exact search.
+
+    The value can be a string, a compiled pattern, a range tuple or a value
+    node carrying its compiled pattern.
+    """
+    if isinstance(p, PatternLeaf):
+        return p.value if m == 'e' else p.pattern
+    if m != 'e' and isinstance(p, six.string_types):
+        return compile_pattern(p)
+    return p
 
 
 def match_unit(data, p, m='a'):
@@ -60,15 +81,17 @@ def match_unit(data, p, m='a'):
         return p is None
 
     # compile search value only once for non exact search
-    if m != 'e' and isinstance(p, six.string_types):
-        p = re.compile(p)
+    return _match_unit(data, search_value(p, m), m)
+
+
+def _match_unit(data, p, m):
+    if data is None:
+        return p is None
 
     if isinstance(data, Sequence) and not isinstance(data, six.string_types):
-        return any([match_unit(field, p, m=m)
-                    for field in data])
+        return any(_match_unit(field, p, m) for field in data)
     elif isinstance(data, MutableMapping):
-        return any([match_unit(field, p, m=m)
-                    for field in data.values()])
+        return any(_match_unit(field, p, m) for field in data.values())
 
     # Inclusive range query
     if isinstance(p, tuple):
@@ -90,6 +113,25 @@ class MatchUnit(object):
         self.data = data
         self.getitem = getitem
 
+    def match(self, node):
+        """Evaluate the tree top-down.
+
+        Unlike ``node.accept(self)``, the right operand of ``AND`` and ``OR``
+        is only matched when the left operand does not decide the result.
+        """
+        node_type = type(node)
+        if node_type is AndOp:
+            return self.match(node.left) and self.match(node.right)
+        elif node_type is OrOp:
+            return self.match(node.left) or self.match(node.right)
+        elif node_type is NotOp:
+            return not self.match(node.op)
+        elif node_type is AndList:
+            return all(self.match(child) for child in node.children)
+        elif node_type is OrList:
+            return any(self.match(child) for child in node.children)
+        return node.accept(self)
+
     # pylint: disable=W0613,E0102
 
     @visitor(AndOp)
@@ -100,6 +142,14 @@ class MatchUnit(object):
     def visit(self, node, left, right):
         return left | right
 
+    @visitor(AndList)
+    def visit(self, node, children):
+        return reduce(and_, children)
+
+    @visitor(OrList)
+    def visit(self, node, children):
+        return reduce(or_, children)
+
     @visitor(NotOp)
     def visit(self, node, op):
         return not op
@@ -118,11 +168,11 @@ class MatchUnit(object):
 
     @visitor(Value)
     def visit(self, node):
-        return dict(p=node.value)
+        return dict(p=node)
 
     @visitor(SingleQuotedValue)
     def visit(self, node):
-        return dict(p=node.value, m='p')
+        return dict(p=node, m='p')
 
     @visitor(DoubleQuotedValue)
     def visit(self, node):
@@ -130,14 +180,226 @@ class MatchUnit(object):
 
     @visitor(RegexValue)
     def visit(self, node):
-        return dict(p=node.value, m='r')
+        return dict(p=node, m='r')
 
     @visitor(RangeOp)
     def visit(self, node, left, right):
-        return dict(p=(left['p'], right['p']))
+        return dict(p=(node.left.value, node.right.value))
 
     @visitor(EmptyQuery)
     def visit(self, node):
         return True
 
     # pylint: enable=W0612,E0102
+
+
+class MatchCostOptimizer(object):
+    """Reorder operands of ``AND`` and ``OR`` so the cheaper one is first.
+
+    The cost estimates the work needed to match a record: exact matches
+    are cheaper than pattern searches and searching the whole record is
+    more expensive than searching a keyword.  The walker returns
+    ``(cost, tree)`` and does not modify the original tree.
+
+    >>> from invenio_query_parser.fast_parser import FastParser
+    >>> tree = FastParser().parse('quark AND title:"Higgs"')
+    >>> tree.accept(MatchCostOptimizer())[1]
+    ... # doctest: +NORMALIZE_WHITESPACE
+    AndOp(KeywordOp(Keyword('title'), DoubleQuotedValue('Higgs')),
+          ValueQuery(Value('quark')))
+    """
+
+    visitor = make_visitor()
+
+    value_query_factor = 10
+    """Cost multiplier for searching values in the whole record."""
+
+    # pylint: disable=W0613,E0102
+
+    @visitor(AndOp)
+    def visit(self, node, left, right):
+        if right[0] < left[0]:
+            left, right = right, left
+        return left[0] + right[0], type(node)(left[1], right[1])
+
+    @visitor(OrOp)
+    def visit(self, node, left, right):
+        if right[0] < left[0]:
+            left, right = right, left
+        return left[0] + right[0], type(node)(left[1], right[1])
+
+    @visitor(AndList)
+    def visit(self, node, children):
+        children = sorted(children, key=itemgetter(0))
+        return sum(cost for cost, child in children), \
+            type(node)([child for cost, child in children])
+
+    @visitor(OrList)
+    def visit(self, node, children):
+        children = sorted(children, key=itemgetter(0))
+        return sum(cost for cost, child in children), \
+            type(node)([child for cost, child in children])
+
+    @visitor(NotOp)
+    def visit(self, node, op):
+        return op[0], type(node)(op[1])
+
+    @visitor(KeywordOp)
+    def visit(self, node, left, right):
+        return left[0] + right[0], type(node)(left[1], right[1])
+
+    @visitor(ValueQuery)
+    def visit(self, node, op):
+        return op[0] * self.value_query_factor, type(node)(op[1])
+
+    @visitor(Keyword)
+    def visit(self, node):
+        return 1, node
+
+    @visitor(Value)
+    def visit(self, node):
+        return 2, node
+
+    @visitor(SingleQuotedValue)
+    def visit(self, node):
+        return 2, node
+
+    @visitor(DoubleQuotedValue)
+    def visit(self, node):
+        return 1, node
+
+    @visitor(RegexValue)
+    def visit(self, node):
+        return 3, node
+
+    @visitor(RangeOp)
+    def visit(self, node, left, right):
+        return 1, type(node)(left[1], right[1])
+
+    @visitor(EmptyQuery)
+    def visit(self, node):
+        return 0, node
+
+    # pylint: enable=W0612,E0102
+
+
+def build_matcher(p, m='a'):
+    """Return function matching data like ``match_unit(data, p, m)``.
+
+    The search value is compiled once and nested values stop being
+    matched as soon as one of them matches.
+    """
+    if isinstance(p, tuple):
+        left, right = p
+
+        def test(data):
+            return (left <= data) and (data <= right)
+    elif m == 'e':
+        p = search_value(p, m)
+
+        def test(data):
+            return six.text_type(data) == p
+    else:
+        search = search_value(p, m).search
+
+        def test(data):
+            return search(six.text_type(data)) is not None
+
+    def matcher(data):
+        if data is None:
+            return p is None
+        if isinstance(data, six.string_types):
+            return test(data)
+        if isinstance(data, Sequence):
+            return any(matcher(field) for field in data)
+        elif isinstance(data, MutableMapping):
+            return any(matcher(field) for field in data.values())
+        return test(data)
+    return matcher
+
+
+class MatchUnitCompiler(object):
+    """Compile AST to a predicate matching data like ``MatchUnit``.
+
+    The tree is walked only once and the returned function can be called
+    for many records:
+
+    >>> from invenio_query_parser.fast_parser import FastParser
+    >>> tree = FastParser().parse('title:"Test" AND NOT data:foo')
+    >>> predicate = tree.accept(MatchUnitCompiler())
+    >>> predicate({'title': 'Test', 'data': 'bar'})
+    True
+    >>> predicate({'title': 'Test', 'data': 'foo'})
+    False
+    """
+
+    visitor = make_visitor()
+
+    def __init__(self, getitem=dottable_getitem):
+        """Initialize compiler with keyword value getter."""
+        self.getitem = getitem
+
+    # pylint: disable=W0613,E0102
+
+    @visitor(AndOp)
+    def visit(self, node, left, right):
+        return lambda data: left(data) and right(data)
+
+    @visitor(OrOp)
+    def visit(self, node, left, right):
+        return lambda data: left(data) or right(data)
+
+    @visitor(AndList)
+    def visit(self, node, children):
+        return lambda data: all(child(data) for child in children)
+
+    @visitor(OrList)
+    def visit(self, node, children):
+        return lambda data: any(child(data) for child in children)
+
+    @visitor(NotOp)
+    def visit(self, node, op):
+        return lambda data: not op(data)
+
+    @visitor(KeywordOp)
+    def visit(self, node, left, right):
+        matcher = build_matcher(**right)
+        return lambda data: matcher(left(data))
+
+    @visitor(ValueQuery)
+    def visit(self, node, op):
+        return build_matcher(**op)
+
+    @visitor(Keyword)
+    def visit(self, node):
+        getitem, keyword = self.getitem, node.value
+        if getitem is dottable_getitem:
+            keys = keyword.split('.')
+            return lambda data: getitem_path(data, keys)
+        return lambda data: getitem(data, keyword)
+
+    @visitor(Value)
+    def visit(self, node):
+        return dict(p=node)
+
+    @visitor(SingleQuotedValue)
+    def visit(self, node):
+        return dict(p=node, m='p')
+
+    @visitor(DoubleQuotedValue)
+    def visit(self, node):
+        return dict(p=node.value, m='e')
+
+    @visitor(RegexValue)
+    def visit(self, node):
+        return dict(p=node, m='r')
+
+    @visitor(RangeOp)
+    def visit(self, node, left, right):
+        return dict(p=(node.left.value, node.right.value))
+
+    @visitor(EmptyQuery)
+    def visit(self, node):
+        return lambda data: True
+
+    # pylint: enable=W0612,E0102
@@ -23,8 +23,8 @@
 
 """Implement query printer."""
 
-from ..ast import AndOp, DoubleQuotedValue, Keyword, KeywordOp, NotOp, OrOp, \
-    RangeOp, RegexValue, SingleQuotedValue, Value
+from ..ast import AndList, AndOp, DoubleQuotedValue, Keyword, KeywordOp, \
+    NotOp, OrList, OrOp, RangeOp, RegexValue, SingleQuotedValue, Value
 from ..visitor import make_visitor
 
 
@@ -41,6 +41,14 @@ class TreePrinter(object):
     def visit(self, node, left, right):
         return '(%s or %s)' % (left, right)
 
+    @visitor(AndList)
+    def visit(self, node, children):
+        return '(%s)' % ' and '.join(children)
+
+    @visitor(OrList)
+    def visit(self, node, children):
+        return '(%s)' % ' or '.join(children)
+
     @visitor(NotOp)
     def visit(self, node, op):
         return '(not %s)' % op
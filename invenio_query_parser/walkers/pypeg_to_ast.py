@@ -30,6 +30,28 @@ from ..visitor import make_visitor
 class PypegConverter(object):
     visitor = make_visitor()
 
+    def __init__(self, flatten=False):
+        """Initialize converter.
+
+        :param flatten: build :class:`~invenio_query_parser.ast.AndList`
+            and :class:`~invenio_query_parser.ast.OrList` nodes from chains
+            of the same boolean operator.
+        """
+        self.flatten = flatten
+
+    def build_boolean_query(self, children):
+        """Join the query and boolean operations missing the left operand."""
+        # Build the boolean expression, left to right
+        # x and y or z and ... --> ((x and y) or z) and ...
+        tree = children[0]
+        for booleanNode in children[1:]:
+            if self.flatten:
+                tree = ast.flatten(type(booleanNode), tree, booleanNode.right)
+            else:
+                booleanNode.left = tree
+                tree = booleanNode
+        return tree
+
     # pylint: disable=W0613,E0102
 
     @visitor(parser.Whitespace)
@@ -130,13 +152,7 @@ class PypegConverter(object):
 
     @visitor(parser.Query)
     def visit(self, node, children):
-        # Build the boolean expression, left to right
-        # x and y or z and ... --> ((x and y) or z) and ...
-        tree = children[0]
-        for booleanNode in children[1:]:
-            booleanNode.left = tree
-            tree = booleanNode
-        return tree
+        return self.build_boolean_query(children)
 
     @visitor(parser.EmptyQueryRule)
     def visit(self, node):
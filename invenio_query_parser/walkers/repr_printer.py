@@ -23,13 +23,22 @@
 
 """Implement representation printer."""
 
-from ..ast import AndOp, DoubleQuotedValue, EmptyQuery, GreaterEqualOp, \
-    GreaterOp, Keyword, KeywordOp, LowerEqualOp, LowerOp, NotOp, OrOp, \
-    RangeOp, RegexValue, SingleQuotedValue, Value, ValueQuery
+from ..ast import AndList, AndOp, DoubleQuotedValue, EmptyQuery, \
+    GreaterEqualOp, GreaterOp, Keyword, KeywordOp, LowerEqualOp, LowerOp, \
+    NotOp, OrList, OrOp, RangeOp, RegexValue, SingleQuotedValue, Value, \
+    ValueQuery
 from ..visitor import make_visitor
 
 
 class TreeRepr(object):
+    """Print trees with explicit parentheses.
+
+    The string of every node contains the strings of its operands, so
+    printing a chain of ``n`` binary operators copies ``O(n**2)``
+    characters.  Print flattened trees, whose lists are joined in linear
+    time, e.g. from ``FastParser(flatten=True)``, for very long queries.
+    """
+
     visitor = make_visitor()
 
     # pylint: disable=W0613,E0102
@@ -42,6 +51,14 @@ class TreeRepr(object):
     def visit(self, node, left, right):
         return '(%s or %s)' % (left, right)
 
+    @visitor(AndList)
+    def visit(self, node, children):
+        return '(%s)' % ' and '.join(children)
+
+    @visitor(OrList)
+    def visit(self, node, children):
+        return '(%s)' % ' or '.join(children)
+
     @visitor(NotOp)
     def visit(self, node, op):
         return '(not %s)' % op
@@ -44,12 +44,18 @@ tests_require = [
 ]
 
 extras_require = {
+    'benchmarks': [
+        'pytest-benchmark>=3.0.0',
+    ],
     'docs': [
         'sphinx_rtd_theme>=0.1.9',
     ],
     'elasticsearch': [
         'elasticsearch-dsl>=2.0.0',
     ],
+    'numpy': [
+        'numpy>=1.9',
+    ],
     'tests': tests_require,
 }
 
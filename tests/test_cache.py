@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio-Query-Parser.
+# Copyright (C) 2016 CERN.
+#
+# Invenio-Query-Parser is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio-Query-Parser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Unit tests for the cache of parsed queries."""
+
+import pytest
+
+from invenio_query_parser.ast import AndOp, Keyword, KeywordOp, Value, \
+    ValueQuery
+from invenio_query_parser.cache import ParseCache, copy_tree
+from invenio_query_parser.fast_parser import FastParser
+from invenio_query_parser.utils import build_valid_keywords_grammar
+
+
+def test_copy_tree():
+    """Test copied tree does not share nodes."""
+    tree = AndOp(KeywordOp(Keyword('foo'), Value('bar')),
+                 ValueQuery(Value('baz')))
+    new = copy_tree(tree)
+    assert new == tree
+    new.left.left.value = 'title'
+    assert tree.left.left.value == 'foo'
+
+
+def test_hits_and_misses():
+    """Test counters and normalization of cache keys."""
+    cache = ParseCache()
+    parse = FastParser().parse
+    assert cache.get('foo:bar', parse) == \
+        KeywordOp(Keyword('foo'), Value('bar'))
+    assert cache.get(' foo:bar\t', parse) == \
+        KeywordOp(Keyword('foo'), Value('bar'))
+    assert cache.get('foo:bar', parse, grammar='other') == \
+        KeywordOp(Keyword('foo'), Value('bar'))
+    assert cache.info() == (1, 2, 0, 1024, 2)
+
+    cache.clear()
+    assert cache.info() == (0, 0, 0, 1024, 0)
+
+
+def test_cached_tree_is_not_mutated():
+    """Test trees leaving the cache are copies."""
+    cache = ParseCache()
+    parse = FastParser().parse
+    tree = cache.get('foo bar', parse)
+    tree.left = None
+    assert cache.get('foo bar', parse) == AndOp(
+        ValueQuery(Value('foo')), ValueQuery(Value('bar')))
+
+
+@pytest.mark.parametrize('policy, cached', [
+    ('lru', ['a', 'c']),
+    ('fifo', ['b', 'c']),
+])
+def test_eviction_policy(policy, cached):
+    """Test eviction of entries."""
+    cache = ParseCache(maxsize=2, policy=policy)
+    parse = FastParser().parse
+    for query in ('a', 'b', 'a', 'c'):
+        cache.get(query, parse)
+    assert cache.info() == (1, 3, 1, 2, 2)
+    assert [query for _, query in cache._trees] == cached
+
+
+def test_invalid_cache():
+    """Test cache configuration errors."""
+    with pytest.raises(ValueError):
+        ParseCache(policy='random')
+    with pytest.raises(ValueError):
+        ParseCache(maxsize=0)
+
+
+def test_syntax_error_is_not_cached():
+    """Test invalid queries are not stored."""
+    cache = ParseCache()
+    with pytest.raises(SyntaxError):
+        cache.get('foo:', FastParser().parse)
+    assert cache.info().currsize == 0
+
+
+def test_invenio_query_factory_cache():
+    """Test factory cache keys include the active keyword grammar."""
+    from invenio_query_parser.contrib.elasticsearch import \
+        invenio_query_factory
+
+    cache = ParseCache()
+    query = invenio_query_factory(cache=cache)
+
+    build_valid_keywords_grammar()
+    expected = {'multi_match': {'fields': ['foo'], 'query': 'bar'}}
+    assert query('foo:bar').to_dict() == expected
+    assert query('foo:bar').to_dict() == expected
+    assert query.cache.info().hits == 1
+
+    build_valid_keywords_grammar(keywords=['title'])
+    try:
+        assert query('foo:bar').to_dict() == {'bool': {'must': [
+            {'multi_match': {'fields': ['_all'], 'query': 'foo:'}},
+            {'multi_match': {'fields': ['_all'], 'query': 'bar'}},
+        ]}}
+        assert query.cache.info().misses == 2
+    finally:
+        build_valid_keywords_grammar()
+
+
+def test_compile_pattern():
+    """Test compiled patterns are shared and the cache is bounded."""
+    from invenio_query_parser.cache import PATTERNS, compile_pattern
+
+    maxsize = PATTERNS.maxsize
+    PATTERNS.maxsize = 2
+    try:
+        assert compile_pattern('^a') is compile_pattern('^a')
+        compile_pattern('^b')
+        compile_pattern('^c')
+        assert len(PATTERNS._trees) == 2
+    finally:
+        PATTERNS.maxsize = maxsize
+
+
+def test_value_pattern():
+    """Test value nodes keep their compiled pattern up to date."""
+    value = Value('^foo')
+    assert value.pattern is value.pattern
+    assert value.pattern.search('foo bar')
+    value.value = '^bar'
+    assert value.pattern.search('bar foo')
+
+
+def test_snapshot(tmpdir):
+    """Test snapshots of compiled patterns are loaded and checked."""
+    import re
+
+    from invenio_query_parser.cache import PATTERNS
+    from invenio_query_parser.fast_parser import build_keyword_patterns
+    from invenio_query_parser.snapshot import configuration_patterns, \
+        dump_snapshot, load_snapshot, use_snapshot
+
+    keywords = ['author', 'title', 'title.short', 'year']
+    path = str(tmpdir.join('keywords.snapshot'))
+    assert not use_snapshot(path, keywords)
+    PATTERNS.clear()
+    assert use_snapshot(path, keywords)
+    assert PATTERNS.info().misses == 0
+
+    patterns = configuration_patterns(keywords)
+    assert build_keyword_patterns(keywords) == tuple(
+        PATTERNS._trees[(None, pattern)] for pattern in patterns[:2])
+    for pattern in patterns:
+        regex, expected = PATTERNS._trees[(None, pattern)], re.compile(pattern)
+        for text in ('title.short:foo', 'titles:foo', '245__a:x', 'foo:bar'):
+            match = regex.match(text)
+            assert (match and match.group()) == \
+                (expected.match(text) and expected.match(text).group())
+    assert FastParser(keywords).parse('title.short:higgs foo:bar') == \
+        FastParser(keywords).parse('title.short:higgs foo:bar')
+
+    data = dump_snapshot(keywords)
+    assert load_snapshot(data, keywords) == 3
+    with pytest.raises(ValueError):
+        load_snapshot(data, keywords[:2])
+    with pytest.raises(ValueError):
+        load_snapshot(data[:-1] + bytes(bytearray([data[-1] ^ 1])),
+                      keywords)
+    with pytest.raises(ValueError):
+        load_snapshot(b'invalid', keywords)
+
+    # stale snapshots are replaced
+    assert not use_snapshot(path, keywords[:2])
+    assert use_snapshot(path, keywords[:2])
+
+
+def test_snapshot_fallback(tmpdir, monkeypatch):
+    """Test configuration is built from scratch when snapshots fail."""
+    import pypeg2
+
+    from invenio_query_parser import snapshot
+    from invenio_query_parser.parser import Main
+    from invenio_query_parser.query_parser import QueryParser
+    from invenio_query_parser.walkers.pypeg_to_ast import PypegConverter
+
+    def unsupported(*args):
+        raise AttributeError('Unsupported regular expression engine.')
+
+    keywords = ['author', 'title']
+    path = tmpdir.join('keywords.snapshot')
+    expected = KeywordOp(Keyword('title'), Value('higgs'))
+    try:
+        with monkeypatch.context() as patch:
+            patch.setattr(snapshot, '_compile', unsupported)
+            assert not snapshot.use_snapshot(str(path), keywords)
+            assert not path.check()
+            assert QueryParser(keywords).parse('title:higgs') == expected
+            tree = pypeg2.parse('title:higgs', Main, whitespace='')
+            assert tree.accept(PypegConverter()) == expected
+
+        assert not snapshot.use_snapshot(str(path), keywords)
+        assert path.check()
+        with monkeypatch.context() as patch:
+            patch.setattr(snapshot, '_build', unsupported)
+            assert not snapshot.use_snapshot(str(path), keywords)
+            assert QueryParser(keywords).parse('title:higgs') == expected
+    finally:
+        build_valid_keywords_grammar()
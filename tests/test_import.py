@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio-Query-Parser.
+# Copyright (C) 2016 CERN.
+#
+# Invenio-Query-Parser is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio-Query-Parser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Test importing the modules does not import the optional dependencies."""
+
+import subprocess
+import sys
+
+import pytest
+
+SCRIPT = """
+import sys
+import {0}
+print(' '.join(sorted(set(sys.modules) & set(sys.argv[1:]))))
+"""
+
+DEFERRED = ('elasticsearch_dsl', 'pkg_resources', 'pypeg2')
+"""Modules imported when a parser using them is created."""
+
+
+@pytest.mark.parametrize('module, imported', (
+    ('invenio_query_parser.fast_parser', ''),
+    ('invenio_query_parser.query_parser', ''),
+    ('invenio_query_parser.bulk', ''),
+    ('invenio_query_parser.contrib.elasticsearch', ''),
+    ('invenio_query_parser.parser', 'pypeg2'),
+))
+def test_deferred_imports(module, imported):
+    """Test modules are imported without the deferred dependencies."""
+    output = subprocess.check_output(
+        [sys.executable, '-c', SCRIPT.format(module)] + list(DEFERRED))
+    assert output.decode('ascii').strip() == imported
+
+
+def test_lazy_invenio_query():
+    """Test the default parser is created on first use."""
+    from invenio_query_parser.contrib.elasticsearch import IQ, \
+        invenio_query_factory
+    from invenio_query_parser.utils import build_valid_keywords_grammar
+
+    build_valid_keywords_grammar()
+    query = 'title:higgs -year:2012'
+    assert IQ(query).to_dict() == invenio_query_factory()(query).to_dict()
+    assert IQ.query is not None
@@ -25,12 +25,17 @@
 
 from __future__ import unicode_literals
 
+import threading
+
+import pytest
 from pytest import generate_tests
 
-from invenio_query_parser.ast import AndOp, DoubleQuotedValue, EmptyQuery, \
-    GreaterEqualOp, GreaterOp, Keyword, KeywordOp, LowerEqualOp, LowerOp, \
-    NotOp, OrOp, RangeOp, RegexValue, SingleQuotedValue, Value, ValueQuery
+from invenio_query_parser.ast import AndList, AndOp, DoubleQuotedValue, \
+    EmptyQuery, GreaterEqualOp, GreaterOp, Keyword, KeywordOp, LowerEqualOp, \
+    LowerOp, NotOp, OrList, OrOp, RangeOp, RegexValue, SingleQuotedValue, \
+    Value, ValueQuery
 from invenio_query_parser.contrib.spires.ast import SpiresOp
+from invenio_query_parser.fast_parser import FastParser
 from invenio_query_parser.utils import build_valid_keywords_grammar
 
 
@@ -287,6 +292,8 @@ class TestParser(object):
          SpiresOp(Keyword('da'), Value('today - 2'))),
         ("find da 2012-01-01",
          SpiresOp(Keyword('da'), Value('2012-01-01'))),
+        ("find date-added 2012",
+         SpiresOp(Keyword('date-added'), Value('2012'))),
         ("find t quark andorinword",
          SpiresOp(Keyword('t'), Value('quark andorinword'))),
 
@@ -469,42 +476,419 @@ class TestParser(object):
     )
 
 
+context_keywords = ['title', '035__a']
+
+context_queries = (
+    ("",
+     EmptyQuery('')),
+    ("    \t",
+     EmptyQuery('    \t')),
+    ("bar",
+     ValueQuery(Value('bar'))),
+    ("2004",
+     ValueQuery(Value('2004'))),
+    ("'bar'",
+     ValueQuery(SingleQuotedValue('bar'))),
+    ("\"bar\"",
+     ValueQuery(DoubleQuotedValue('bar'))),
+    ("J. Ellis",
+     AndOp(ValueQuery(Value('J.')), ValueQuery(Value('Ellis')))),
+    ("$e^{+}e^{-}$",
+     ValueQuery(Value('$e^{+}e^{-}$'))),
+    ("foo:somthing",
+     AndOp(ValueQuery(Value('foo:')), ValueQuery(Value('somthing')))),
+    ("foo:bar:somthing",
+     AndOp(ValueQuery(Value('foo:bar:')), ValueQuery(Value('somthing')))),
+    ("title:bar:somthing",
+     KeywordOp(Keyword('title'), Value('bar:somthing'))),
+    ("035__a:oai:arXiv.org:1503.06238",
+     KeywordOp(Keyword('035__a'), Value('oai:arXiv.org:1503.06238'))),
+)
+
+
 def test_parser_with_context():
     """Test parser with application context."""
-    queries = (
-        ("",
-         EmptyQuery('')),
-        ("    \t",
-         EmptyQuery('    \t')),
-        ("bar",
-         ValueQuery(Value('bar'))),
-        ("2004",
-         ValueQuery(Value('2004'))),
-        ("'bar'",
-         ValueQuery(SingleQuotedValue('bar'))),
-        ("\"bar\"",
-         ValueQuery(DoubleQuotedValue('bar'))),
-        ("J. Ellis",
-         AndOp(ValueQuery(Value('J.')), ValueQuery(Value('Ellis')))),
-        ("$e^{+}e^{-}$",
-         ValueQuery(Value('$e^{+}e^{-}$'))),
-        ("foo:somthing",
-         AndOp(ValueQuery(Value('foo:')), ValueQuery(Value('somthing')))),
-        ("foo:bar:somthing",
-         AndOp(ValueQuery(Value('foo:bar:')), ValueQuery(Value('somthing')))),
-        ("title:bar:somthing",
-         KeywordOp(Keyword('title'), Value('bar:somthing'))),
-        ("035__a:oai:arXiv.org:1503.06238",
-         KeywordOp(Keyword('035__a'), Value('oai:arXiv.org:1503.06238'))),
-    )
-
     from invenio_query_parser.walkers import repr_printer
     from invenio_query_parser.contrib.spires import converter
-    build_valid_keywords_grammar(keywords=['title', '035__a'])
+    build_valid_keywords_grammar(keywords=context_keywords)
     parser = converter.SpiresToInvenioSyntaxConverter()
 
-    for count, args in enumerate(queries):
+    for count, args in enumerate(context_queries):
         tree = parser.parse_query(args[0])
         printer = repr_printer.TreeRepr()
         assert tree == args[1], "parsed tree: %s\nexpected tree: %s" % (
             tree.accept(printer), args[1].accept(printer))
+
+
+def generate_fast_parser_test(query, expected):
+    def func(self):
+        from invenio_query_parser.walkers import repr_printer
+        tree = self.parser.parse(query)
+        printer = repr_printer.TreeRepr()
+        assert tree == expected, "parsed tree: %s\nexpected tree: %s" % (
+            tree.accept(printer), expected.accept(printer))
+    return func
+
+
+@generate_tests(generate_fast_parser_test)  # pylint: disable=R0903
+class TestFastParser(object):
+    """Test fast parser against the Invenio syntax queries."""
+
+    @classmethod
+    def setup_class(cls):
+        cls.parser = FastParser()
+
+    queries = tuple(
+        (query, expected) for query, expected in TestParser.queries
+        if 'SpiresOp(' not in repr(expected)
+    )
+
+
+def test_fast_parser_with_context():
+    """Test fast parser with allowed keywords."""
+    parser = FastParser(keywords=context_keywords)
+    for query, expected in context_queries:
+        assert parser.parse(query) == expected, query
+
+
+def test_fast_parser_syntax_error():
+    """Test fast parser rejects the same queries as pypeg2."""
+    import pypeg2
+    from invenio_query_parser.parser import Main
+
+    build_valid_keywords_grammar()
+    parser = FastParser()
+    for query in ('foo:', '(foo', 'foo)', ':', '((a', 'a:b:'):
+        with pytest.raises(SyntaxError):
+            pypeg2.parse(query, Main, whitespace='')
+        with pytest.raises(SyntaxError):
+            parser.parse(query)
+
+
+def test_flatten_boolean_chains():
+    """Test chains of the same boolean operator are joined in lists."""
+    import pypeg2
+    from invenio_query_parser.parser import Main
+    from invenio_query_parser.walkers.pypeg_to_ast import PypegConverter
+
+    def v(value):
+        return ValueQuery(Value(value))
+
+    queries = (
+        ('a', v('a')),
+        ('a OR b OR c', OrList([v('a'), v('b'), v('c')])),
+        ('a AND b OR c AND d',
+         AndList([OrList([AndList([v('a'), v('b')]), v('c')]), v('d')])),
+        ('a OR (b OR c) OR d', OrList([v('a'), v('b'), v('c'), v('d')])),
+        ('(a AND b) AND c', AndList([v('a'), v('b'), v('c')])),
+        ('(a AND b) OR c', OrList([AndList([v('a'), v('b')]), v('c')])),
+        ('a -b c', AndList([v('a'), NotOp(v('b')), v('c')])),
+        ('foo:(a | b) | c',
+         KeywordOp(Keyword('foo'), OrList([v('a'), v('b'), v('c')]))),
+        ('(a | b) | c AND (a | b)',
+         AndList([OrList([v('a'), v('b'), v('c')]),
+                  OrList([v('a'), v('b')])])),
+    )
+
+    build_valid_keywords_grammar()
+    converter = PypegConverter(flatten=True)
+    parser = FastParser(flatten=True)
+    for query, expected in queries:
+        tree = pypeg2.parse(query, Main, whitespace='')
+        assert tree.accept(converter) == expected, query
+        assert parser.parse(query) == expected, query
+
+
+def test_flatten_spires_boolean_chains():
+    """Test SPIRES converter keeps implicit keywords of flattened chains."""
+    from invenio_query_parser.contrib.spires import converter
+
+    build_valid_keywords_grammar()
+    parser = converter.SpiresToInvenioSyntaxConverter(flatten=True)
+    assert parser.parse_query('find a ellis and higgs or t boson') == \
+        OrList([
+            AndList([SpiresOp(Keyword('a'), Value('ellis')),
+                     SpiresOp(Keyword('a'), Value('higgs'))]),
+            SpiresOp(Keyword('t'), Value('boson')),
+        ])
+
+
+def test_spires_implicit_keyword_long_query():
+    """Test implicit keywords are assigned along long SPIRES queries."""
+    from invenio_query_parser.contrib.spires import converter
+
+    build_valid_keywords_grammar()
+    parser = converter.SpiresToInvenioSyntaxConverter()
+    operators = ('and', 'or', 'and not')
+
+    def find(prefix):
+        return 'find a x0' + ''.join(
+            ' %s %sx%d' % (operators[index % 3], prefix, index)
+            for index in range(1, 100))
+
+    explicit = parser.parse_query(find('a '))
+    assert parser.parse_query(find('')) == explicit
+    assert parser.parse_query(find('') + ' and t y and z') == \
+        AndOp(AndOp(explicit, SpiresOp(Keyword('t'), Value('y'))),
+              SpiresOp(Keyword('t'), Value('z')))
+
+
+def test_spires_scan_simple_value():
+    """Test SPIRES values are scanned with balanced parentheses."""
+    from invenio_query_parser.contrib.spires import converter
+    from invenio_query_parser.contrib.spires.parser import scan_simple_value
+
+    for text, end in (('a(b(c))d or', 8), ('a(b', 1), ('x)y', 1),
+                      ('(a b)', None), ('()', None), (' a', None)):
+        assert scan_simple_value(text) == end, text
+
+    build_valid_keywords_grammar()
+    parser = converter.SpiresToInvenioSyntaxConverter()
+    assert parser.parse_query('find t a(b(c))d or orange and not f(g)') == \
+        AndOp(OrOp(SpiresOp(Keyword('t'), Value('a(b(c))d')),
+                   SpiresOp(Keyword('t'), Value('orange'))),
+              NotOp(SpiresOp(Keyword('t'), Value('f(g)'))))
+
+
+def test_keyword_matcher():
+    """Test the longest keyword ending at a word boundary is matched."""
+    from invenio_query_parser.utils import MARC_TAG, KeywordMatcher
+
+    matcher = KeywordMatcher(['date', 'date-added', 'd', 'title'],
+                             ignore_case=True)
+    for text, keyword in (('date-added x', 'date-added'),
+                          ('date-add x', 'date'), ('DATE x', 'DATE'),
+                          ('d:x', 'd'), ('titles', None), ('dates', None),
+                          ('x date', None), ('', None)):
+        assert matcher.match(text) == keyword, text
+    assert matcher.match('x date', 2) == 'date'
+
+    matcher = KeywordMatcher(['title', 'title_en'], prefix=MARC_TAG)
+    for text, keyword in (('100__a:x', '100__a'), ('100:x', '100'),
+                          ('title_en:x', 'title_en'), ('Title:x', None),
+                          ('100__ab:x', None)):
+        assert matcher.match(text) == keyword, text
+
+
+def test_fast_parser_longest_keyword():
+    """Test fast parser agrees with pypeg2 on keywords sharing a prefix."""
+    import pypeg2
+    from invenio_query_parser.parser import Main
+    from invenio_query_parser.walkers.pypeg_to_ast import PypegConverter
+
+    keywords = ['title', 'title_en']
+    build_valid_keywords_grammar(keywords)
+    try:
+        for query in ('title_en:foo', 'title:foo', 'title_en.x:foo'):
+            tree = pypeg2.parse(query, Main, whitespace='')
+            assert FastParser(keywords=keywords).parse(query) == \
+                tree.accept(PypegConverter()), query
+    finally:
+        build_valid_keywords_grammar()
+
+
+def test_query_parser():
+    """Test parsers with different keywords do not share the grammar."""
+    from invenio_query_parser.query_parser import QueryParser
+    from invenio_query_parser.utils import get_keywords_grammar_key
+
+    build_valid_keywords_grammar()
+    grammar_key = get_keywords_grammar_key()
+
+    context_parser = QueryParser(keywords=context_keywords)
+    parser = QueryParser()
+    for (query, expected), (context_query, context_expected) in zip(
+            TestFastParser.queries, context_queries):
+        assert parser.parse(query) == expected, query
+        assert context_parser(context_query) == context_expected
+    assert get_keywords_grammar_key() == grammar_key
+
+    assert QueryParser(keywords=['title']) == QueryParser(['title'])
+    assert hash(QueryParser(['title'])) == hash(QueryParser(['title']))
+    assert QueryParser(['title']) != QueryParser(['title'], flatten=True)
+    assert repr(QueryParser(['title'])) == \
+        "QueryParser(keywords=['title'], flatten=False)"
+
+    with pytest.raises(AttributeError):
+        parser.keywords = ('title', )
+    with pytest.raises(AttributeError):
+        del parser.flatten
+    with pytest.raises(AttributeError):
+        parser.cache = {}
+
+
+def test_query_parser_factory_cache():
+    """Test equal parsers share cached trees."""
+    from invenio_query_parser.cache import ParseCache
+    from invenio_query_parser.contrib.elasticsearch import \
+        invenio_query_factory
+    from invenio_query_parser.query_parser import QueryParser
+
+    cache = ParseCache()
+    title = invenio_query_factory(
+        parser=QueryParser(['title']), engine='fast', cache=cache)
+    title_copy = invenio_query_factory(
+        parser=QueryParser(['title']), engine='fast', cache=cache)
+    author = invenio_query_factory(
+        parser=QueryParser(['author']), engine='fast', cache=cache)
+
+    assert title('title:foo').to_dict() == title_copy('title:foo').to_dict()
+    assert cache.info().hits == 1
+    assert author('title:foo').to_dict() != title('title:foo').to_dict()
+    assert cache.info().misses == 2
+
+
+def test_serialize_tree():
+    """Test conversion of trees to flat tuples and back."""
+    from invenio_query_parser.serialize import dump_bytes, dump_json, \
+        dump_tree, load_bytes, load_json, load_tree
+
+    for query, expected in TestParser.queries + context_queries:
+        assert load_tree(dump_tree(expected)) == expected, query
+
+    tree = FastParser(flatten=True).parse('a OR b OR c AND NOT d')
+    assert dump_tree(tree) == (
+        'Value', 'a', 'ValueQuery', 'Value', 'b', 'ValueQuery',
+        'Value', 'c', 'ValueQuery', 'OrList', 3,
+        'Value', 'd', 'ValueQuery', 'NotOp', 'AndList', 2)
+    assert load_tree(dump_tree(tree)) == tree
+
+    for data in (('Unknown', 'value'), ('Value', ), ('ValueQuery', ),
+                 ('Value', 'a', 'OrList', 2), ('Value', 'a', 'OrList', 'x'),
+                 ('Value', 'a', 'Value', 'b'), ()):
+        with pytest.raises(ValueError):
+            load_tree(data)
+
+    for query, expected in context_queries:
+        assert load_json(dump_json(expected)) == expected, query
+        assert load_bytes(dump_bytes(expected)) == expected, query
+
+
+def test_ast_slots_hash_and_pickle():
+    """Test nodes are slotted, hashable by structure and picklable."""
+    import copy
+    import pickle
+
+    import pypeg2
+
+    from invenio_query_parser.parser import Main
+
+    trees = [expected for _, expected in TestParser.queries]
+    for tree in trees:
+        assert not hasattr(tree, '__dict__')
+        assert hash(tree) == hash(copy.deepcopy(tree))
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            assert pickle.loads(pickle.dumps(tree, protocol)) == tree
+    assert len(set(trees + trees)) == len(set(map(repr, trees)))
+
+    tree = FastParser().parse('title:/^higgs/ AND NOT year:2000->2012')
+    assert tree.left.right.pattern.match('higgs boson')
+    assert copy.copy(tree) == tree
+    assert tree != FastParser().parse('title:/^higgs/')
+
+    build_valid_keywords_grammar()
+    parse_tree = pypeg2.parse('title:higgs', Main, whitespace='')
+    assert not hasattr(parse_tree, '__dict__')
+    assert pickle.loads(pickle.dumps(parse_tree)) == parse_tree
+
+
+def test_ast_deep_tree():
+    """Test trees deeper than the recursion limit."""
+    import copy
+    import pickle
+
+    from invenio_query_parser.serialize import dump_bytes, dump_json, \
+        dump_tree, load_bytes, load_json, load_tree
+    from invenio_query_parser.walkers.interner import Interner
+
+    query = ' OR '.join('recid:%d' % index for index in range(3000))
+    tree = FastParser().parse(query)
+    other = FastParser().parse(query)
+    assert tree == other and not tree != other
+    assert tree != FastParser().parse(query + ' OR recid:1')
+    assert hash(tree) == hash(other)
+    assert {tree: 1}[other] == 1
+    assert repr(tree).startswith('OrOp(OrOp(')
+    assert repr(tree).endswith(
+        "KeywordOp(Keyword('recid'), Value('2999')))")
+    assert copy.copy(tree).left is tree.left
+    assert copy.deepcopy(tree) == tree
+    for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+        assert pickle.loads(pickle.dumps(tree, protocol)) == tree
+    assert load_tree(dump_tree(tree)) == tree
+    assert load_json(dump_json(tree)) == tree
+    assert load_bytes(dump_bytes(tree)) == tree
+
+    # shared subtrees stay shared
+    tree = Interner()(FastParser().parse('a:x AND NOT a:x'))
+    tree = pickle.loads(pickle.dumps(tree))
+    assert tree.left is tree.right.op
+
+
+@pytest.mark.parametrize('workers', (0, 2))
+def test_parse_many(workers):
+    """Test bulk parsing reports errors and keeps the order of queries."""
+    import pickle
+
+    from invenio_query_parser.bulk import parse_many
+    from invenio_query_parser.query_parser import QueryParser
+
+    parser = QueryParser(context_keywords)
+    assert pickle.loads(pickle.dumps(parser)) == parser
+
+    queries = [query for query, _ in context_queries] * 3
+    queries.insert(5, 'title:(higgs')
+    results = list(parse_many(iter(queries), workers=workers, chunksize=4,
+                              compact=False, parser=parser))
+
+    assert [result.index for result in results] == list(range(len(queries)))
+    assert [result.query for result in results] == queries
+    assert isinstance(results[5].error, SyntaxError)
+    assert results[5].tree is None
+    del results[5]
+    expected = [tree for _, tree in context_queries] * 3
+    assert [result.tree for result in results] == expected
+    assert [result.error for result in results] == [None] * len(expected)
+
+    def summary(results):
+        return sorted(result._replace(error=type(result.error))
+                      for result in results)
+
+    unordered = parse_many(queries, workers=workers, chunksize=4,
+                           ordered=False)
+    assert summary(unordered) == summary(parse_many(queries, workers=0))
+
+
+class UnpicklableError(Exception):
+    """Error holding a lock, which can not be pickled."""
+
+    def __init__(self):
+        """Initialize error with a lock."""
+        super(UnpicklableError, self).__init__(threading.Lock())
+
+
+def parse_or_raise_unpicklable(query):
+    """Parse the query or raise an error which can not be pickled."""
+    if query == 'unpicklable':
+        raise UnpicklableError()
+    return FastParser().parse(query)
+
+
+def test_parse_many_results_of_workers():
+    """Test deep trees and errors come back from workers without hanging."""
+    from invenio_query_parser.bulk import parse_many
+
+    deep = ' OR '.join('recid:%d' % index for index in range(3000))
+    queries = ['title:higgs', deep, 'title:(x', 'unpicklable', 'a']
+    results = list(parse_many(queries, workers=2, chunksize=1,
+                              compact=False,
+                              parser=parse_or_raise_unpicklable))
+    assert [result.index for result in results] == list(range(5))
+    assert results[1].tree.right == FastParser().parse('recid:2999')
+    assert [type(result.error).__name__ for result in results] == [
+        'NoneType', 'NoneType', 'SyntaxError', 'PicklingError', 'NoneType']
+
+    # stopping early does not wait for the remaining queries
+    results = parse_many(('a' for _ in range(10000)), workers=2, chunksize=1)
+    assert next(results).index == 0
+    results.close()
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio-Query-Parser.
+# Copyright (C) 2016 CERN.
+#
+# Invenio-Query-Parser is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio-Query-Parser is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Test parsing queries from many threads at the same time."""
+
+import random
+import sys
+import threading
+
+import test_parser
+
+from invenio_query_parser.cache import ParseCache
+from invenio_query_parser.contrib.elasticsearch import invenio_query_factory
+from invenio_query_parser.contrib.spires.converter import \
+    SpiresToInvenioSyntaxConverter
+from invenio_query_parser.query_parser import QueryParser
+from invenio_query_parser.utils import build_valid_keywords_grammar
+from invenio_query_parser.walkers.repr_printer import TreeRepr
+
+THREADS = 4
+
+ROUNDS = 1
+
+
+def pipelines():
+    """Return functions parsing a query with shared parsers and walkers."""
+    build_valid_keywords_grammar()
+    converter = SpiresToInvenioSyntaxConverter()
+    iq = invenio_query_factory(cache=ParseCache(maxsize=64))
+    fast_iq = invenio_query_factory(engine='fast', cache=ParseCache())
+    context = QueryParser(test_parser.context_keywords)
+    context_iq = invenio_query_factory(engine='fast', parser=context,
+                                       cache=ParseCache())
+    printer = TreeRepr()
+
+    return (
+        lambda query: converter.parse_query(query).accept(printer),
+        lambda query: iq(query).to_dict(),
+        lambda query: fast_iq(query).to_dict(),
+        lambda query: context.parse(query).accept(printer),
+        lambda query: context_iq(query).to_dict(),
+    )
+
+
+def run(functions, queries):
+    """Return results of all functions, or the type of raised exceptions."""
+    results = {}
+    for query in queries:
+        for index, function in enumerate(functions):
+            try:
+                results[index, query] = function(query)
+            except Exception as error:
+                results[index, query] = type(error)
+    return results
+
+
+def test_threads_same_as_single_thread():
+    """Test concurrent parsing gives the results of a single thread."""
+    queries = [query for query, _ in test_parser.TestParser.queries]
+    queries += [query for query, _ in test_parser.context_queries]
+    functions = pipelines()
+    expected = run(functions, queries)
+
+    results = [None] * THREADS
+    errors = []
+
+    def work(index):
+        shuffled = list(queries)
+        random.Random(index).shuffle(shuffled)
+        try:
+            for _ in range(ROUNDS):
+                results[index] = run(functions, shuffled)
+                assert results[index] == expected
+        except Exception as error:
+            errors.append(error)
+
+    interval = getattr(sys, 'getswitchinterval', None)
+    if interval is not None:
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-4)
+    try:
+        threads = [threading.Thread(target=work, args=(index, ))
+                   for index in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        if interval is not None:
+            sys.setswitchinterval(interval)
+
+    assert not errors
+    assert results == [expected] * THREADS
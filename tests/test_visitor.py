@@ -23,7 +23,23 @@
 
 """Unit tests for the visitor decorator."""
 
-from invenio_query_parser.visitor import make_visitor
+import pypeg2
+import pytest
+import test_parser
+
+from invenio_query_parser.ast import DoubleQuotedValue, Keyword, KeywordOp, \
+    Leaf, ListOp, OrList, OrOp, Value
+from invenio_query_parser.contrib.elasticsearch.walkers.dsl import \
+    ElasticSearchDSL
+from invenio_query_parser.contrib.spires.walkers.spires_to_invenio import \
+    SpiresToInvenio
+from invenio_query_parser.parser import Main
+from invenio_query_parser.utils import build_valid_keywords_grammar
+from invenio_query_parser.visitor import accept, compile_walker, make_visitor
+from invenio_query_parser.walkers.match_unit import MatchUnit
+from invenio_query_parser.walkers.printer import TreePrinter
+from invenio_query_parser.walkers.pypeg_to_ast import PypegConverter
+from invenio_query_parser.walkers.repr_printer import TreeRepr
 
 
 class A(object):
@@ -64,3 +80,183 @@ class TestVisitorInheritance(TestVisitor):
 
     def test_visit_b(self):
         assert self.visit(B()) == 'BB'
+
+
+class C(B):
+    pass
+
+
+class D(C, A):
+    pass
+
+
+class TestVisitorSubclass(TestVisitorInheritance):
+    visitor = make_visitor(TestVisitorInheritance.visitor)
+
+    @visitor(C)
+    def visit(self, el):
+        return 'C'
+
+    def test_visit_subclass(self):
+        assert TestVisitor().visit(C()) == 'B'
+        assert TestVisitorInheritance().visit(C()) == 'BB'
+        assert self.visit(C()) == 'C'
+        assert self.visit(D()) == 'C'
+        assert TestVisitor().visit(D()) == 'B'
+
+    def test_visit_unknown(self):
+        with pytest.raises(KeyError):
+            self.visit(object())
+
+    def test_register_after_visit(self):
+        visitor = make_visitor()
+
+        class Visitor(object):
+            @visitor(A)
+            def visit(self, el):
+                return 'A'
+
+        assert Visitor().visit(D()) == 'A'
+        visitor[D] = lambda self, el: 'D'
+        assert Visitor().visit(D()) == 'D'
+
+    def test_register_in_parent_after_visit(self):
+        parent = make_visitor()
+
+        class E(A):
+            pass
+
+        class Parent(object):
+            @parent(A)
+            def visit(self, el):
+                return 'A'
+
+        class Child(Parent):
+            visitor = make_visitor(parent)
+
+            @visitor(B)
+            def visit(self, el):
+                return 'B'
+
+        class GrandChild(Child):
+            visitor = make_visitor(Child.visitor)
+
+        walk = compile_walker(GrandChild)
+        assert Child().visit(E()) == GrandChild().visit(E()) == 'A'
+        with pytest.raises(KeyError):
+            walk(Value('a'), GrandChild())
+
+        parent[E] = lambda self, el: 'E'
+        parent[Value] = lambda self, el: 'value'
+        assert Child().visit(E()) == GrandChild().visit(E()) == 'E'
+        assert compile_walker(GrandChild) is not walk
+        assert compile_walker(GrandChild)(Value('a'), GrandChild()) == 'value'
+
+
+class Counter(object):
+
+    def visit(self, node, *children):
+        count = 1
+        for child in children:
+            count += sum(child) if isinstance(child, list) else child
+        return count
+
+
+def assert_same_result(tree, walker):
+    try:
+        expected = tree.accept(walker())
+    except Exception as exc:
+        with pytest.raises(type(exc)):
+            accept(tree, walker())
+    else:
+        assert accept(tree, walker()) == expected
+
+
+def test_accept_same_as_recursive():
+    """Test iterative traversal gives the results of ``node.accept``."""
+    build_valid_keywords_grammar()
+    for query, tree in test_parser.TestParser.queries:
+        for walker in (TreeRepr, SpiresToInvenio, Counter):
+            assert_same_result(tree, walker)
+
+        tree = tree.accept(SpiresToInvenio())
+        assert_same_result(tree, lambda: MatchUnit({'title': 'foo'}))
+        assert_same_result(tree, ElasticSearchDSL)
+
+    for query in ('foo:bar AND (baz OR qux) -quux', 'a b c d e f'):
+        tree = pypeg2.parse(query, Main, whitespace="")
+        assert accept(tree, PypegConverter()) == \
+            tree.accept(PypegConverter())
+        assert accept(tree, Counter()) == tree.accept(Counter())
+
+
+def test_accept_deep_tree():
+    """Test iterative traversal of trees deeper than the recursion limit."""
+    size = 25000
+    tree = KeywordOp(Keyword('id'), DoubleQuotedValue('0'))
+    for value in range(1, size):
+        tree = OrOp(tree, KeywordOp(Keyword('id'),
+                                    DoubleQuotedValue(str(value))))
+
+    with pytest.raises(RuntimeError):
+        tree.accept(Counter())
+    assert accept(tree, Counter()) == 4 * size - 1  # number of nodes
+    assert accept(tree, MatchUnit({'id': str(size - 1)})) is True
+    assert accept(tree, MatchUnit({'id': str(size)})) is False
+
+
+def test_accept_custom_node():
+    """Test nodes with their own ``accept`` method are delegated to."""
+    class Shortcut(Leaf):
+        def accept(self, visitor):
+            return 'shortcut'
+
+    class Visitor(object):
+        def visit(self, node, *children):
+            return children[0] if children else node.value
+
+    assert accept(ListOp([Shortcut(1), Leaf(2)]), Visitor()) == \
+        ['shortcut', 2]
+
+
+def assert_same_compiled(tree, walker, *args):
+    walk = compile_walker(walker)
+    try:
+        expected = tree.accept(walker(*args))
+    except Exception as exc:
+        with pytest.raises(type(exc)):
+            walk(tree, walker(*args))
+    else:
+        assert walk(tree, walker(*args)) == expected
+
+
+def test_compile_walker():
+    """Test compiled walkers give the results of ``node.accept``."""
+    build_valid_keywords_grammar()
+    for query, tree in test_parser.TestParser.queries:
+        for walker in (TreeRepr, TreePrinter, SpiresToInvenio):
+            assert_same_compiled(tree, walker)
+
+        tree = tree.accept(SpiresToInvenio())
+        assert_same_compiled(tree, MatchUnit, {'title': 'foo'})
+        assert_same_compiled(tree, ElasticSearchDSL)
+
+    tree = pypeg2.parse('foo:bar AND (baz OR qux) -quux', Main,
+                        whitespace="")
+    assert compile_walker(PypegConverter)(tree, PypegConverter()) == \
+        tree.accept(PypegConverter())
+    assert compile_walker(TreeRepr) is compile_walker(TreeRepr)
+
+
+def test_compile_walker_fallback():
+    """Test nodes of types without their own method fall back to accept."""
+    class Shortcut(Leaf):
+        def accept(self, visitor):
+            return 'shortcut'
+
+    class Word(Value):
+        pass
+
+    tree = OrList([Shortcut('a'), Word('b'), Value('c')])
+    walk = compile_walker(TreePrinter)
+    assert walk(tree, TreePrinter()) == '(shortcut or b or c)'
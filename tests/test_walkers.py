@@ -27,10 +27,13 @@ import pypeg2
 import pytest
 from pytest import generate_tests
 
-from invenio_query_parser.ast import GreaterOp, Keyword, KeywordOp, Value
+from invenio_query_parser.ast import AndOp, GreaterOp, Keyword, KeywordOp, \
+    NotOp, OrOp, Value
 from invenio_query_parser.contrib.elasticsearch.walkers import dsl
 from invenio_query_parser.contrib.spires import converter
+from invenio_query_parser.contrib.spires.ast import SpiresOp
 from invenio_query_parser.contrib.spires.walkers import spires_to_invenio
+from invenio_query_parser.fast_parser import FastParser
 from invenio_query_parser.parser import Main
 from invenio_query_parser.utils import build_valid_keywords_grammar
 from invenio_query_parser.walkers import match_unit
@@ -60,6 +63,8 @@ class TestSpiresToInvenio(object):
          KeywordOp(Keyword('title'), Value('quark'))),
         ("find d after yesterday",
          KeywordOp(Keyword('year'), GreaterOp(Value('yesterday')))),
+        ("FIND T quark",
+         KeywordOp(Keyword('title'), Value('quark'))),
     )
 
 
@@ -328,6 +333,7 @@ class TestMatchUnit(object):
         ('data:b->h', {'data': 'foo'}, True),
         ('data:b->h', {'data': 'h'}, True),
         ('data:b->h', {'data': 'z'}, False),
+        ('data:*->b', {'data': 'a'}, True),
 
         # Boolean operations
         ('title:"Test" AND data:\'foo bar\'',
@@ -341,3 +347,563 @@ class TestMatchUnit(object):
          True),
 
     )
+
+
+def generate_match_unit_top_down_test(query, data, expected):
+    def func(self):
+        tree = pypeg2.parse(query, self.parser, whitespace="")
+        tree = tree.accept(PypegConverter())
+        assert self.walker(data).match(tree) == expected
+        cost, optimized = tree.accept(match_unit.MatchCostOptimizer())
+        assert self.walker(data).match(optimized) == expected
+    return func
+
+
+@generate_tests(generate_match_unit_top_down_test)  # pylint: disable=R0903
+class TestMatchUnitTopDown(object):
+    """Test top-down evaluation of MatchUnit."""
+
+    @classmethod
+    def setup_class(cls):
+        cls.walker = match_unit.MatchUnit
+        cls.parser = Main
+        build_valid_keywords_grammar()
+
+    queries = TestMatchUnit.queries
+
+
+def test_match_unit_short_circuit():
+    """Test right operand is skipped when the left one decides."""
+    keywords = []
+
+    def getitem(data, keyword):
+        keywords.append(keyword)
+        return match_unit.dottable_getitem(data, keyword)
+
+    tree = FastParser().parse('title:"Test" AND data:foo OR year:2000')
+    walker = match_unit.MatchUnit({'title': 'Other'}, getitem=getitem)
+    assert walker.match(tree) is False
+    assert keywords == ['title', 'year']
+
+    cost, tree = tree.accept(match_unit.MatchCostOptimizer())
+    del keywords[:]
+    assert walker.match(tree) is False
+    assert keywords == ['year', 'title']
+
+
+def generate_match_unit_compiler_test(query, data, expected):
+    def func(self):
+        tree = pypeg2.parse(query, self.parser, whitespace="")
+        tree = tree.accept(PypegConverter())
+        predicate = tree.accept(self.walker())
+        assert predicate(data) == expected
+    return func
+
+
+@generate_tests(generate_match_unit_compiler_test)  # pylint: disable=R0903
+class TestMatchUnitCompiler(object):
+    """Test compiled predicates agree with MatchUnit."""
+
+    @classmethod
+    def setup_class(cls):
+        cls.walker = match_unit.MatchUnitCompiler
+        cls.parser = Main
+        build_valid_keywords_grammar()
+
+    queries = TestMatchUnit.queries + (
+        ('title:"Test" AND title:"Test"', {'title': 'Test'}, True),
+        ('title:"Test" OR title:"Test"', {'title': 'Other'}, False),
+        ('a.b:c', {'a': [{'b': 'x'}, {'b': ['y', 'c']}]}, True),
+        ('data:1->5', {'data': ['0', '7', '3']}, True),
+        ('data:[->]', {'data': 'a'}, False),
+    )
+
+
+def test_invenio_query_factory_engines():
+    """Test fast engine creates the same DSL as the pypeg2 engine."""
+    from invenio_query_parser.contrib.elasticsearch import \
+        invenio_query_factory
+
+    build_valid_keywords_grammar()
+    pypeg_query = invenio_query_factory()
+    fast_query = invenio_query_factory(engine='fast')
+    for query, data, expected in TestElasticsearchDSL.queries:
+        if data is None and isinstance(expected, dict):
+            assert fast_query(query).to_dict() == \
+                pypeg_query(query).to_dict() == expected, query
+
+    with pytest.raises(ValueError):
+        invenio_query_factory(engine='unknown')
+
+
+def test_batch_match_unit():
+    """Test batch masks agree with MatchUnit on every record."""
+    numpy = pytest.importorskip('numpy')
+    from invenio_query_parser.contrib.batch import match_batch
+
+    queries = TestMatchUnitCompiler.queries + (
+        ('test OR title:"Test"', None, None),
+        ('NOT data:b->h AND NOT /^test/', None, None),
+    )
+    records = [data for query, data, expected in queries if data]
+    fields = set(key for record in records for key in record)
+    batch = dict((field, [record.get(field) for record in records])
+                 for field in fields)
+
+    for query, data, expected in queries:
+        tree = FastParser().parse(query)
+        mask = match_batch(tree, batch)
+        assert mask.dtype == numpy.bool_
+        assert mask.tolist() == [
+            tree.accept(match_unit.MatchUnit(record)) for record in records
+        ], query
+        tree = FastParser(flatten=True).parse(query)
+        assert match_batch(tree, batch).tolist() == mask.tolist(), query
+
+
+def test_batch_match_unit_numpy_columns():
+    """Test vectorized matching of numpy columns."""
+    numpy = pytest.importorskip('numpy')
+    from invenio_query_parser.contrib.batch import match_batch
+
+    records = [
+        {'title': 'Higgs', 'year': '2012', 'citations': 10},
+        {'title': 'Quarks', 'year': '1995', 'citations': 1},
+        {'title': 'Higgs boson', 'year': '2013', 'citations': 10},
+        {'title': 'higgs', 'year': '2012', 'citations': 100},
+    ]
+    batch = dict(
+        title=numpy.array([record['title'] for record in records]),
+        year=numpy.array([record['year'] for record in records]),
+        citations=numpy.array([record['citations'] for record in records]),
+    )
+
+    for query in ('title:Higgs', 'title:"Higgs"', 'title:/^[hH]iggs$/',
+                  "title:'higgs'", 'year:2000->2012', 'citations:10',
+                  'Higgs AND NOT year:2012', '10 OR year:"1995"',
+                  'missing:Higgs', ''):
+        tree = FastParser().parse(query)
+        assert match_batch(tree, batch).tolist() == [
+            tree.accept(match_unit.MatchUnit(record)) for record in records
+        ], query
+
+
+def test_flattened_tree_walkers():
+    """Test walkers give the same results for flattened trees."""
+    from invenio_query_parser.walkers.repr_printer import TreeRepr
+
+    queries = TestMatchUnitCompiler.queries + (
+        ('title:"Test" AND NOT data:foo AND title:Test', {'title': 'Test'},
+         True),
+        ('a OR (title:"Test" OR b) OR c', {'title': 'Test'}, True),
+    )
+    parser = FastParser(flatten=True)
+    for query, data, expected in queries:
+        tree = parser.parse(query)
+        assert tree.accept(match_unit.MatchUnit(data)) == expected, query
+        assert match_unit.MatchUnit(data).match(tree) == expected, query
+        cost, optimized = tree.accept(match_unit.MatchCostOptimizer())
+        assert match_unit.MatchUnit(data).match(optimized) == expected
+        assert tree.accept(match_unit.MatchUnitCompiler())(data) == expected
+
+    assert parser.parse('a b OR c OR d').accept(TreeRepr()) == \
+        "(('a' and 'b') or 'c' or 'd')"
+
+
+def test_flattened_tree_elasticsearch_dsl():
+    """Test flattened trees produce a single flat bool query."""
+    from invenio_query_parser.contrib.elasticsearch import \
+        invenio_query_factory
+
+    def match(value):
+        return {'multi_match': {'query': value, 'fields': ['recid']}}
+
+    query = invenio_query_factory(engine='fast', flatten=True)
+    assert query('recid:1 OR recid:2 OR recid:3').to_dict() == {
+        'bool': {'should': [match('1'), match('2'), match('3')]}
+    }
+    assert query('recid:1 AND recid:2 AND recid:3').to_dict() == {
+        'bool': {'must': [match('1'), match('2'), match('3')]}
+    }
+
+    pypeg_query = invenio_query_factory(flatten=True)
+    text = ' OR '.join('recid:%d' % value for value in range(100))
+    assert query(text).to_dict() == pypeg_query(text).to_dict() == {
+        'bool': {'should': [match(str(value)) for value in range(100)]}
+    }
+
+
+def test_elasticsearch_dsl_terms():
+    """Test OR of exact values on the same fields is collapsed to terms."""
+    from invenio_query_parser.contrib.elasticsearch import \
+        invenio_query_factory
+
+    keyword_to_fields = {
+        None: ['_all'],
+        'recid': ['_id'],
+        'doi': {'a': ['doi'], 'p': ['doi'], 'r': ['doi']},
+        'foo': ['test1', 'test2'],
+        'bar': {'a': ['bar'], 'p': None},
+    }
+    walker = dsl.ElasticSearchDSL(keyword_to_fields, terms_threshold=3)
+    query = invenio_query_factory(engine='fast', flatten=True, dsl=walker)
+
+    def match(value, fields, **kwargs):
+        return {'multi_match': dict(query=value, fields=fields, **kwargs)}
+
+    assert query('recid:1 OR recid:2 OR recid:"3" OR recid:1').to_dict() == \
+        {'ids': {'values': ['1', '2', '3']}}
+    assert query('doi:a OR quark OR doi:"b" OR doi:c').to_dict() == {
+        'bool': {'should': [{'terms': {'doi': ['a', 'b', 'c']}},
+                            match('quark', ['_all'])]}
+    }
+    assert query('foo:a OR foo:b OR foo:c').to_dict() == {
+        'bool': {'should': [{'terms': {'test1': ['a', 'b', 'c']}},
+                            {'terms': {'test2': ['a', 'b', 'c']}}]}
+    }
+    # partial phrases, regular expressions and groups below the threshold
+    assert query("doi:'a' OR doi:/b/ OR foo:a OR foo:b").to_dict() == {
+        'bool': {'should': [match('a', ['doi'], type='phrase'),
+                            {'regexp': {'doi': 'b'}},
+                            match('a', ['test1', 'test2']),
+                            match('b', ['test1', 'test2'])]}
+    }
+    # phrases of keywords without fields for phrases
+    assert query('bar:"a" OR bar:"b" OR bar:"c"').to_dict() == {
+        'bool': {'should': [match(value, None, type='phrase')
+                            for value in 'abc']}
+    }
+    # operands of AND are not collapsed
+    assert query('(doi:a OR doi:b) AND doi:c AND doi:d').to_dict() == {
+        'bool': {'must': [{'bool': {'should': [match('a', ['doi']),
+                                               match('b', ['doi'])]}},
+                          match('c', ['doi']), match('d', ['doi'])]}
+    }
+
+
+def test_interner():
+    """Test identical subtrees are shared by interned trees."""
+    from invenio_query_parser import ast
+    from invenio_query_parser.cache import copy_tree
+    from invenio_query_parser.visitor import accept
+    from invenio_query_parser.walkers.interner import Interner
+    from invenio_query_parser.walkers.repr_printer import TreeRepr
+
+    class Counter(object):
+        visits = 0
+
+        def visit(self, node, *children):
+            self.visits += 1
+
+    interner = Interner()
+    for flatten in (False, True):
+        parser = FastParser(flatten=flatten)
+        tree = parser.parse('author:ellis AND (author:ellis OR -author:ellis)')
+        expected = copy_tree(tree)
+        interned = interner(tree)
+        assert interned == expected
+        first = interned.children[0] if flatten else interned.left
+        assert interner(parser.parse('author:ellis')) is first
+        assert interner(copy_tree(expected)) is interned
+        assert accept(interned, TreeRepr(), memoize=True) == \
+            accept(expected, TreeRepr())
+
+        counter, memo_counter = Counter(), Counter()
+        accept(interned, counter)
+        accept(interned, memo_counter, memoize=True)
+        assert (counter.visits, memo_counter.visits) == (12, 6)
+
+    keyword = interner.node(ast.Keyword, 'author')
+    value = interner.node(ast.Value, 'ellis')
+    assert interner.node(ast.KeywordOp, keyword, value) is \
+        interner(FastParser().parse('author:ellis'))
+
+    # the least recently used nodes are evicted
+    interner = Interner(maxsize=4)
+    first = interner(FastParser().parse('author:ellis'))
+    assert interner.node(ast.Keyword, 'author') is first.left
+    second = interner(FastParser().parse('title:ellis'))
+    assert len(interner.nodes) == 4
+    assert second.right is first.right
+    unique = set(map(id, interner.nodes.values()))
+    assert id(first.left) in unique and id(first) not in unique
+    again = interner(FastParser().parse('author:ellis'))
+    assert again == first and again is not first
+    assert again.left is first.left and again.right is first.right
+
+    with pytest.raises(ValueError):
+        Interner(maxsize=0)
+
+
+def test_invenio_query_factory_interner():
+    """Test interned trees are converted to the same DSL."""
+    from invenio_query_parser.cache import ParseCache
+    from invenio_query_parser.contrib.elasticsearch import \
+        invenio_query_factory
+    from invenio_query_parser.walkers.interner import Interner
+
+    build_valid_keywords_grammar()
+    interner = Interner()
+    factories = (
+        invenio_query_factory(interner=interner),
+        invenio_query_factory(engine='fast', interner=interner,
+                              cache=ParseCache()),
+    )
+    for query, data, expected in TestElasticsearchDSL.queries:
+        if data is None and isinstance(expected, dict):
+            for factory in factories:
+                assert factory(query).to_dict() == expected, query
+                assert factory(query).to_dict() == expected, query
+
+    query = factories[0]('title:higgs OR (title:higgs AND NOT title:higgs)')
+    assert query.should[1] is query.should[0].must[0]
+
+
+def test_invenio_query_factory_fused():
+    """Test fused walker creates the same DSL as the AST walkers."""
+    from invenio_query_parser.contrib.elasticsearch import \
+        invenio_query_factory
+    from invenio_query_parser.contrib.elasticsearch.walkers.pypeg_to_dsl \
+        import PypegToElasticSearchDSL
+
+    build_valid_keywords_grammar()
+    for query, data, expected in TestElasticsearchDSL.queries:
+        if data is None and isinstance(expected, dict):
+            assert invenio_query_factory(fused=True)(query).to_dict() == \
+                expected, query
+
+    keyword_to_fields = {
+        None: ['_all'],
+        'recid': ['_id'],
+        'doi': {'a': ['doi'], 'p': ['doi'], 'r': ['doi']},
+    }
+    queries = (
+        'recid:1 OR recid:2 OR (recid:3 OR recid:"4") OR -recid:5',
+        '(doi:a) OR quark OR doi:"b" OR doi:c AND (doi:d OR doi:e)',
+        '(doi:a AND doi:b) AND doi:c year:2000->2012 -(doi:d OR doi:e)',
+    )
+    for flatten in (False, True):
+        for terms_threshold in (None, 2):
+            walker = dsl.ElasticSearchDSL(keyword_to_fields, terms_threshold)
+            fused_walker = PypegToElasticSearchDSL(
+                keyword_to_fields, terms_threshold, flatten=flatten)
+            query = invenio_query_factory(flatten=flatten, dsl=walker)
+            fused_query = invenio_query_factory(fused=True, dsl=fused_walker)
+            for text in queries:
+                assert fused_query(text).to_dict() == \
+                    query(text).to_dict(), text
+
+    with pytest.raises(RuntimeError):
+        invenio_query_factory(fused=True)('title:(a OR b)')
+    with pytest.raises(ValueError):
+        invenio_query_factory(engine='fast', fused=True)
+
+
+def test_elasticsearch_dsl_raw():
+    """Test raw output mode creates dictionaries equal to the DSL."""
+    import json
+
+    from invenio_query_parser.contrib.elasticsearch import \
+        invenio_query_factory
+
+    build_valid_keywords_grammar()
+    factories = (
+        invenio_query_factory(output='dict'),
+        invenio_query_factory(engine='fast', output='dict'),
+        invenio_query_factory(fused=True, output='dict'),
+    )
+    json_query = invenio_query_factory(output='json')
+    for query, data, expected in TestElasticsearchDSL.queries:
+        if data is None and isinstance(expected, dict):
+            for factory in factories:
+                assert factory(query) == expected, query
+            assert json.loads(json_query(query).decode('utf-8')) == expected
+
+    keyword_to_fields = {
+        None: ['_all'],
+        'recid': ['_id'],
+        'doi': {'a': ['doi'], 'p': ['doi'], 'r': ['doi']},
+        'foo': ['test1', 'test2'],
+    }
+    queries = (
+        'recid:1 OR recid:2 OR recid:"3" OR recid:1',
+        'doi:a OR quark OR doi:"b" OR doi:c',
+        'foo:/a/ OR foo:1->5',
+    )
+    for flatten in (False, True):
+        query = invenio_query_factory(
+            flatten=flatten, dsl=dsl.ElasticSearchDSL(
+                keyword_to_fields, terms_threshold=3))
+        raw_query = invenio_query_factory(
+            flatten=flatten, output='dict', dsl=dsl.ElasticSearchDSL(
+                keyword_to_fields, terms_threshold=3, raw=True))
+        for text in queries:
+            assert raw_query(text) == query(text).to_dict(), text
+
+    # negations are nested instead of being distributed over operands
+    assert factories[0]('-(a b)') == {'bool': {'must_not': [
+        {'bool': {'must': [{'multi_match': {'query': 'a', 'fields': ['_all']}},
+                           {'multi_match': {'query': 'b',
+                                            'fields': ['_all']}}]}}
+    ]}}
+    assert factories[0]('NOT (NOT a)') == \
+        {'multi_match': {'query': 'a', 'fields': ['_all']}}
+
+    with pytest.raises(ValueError):
+        invenio_query_factory(output='unknown')
+
+
+def test_elasticsearch_dsl_combined_in_place():
+    """Test raw chains are extended in place and value closures accepted."""
+    from elasticsearch_dsl import Q
+
+    from invenio_query_parser.contrib.elasticsearch import \
+        invenio_query_factory
+    from invenio_query_parser.visitor import make_visitor
+    from invenio_query_parser.walkers.interner import Interner
+
+    def match(value):
+        return {'multi_match': {'query': value, 'fields': ['_all']}}
+
+    terms = ['t%d' % index for index in range(20000)]
+    parse = invenio_query_factory(engine='fast', output='dict')
+    assert parse(' OR '.join(terms)) == \
+        {'bool': {'should': [match(term) for term in terms]}}
+    assert parse(' '.join(terms[:3]) + ' -a (b OR c) d') == {'bool': {
+        'must': [match('t0'), match('t1'), match('t2'),
+                 {'bool': {'should': [match('b'), match('c')]}}, match('d')],
+        'must_not': [match('a')],
+    }}
+
+    # results of shared subtrees are not extended
+    parse = invenio_query_factory(engine='fast', output='dict',
+                                  interner=Interner())
+    assert parse('(a OR b OR c) AND (a OR b OR d)') == {'bool': {'must': [
+        {'bool': {'should': [match('a'), match('b'), match('c')]}},
+        {'bool': {'should': [match('a'), match('b'), match('d')]}},
+    ]}}
+
+    class ClosureDSL(dsl.ElasticSearchDSL):
+
+        visitor = make_visitor(dsl.ElasticSearchDSL.visitor)
+
+        @visitor(Value)
+        def visit(self, node):
+            def query(keyword):
+                fields = self.get_fields_for_keyword(keyword, mode='a')
+                return Q('multi_match', query=node.value, fields=fields)
+            return query
+
+    parse = invenio_query_factory(engine='fast', dsl=ClosureDSL())
+    assert parse('a year:2000->2012').to_dict() == {'bool': {'must': [
+        match('a'), {'range': {'year': {'gte': '2000', 'lte': '2012'}}},
+    ]}}
+    tree = KeywordOp(Keyword('year'), GreaterOp(Value('2000')))
+    assert tree.accept(ClosureDSL()).to_dict() == \
+        {'range': {'year': {'gt': '2000'}}}
+
+
+def test_elasticsearch_dsl_extend_in_place():
+    """Test chains of operators extend the query of their left operand."""
+    from invenio_query_parser.contrib.elasticsearch import \
+        invenio_query_factory
+    from invenio_query_parser.visitor import accept
+    from invenio_query_parser.walkers.interner import Interner
+
+    class Recorder(dsl.ElasticSearchDSL):
+
+        def __init__(self, raw, extend_in_place):
+            super(Recorder, self).__init__(raw=raw)
+            self.extend_in_place = extend_in_place
+            self.results = []
+
+        def and_query(self, left, right, extend=False):
+            result = super(Recorder, self).and_query(left, right, extend)
+            self.results.append(result)
+            return result
+
+        def or_query(self, left, right, extend=False):
+            result = super(Recorder, self).or_query(left, right, extend)
+            self.results.append(result)
+            return result
+
+    # every operation of a chain returns the same query instead of a copy
+    for raw, operators in ((True, (' OR ', ' ', ' -')),
+                           (False, (' OR ', ' '))):
+        for operator in operators:
+            query = operator.join('t%d' % index for index in range(100))
+            tree = FastParser().parse(query)
+            walker = Recorder(raw, True)
+            result = accept(tree, walker)
+            assert len(walker.results) == 99, operator
+            assert all(query is result for query in walker.results)
+
+            walker = Recorder(raw, False)
+            accept(tree, walker)
+            assert len(set(map(id, walker.results))) == 99, operator
+
+    # queries extended in place are equal to the combined queries
+    for query in ('a OR b OR c OR d', 'a b c d', 'a -b c -d',
+                  '(a OR b) c (d OR e) f', 'a OR b c OR d -e OR f',
+                  '(a b) OR c OR (d -e) OR (f OR g) h',
+                  'NOT (a OR b) AND c AND NOT (NOT d)'):
+        tree = FastParser().parse(query)
+        for raw in (True, False):
+            result = accept(tree, Recorder(raw, True))
+            expected = accept(tree, Recorder(raw, False))
+            if not raw:
+                result, expected = result.to_dict(), expected.to_dict()
+            assert result == expected, query
+
+    # the default walker does not change the results of shared subtrees
+    query = '(a OR b) AND ((a OR b) OR c)'
+    tree = FastParser().parse(query)
+    expected = accept(tree, dsl.ElasticSearchDSL(raw=True))
+    assert len(expected['bool']['must'][0]['bool']['should']) == 2
+    assert accept(Interner()(tree), dsl.ElasticSearchDSL(raw=True),
+                  memoize=True) == expected
+    assert invenio_query_factory(engine='fast', output='dict',
+                                 interner=Interner())(query) == expected
+
+
+def test_spires_rewrite_keywords():
+    """Test SPIRES keywords are rewritten without copying the whole tree."""
+    build_valid_keywords_grammar()
+    parser = converter.SpiresToInvenioSyntaxConverter()
+    for query, expected in TestSpiresToInvenio.queries:
+        tree = parser.parse_query(query)
+        assert spires_to_invenio.rewrite_keywords(tree) == expected
+
+    for flatten in (False, True):
+        parser = converter.SpiresToInvenioSyntaxConverter(flatten=flatten)
+        tree = parser.parse_query('find a ellis or t higgs and not boson')
+        expected = tree.accept(spires_to_invenio.SpiresToInvenio())
+        original = repr(tree)
+
+        new_tree = spires_to_invenio.rewrite_keywords(tree)
+        assert new_tree == expected
+        assert repr(tree) == original
+
+        assert spires_to_invenio.rewrite_keywords(tree, in_place=True) == \
+            expected
+        assert tree == expected
+
+    # values are shared with the original tree
+    parser = converter.SpiresToInvenioSyntaxConverter()
+    tree = parser.parse_query('find a ellis and t higgs')
+    value = tree.right.right
+    assert spires_to_invenio.rewrite_keywords(tree).right.right is value
+
+    tree = AndOp(KeywordOp(Keyword('title'), Value('higgs')),
+                 OrOp(Value('boson'), NotOp(Value('quark'))))
+    assert spires_to_invenio.rewrite_keywords(tree) is tree
+
+    # trees deeper than the recursion limit
+    tree = SpiresOp(Keyword('t'), Value('higgs'))
+    for _ in range(5000):
+        tree = AndOp(tree, SpiresOp(Keyword('t'), Value('boson')))
+    tree = spires_to_invenio.rewrite_keywords(tree, in_place=True)
+    for _ in range(5000):
+        assert tree.right == KeywordOp(Keyword('title'), Value('boson'))
+        tree = tree.left
+    assert tree == KeywordOp(Keyword('title'), Value('higgs'))